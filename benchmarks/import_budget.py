@@ -0,0 +1,142 @@
+"""
+Comprobación del coste de importación de los puntos de entrada del proyecto.
+
+Cada módulo se importa en un intérprete nuevo (sin módulos en caché) y se comprueba que:
+- El tiempo de importación no supera su presupuesto (`ENTRY_POINTS`, escalable con
+  `--scale`).
+- No se cargan dependencias que ese punto de entrada no necesita al arrancar: importar
+  el runner o la app de Streamlit no debe cargar LangGraph, OpenAI ni `tiktoken` (el
+  grafo y los clientes se construyen en la primera petición), y `deleter.py` no debe
+  cargar nunca la pila del LLM.
+
+Termina con código 1 si algún punto de entrada incumple su presupuesto o carga un módulo
+prohibido, para poder usarse como prueba de regresión en CI.
+
+Uso:
+    python -m benchmarks.import_budget
+    python -m benchmarks.import_budget --scale 2 --repeat 5
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import List
+
+# Dependencias pesadas (módulos de primer nivel) que ningún punto de entrada importa
+LLM_STACK = [
+    "langchain",
+    "langchain_community",
+    "langchain_core",
+    "langchain_openai",
+    "langgraph",
+    "openai",
+    "tiktoken",
+    "httpx",
+    "sklearn",
+]
+
+# Punto de entrada → (presupuesto en ms, módulos que no debe cargar)
+# Las apps de Streamlit se ejecutan al importarse (primer pintado, incluido el recuento
+# de tokens con el proveedor de la medición): el presupuesto lo domina Streamlit
+ENTRY_POINTS = {
+    "deleter": (600, LLM_STACK),
+    "webapp.runner": (300, LLM_STACK),
+    "webapp.app": (1500, LLM_STACK),
+    "webapp.app_test": (1500, LLM_STACK),
+    "webapp.evaluation.scenario_utils": (200, LLM_STACK),
+    "modules.prompt_utils": (150, LLM_STACK),
+    "modules.vector": (150, LLM_STACK),
+    "modules.categories": (300, LLM_STACK),
+}
+
+# Se ejecuta en el intérprete hijo: mide la importación y lista los módulos cargados
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - start) * 1000
+modules = sorted({{m.split(".")[0] for m in sys.modules}})
+print(json.dumps({{"ms": elapsed, "modules": modules}}))
+"""
+
+
+def measure(module: str) -> dict:
+    """
+    Importa `module` en un intérprete nuevo.
+
+    Args:
+        module (str): Nombre del módulo a importar.
+
+    Returns:
+        dict: `"ms"` (tiempo de importación) y `"modules"` (paquetes de primer nivel
+        cargados).
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    # Las credenciales no se validan al importar con el proveedor "stub"
+    env = {**os.environ, "KOALA_PROVIDER": os.environ.get("KOALA_PROVIDER", "stub")}
+    output = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(module=module)],
+        cwd=root,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def check(module: str, budget_ms: float, forbidden: List[str], repeat: int) -> bool:
+    """
+    Mide un punto de entrada (mejor de `repeat` ejecuciones) e imprime el resultado.
+
+    Returns:
+        bool: `True` si cumple el presupuesto y no carga ningún módulo prohibido.
+    """
+    runs = [measure(module) for _ in range(repeat)]
+    best_ms = min(run["ms"] for run in runs)
+    loaded = sorted(set(forbidden) & set(runs[0]["modules"]))
+
+    ok = best_ms <= budget_ms and not loaded
+    print(
+        f"{'✅' if ok else '❌'} {module}: {best_ms:.0f} ms "
+        f"(presupuesto {budget_ms:.0f} ms)"
+        + (f", carga {', '.join(loaded)}" if loaded else "")
+    )
+    return ok
+
+
+def main():
+    """
+    Comprueba todos los puntos de entrada desde CLI.
+    """
+    parser = argparse.ArgumentParser(
+        description="Comprueba el tiempo y los módulos cargados al importar."
+    )
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="Multiplicador de los presupuestos (máquinas más lentas)",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Importaciones por punto de entrada"
+    )
+    parser.add_argument(
+        "--module", nargs="+", help="Comprueba solo estos puntos de entrada"
+    )
+    args = parser.parse_args()
+
+    ok = True
+    for module, (budget_ms, forbidden) in ENTRY_POINTS.items():
+        if args.module and module not in args.module:
+            continue
+        ok &= check(module, budget_ms * args.scale, forbidden, args.repeat)
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Benchmark de rendimiento de `run_prompt` con los servicios simulados (proveedor
+`"stub"`).
+
+Ejecuta los prompts de los escenarios de prueba contra el grafo completo (controlador,
+retriever y LLM) usando los backends deterministas de `modules.stubs`: embeddings por
+hashing, búsqueda en memoria sobre `DOCS_PATH/*.md` y un chat con latencias simuladas.
+Así se mide el coste de la orquestación propia sin depender de la red ni de la
+variabilidad de Azure.
+
+Mide el rendimiento (peticiones/s) y los percentiles de latencia p50/p95/p99 con
+`--concurrency` peticiones en vuelo, en hilos (`run_prompt`) o en un bucle de eventos
+(`arun_prompt`, `--async`). Con `--baseline` compara con un resultado guardado
+anteriormente (`--output`) y termina con código 1 si alguna métrica empeora más de
+`--max-regression`.
+
+La caché de respuestas se desactiva por defecto para que cada petición recorra el grafo
+completo.
+
+Uso:
+    python -m benchmarks.run_prompt_bench --requests 64 --concurrency 8
+    python -m benchmarks.run_prompt_bench --async --concurrency 32 --output bench.json
+    python -m benchmarks.run_prompt_bench --baseline bench.json --max-regression 0.1
+"""
+
+import os
+
+# El proveedor se fija antes de importar la configuración (no requiere credenciales)
+os.environ.setdefault("KOALA_PROVIDER", "stub")
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import json  # noqa: E402
+import sys  # noqa: E402
+import time  # noqa: E402
+from concurrent.futures import ThreadPoolExecutor  # noqa: E402
+from typing import List  # noqa: E402
+
+import numpy as np  # noqa: E402
+
+import config.config as config  # noqa: E402
+
+# Métricas comparadas con la línea base y si un valor mayor es mejor
+COMPARED_METRICS = {
+    "throughput_rps": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+}
+
+
+def load_prompts() -> List[str]:
+    """
+    Devuelve los prompts completos de los escenarios de prueba, en orden.
+    """
+    from webapp.evaluation.scenario_utils import build_scenario_prompt, load_scenarios
+
+    return [build_scenario_prompt(s) for s in load_scenarios()]
+
+
+def run_threads(prompts: List[str], concurrency: int) -> List[float]:
+    """
+    Ejecuta `run_prompt` para cada prompt con `concurrency` hilos.
+
+    Returns:
+        List[float]: Latencia de cada petición en milisegundos.
+    """
+    from webapp.runner import run_prompt
+
+    def timed(prompt: str) -> float:
+        start = time.perf_counter()
+        run_prompt(prompt)
+        return (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(timed, prompts))
+
+
+async def run_async(prompts: List[str], concurrency: int) -> List[float]:
+    """
+    Ejecuta `arun_prompt` para cada prompt con como mucho `concurrency` peticiones en
+    vuelo.
+
+    Returns:
+        List[float]: Latencia de cada petición en milisegundos.
+    """
+    from webapp.runner import arun_prompt
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(prompt: str) -> float:
+        async with semaphore:
+            start = time.perf_counter()
+            await arun_prompt(prompt)
+            return (time.perf_counter() - start) * 1000
+
+    return await asyncio.gather(*(timed(prompt) for prompt in prompts))
+
+
+def summarize(latencies_ms: List[float], wall_time_s: float, args) -> dict:
+    """
+    Resume las latencias de una ejecución.
+
+    Returns:
+        dict: Parámetros de la ejecución, rendimiento y percentiles de latencia (ms).
+    """
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {
+        "mode": "async" if args.use_async else "threads",
+        "requests": len(latencies_ms),
+        "concurrency": args.concurrency,
+        "response_cache": args.cache,
+        "wall_time_s": round(wall_time_s, 3),
+        "throughput_rps": round(len(latencies_ms) / wall_time_s, 3),
+        "mean_ms": round(float(np.mean(latencies_ms)), 1),
+        "p50_ms": round(float(p50), 1),
+        "p95_ms": round(float(p95), 1),
+        "p99_ms": round(float(p99), 1),
+    }
+
+
+def compare(summary: dict, baseline: dict, max_regression: float) -> List[str]:
+    """
+    Compara el resumen con una línea base e imprime la variación de cada métrica.
+
+    Args:
+        summary (dict): Resultado de la ejecución actual.
+        baseline (dict): Resultado guardado anteriormente.
+        max_regression (float): Empeoramiento relativo tolerado (0.1 = 10 %).
+
+    Returns:
+        List[str]: Métricas que empeoran más de lo tolerado.
+    """
+    regressions = []
+    for metric, higher_is_better in COMPARED_METRICS.items():
+        before, after = baseline.get(metric), summary[metric]
+        if not before:
+            continue
+        change = (after - before) / before
+        worse = -change if higher_is_better else change
+        mark = "❌" if worse > max_regression else "✅"
+        print(f"{mark} {metric}: {before} → {after} ({change:+.1%})")
+        if worse > max_regression:
+            regressions.append(metric)
+    return regressions
+
+
+def main():
+    """
+    Ejecuta el benchmark desde CLI, imprime el resumen y, opcionalmente, lo compara y
+    guarda.
+    """
+    parser = argparse.ArgumentParser(
+        description="Mide el rendimiento de run_prompt con los servicios simulados."
+    )
+    parser.add_argument(
+        "--requests", type=int, default=64, help="Peticiones medidas en total"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="Peticiones simultáneas"
+    )
+    parser.add_argument(
+        "--warmup", type=int, default=2, help="Peticiones previas sin medir"
+    )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Usa arun_prompt en un bucle de eventos en lugar de hilos",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Mantiene activa la caché de respuestas (RESPONSE_CACHE_ENABLED)",
+    )
+    parser.add_argument("--output", help="Guarda el resumen en este fichero JSON")
+    parser.add_argument("--baseline", help="Resumen JSON con el que comparar")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.1,
+        help="Empeoramiento relativo tolerado frente a --baseline",
+    )
+    args = parser.parse_args()
+
+    # Debe fijarse antes de construir el grafo (al importar `webapp.runner`)
+    config.RESPONSE_CACHE_ENABLED = config.RESPONSE_CACHE_ENABLED and args.cache
+
+    prompts = load_prompts()
+    if not prompts:
+        print("ℹ️ No hay escenarios con los que medir.")
+        return
+    measured = [prompts[i % len(prompts)] for i in range(args.requests)]
+    warmup = prompts[: args.warmup]
+
+    print(
+        f"🏁 {args.requests} peticiones, concurrencia {args.concurrency} "
+        f"({'async' if args.use_async else 'hilos'}, proveedor {config.PROVIDER})"
+    )
+    if args.use_async:
+        asyncio.run(run_async(warmup, args.concurrency))
+        start = time.perf_counter()
+        latencies = asyncio.run(run_async(measured, args.concurrency))
+    else:
+        run_threads(warmup, args.concurrency)
+        start = time.perf_counter()
+        latencies = run_threads(measured, args.concurrency)
+    summary = summarize(latencies, time.perf_counter() - start, args)
+
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"✅ Resumen guardado en {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(summary, baseline, args.max_regression):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
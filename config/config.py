@@ -17,17 +17,33 @@ from dotenv import load_dotenv
 # ===============================
 load_dotenv()
 
-AZURE_SEARCH_ENDPOINT = os.environ["AZURE_SEARCH_ENDPOINT"]
-AZURE_SEARCH_KEY = os.environ["AZURE_SEARCH_KEY"]
+# Proveedor de LLM, embeddings y búsqueda:
+# - "azure": servicios reales de Azure (requiere todas las variables de entorno)
+# - "stub": implementaciones deterministas en proceso, sin red ni credenciales
+#   (`modules/stubs.py`)
+PROVIDER = os.getenv("KOALA_PROVIDER", "azure")
 
-AZURE_OPENAI_ENDPOINT = os.environ["AZURE_OPENAI_ENDPOINT"]
-AZURE_OPENAI_API_KEY = os.environ["AZURE_OPENAI_API_KEY"]
-AZURE_OPENAI_DEPLOYMENT = os.environ["AZURE_OPENAI_DEPLOYMENT"]
 
+def _env(name: str) -> str:
+    """
+    Lee una variable de entorno, obligatoria solo con el proveedor "azure".
+    """
+    if PROVIDER == "azure":
+        return os.environ[name]
+    return os.getenv(name, "")
 
-AZURE_OPENAI_EMBEDDINGS_ENDPOINT = os.environ["AZURE_OPENAI_EMBEDDINGS_ENDPOINT"]
-AZURE_OPENAI_EMBEDDINGS_API_KEY = os.environ["AZURE_OPENAI_EMBEDDINGS_API_KEY"]
-AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT = os.environ["AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT"]
+
+AZURE_SEARCH_ENDPOINT = _env("AZURE_SEARCH_ENDPOINT")
+AZURE_SEARCH_KEY = _env("AZURE_SEARCH_KEY")
+
+AZURE_OPENAI_ENDPOINT = _env("AZURE_OPENAI_ENDPOINT")
+AZURE_OPENAI_API_KEY = _env("AZURE_OPENAI_API_KEY")
+AZURE_OPENAI_DEPLOYMENT = _env("AZURE_OPENAI_DEPLOYMENT")
+
+
+AZURE_OPENAI_EMBEDDINGS_ENDPOINT = _env("AZURE_OPENAI_EMBEDDINGS_ENDPOINT")
+AZURE_OPENAI_EMBEDDINGS_API_KEY = _env("AZURE_OPENAI_EMBEDDINGS_API_KEY")
+AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT = _env("AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT")
 
 # ===============================
 # 📁 PARÁMETROS GENERALES
@@ -38,6 +54,21 @@ UI_OPTIONS_PATH = "config/ui_options.yaml"  # Ruta al archivo de opciones de la
 PROMPT_PATH = "config/prompts.yaml"  # Ruta al archivo con prompts del sistema
 SCENARIOS_PATH = "config/test_cases.yaml"  # Ruta al archivo con escenarios de prueba
 
+# ===============================
+# 🗄️ ALMACÉN VECTORIAL
+# ===============================
+# Backend de búsqueda usado por el retriever:
+# - "azure": índice `INDEX_NAME` en Azure Cognitive Search
+# - "local": índice en proceso (sin red), generado con
+#   `python uploader.py --export-local`
+VECTOR_BACKEND = "azure"
+LOCAL_INDEX_PATH = ".cache/local_index"  # Carpeta con vectors.npy + metadata.json
+# Búsqueda local: "exact" (fuerza bruta) o "ivf" (aproximada, corpus grandes)
+LOCAL_SEARCH_MODE = "exact"
+ANN_NLIST = 0  # Listas del índice IVF (0 = automático, ≈ √nº de secciones)
+ANN_NPROBE = 8  # Listas sondeadas por consulta (más = mejor recall, más latencia)
+ANN_TRAIN_ITERATIONS = 20  # Iteraciones de k-means al entrenar el índice IVF
+
 # ===============================
 # 🧠 MODELOS UTILIZADOS
 # ===============================
@@ -45,11 +76,45 @@ API_VERSION_LLM = "2024-02-15-preview"  # Versión de la API de Azure OpenAI
 API_VERSION_EMBEDDINGS = "2024-02-01"  # Versión de la API de embeddings
 ENCODING_NAME = "cl100k_base"  # Codificación de tokens para compatibilidad con GPT
 
+# ===============================
+# 🧪 PROVEEDOR "stub" (benchmarks y pruebas sin red)
+# ===============================
+STUB_SEED = 0  # Semilla de embeddings y latencias simuladas (resultados reproducibles)
+STUB_EMBEDDING_DIM = 256  # Dimensión de los embeddings deterministas (hash de palabras)
+STUB_LLM_TTFT_MS = 300.0  # Latencia media hasta el primer token del chat simulado
+STUB_LLM_TTFT_STD_MS = 50.0  # Desviación típica de la latencia hasta el primer token
+STUB_LLM_TOKENS_PER_S = 80.0  # Velocidad media de generación (tokens/s)
+STUB_LLM_TOKENS_PER_S_STD = 10.0  # Desviación típica de la velocidad de generación
+STUB_LLM_COMPLETION_TOKENS = 400  # Tokens generados por respuesta simulada
+
+# ===============================
+# 🌐 CONEXIONES HTTP (clientes compartidos, ver modules/clients.py)
+# ===============================
+HTTP_MAX_CONNECTIONS = 20  # Conexiones simultáneas máximas por endpoint
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 10  # Conexiones inactivas que se mantienen abiertas
+HTTP_KEEPALIVE_EXPIRY = 60.0  # Segundos que una conexión inactiva sigue reutilizable
+HTTP_CONNECT_TIMEOUT = 5.0  # Tiempo máximo para establecer la conexión (s)
+HTTP_READ_TIMEOUT = 60.0  # Tiempo máximo de espera de la respuesta (s)
+HTTP_MAX_RETRIES = 3  # Reintentos ante errores transitorios (5xx, 429, conexión)
+HTTP_RETRY_BACKOFF = 0.8  # Factor de espera exponencial entre reintentos (s)
+
+# ===============================
+# 💾 CACHÉ DE EMBEDDINGS
+# ===============================
+EMBEDDING_CACHE_ENABLED = True  # Reutiliza embeddings ya calculados entre ejecuciones
+EMBEDDING_CACHE_PATH = ".cache/embeddings.sqlite3"  # Fichero SQLite de la caché
+EMBEDDING_CACHE_MAX_ENTRIES = 50_000  # Máx vectores guardados (expulsión LRU)
+
 # ===============================
 # 🎯 LÍMITES DE TOKENS (para economizar y cumplir cuotas)
 # ===============================
 MAX_PROMPT_TOKENS = 512  # Máx tokens permitidos en el prompt (entrada)
 MAX_COMPLETION_TOKENS = 850  # Máx tokens generados por la respuesta
+CONTEXT_MAX_TOKENS = 2000  # Máx tokens del contexto recuperado incluido en el prompt
+CONTEXT_INTEREST_WEIGHT = 0.1  # Bonificación por cubrir intereses nuevos
+CONTEXT_DEDUPE_THRESHOLD = 0.8  # Jaccard de tokens para descartar duplicados (0 = no)
+CONTEXT_TRUNCATE = True  # Trunca la primera sección que no cabe en el presupuesto
+CONTEXT_MIN_TRUNCATED_TOKENS = 64  # Mín tokens de contenido de una sección truncada
 
 # ===============================
 # 🌡️ PARÁMETROS DE GENERACIÓN DE RESPUESTAS
@@ -60,14 +125,69 @@ TEMPERATURE = 0.4  # Control de aleatoriedad en la generación de respuestas
 # 🔍 PARÁMETROS DEL RETRIEVER AGENT
 # ===============================
 RETRIEVER_K = 15  # Máx documentos devueltos por búsqueda semántica
+RETRIEVER_K_PER_INTEREST = 4  # Documentos pedidos por cada interés (K adaptativo)
+RETRIEVER_MIN_K = 5  # Mín documentos pedidos cuando se filtra por intereses
 SIMILARITY_THRESHOLD = (
     0.4  # Umbral mínimo de similitud para considerar un chunk relevante
 )
+# Origen de la similitud usada para el umbral:
+# - "vector": vectores `content_vector` almacenados en el índice (búsqueda híbrida)
+# - "score": puntuación coseno del propio motor (búsqueda solo vectorial, sin
+#   transferir vectores)
+RETRIEVER_SIMILARITY_SOURCE = "vector"
+
+# ===============================
+# ♻️ CACHÉ DE RESPUESTAS
+# ===============================
+RESPONSE_CACHE_ENABLED = True  # Reutiliza itinerarios ya generados (omite RAG + LLM)
+RESPONSE_CACHE_TTL_SECONDS = 3600  # Tiempo de vida de cada respuesta cacheada
+RESPONSE_CACHE_MAX_ENTRIES = 256  # Máx respuestas guardadas (expulsión LRU)
+RESPONSE_CACHE_SEMANTIC_DISTANCE = 0.0  # Distancia coseno máx (0 = solo exacta)
+
+# ===============================
+# 📈 MÉTRICAS DE EJECUCIÓN (ver modules/instrumentation.py)
+# ===============================
+# Destinos de las métricas de cada ejecución del grafo:
+# - "log": una línea por ejecución en el logger `koalaroute.metrics` (nivel INFO)
+# - "prometheus": contadores acumulados en formato de texto de Prometheus
+# - "otel": un span por nodo con OpenTelemetry (requiere `opentelemetry-api`)
+METRICS_SINKS = ["log"]
+
+# ===============================
+# 🧺 EJECUCIÓN POR LOTES (run_prompt_batch)
+# ===============================
+BATCH_SEARCH_WORKERS = 8  # Búsquedas en el vector store en paralelo
+BATCH_LLM_WORKERS = 4  # Ejecuciones del grafo (llamadas al LLM) en paralelo
+
+# ===============================
+# 📤 PARÁMETROS DE INGESTA (uploader.py)
+# ===============================
+EMBEDDING_BATCH_MAX_TOKENS = 8_000  # Máx tokens por llamada a `embed_documents`
+EMBEDDING_BATCH_MAX_ITEMS = 256  # Máx secciones por llamada a `embed_documents`
+UPLOAD_BATCH_SIZE = (
+    200  # Documentos por `upload_documents` (límite Azure: 1000 docs / 16 MB)
+)
+EMBEDDING_TPM = 120_000  # Cuota de tokens por minuto del despliegue de embeddings
+EMBEDDING_RPM = 720  # Cuota de peticiones por minuto del despliegue de embeddings
+INGEST_QUEUE_SIZE = 8  # Capacidad de las colas entre etapas del pipeline concurrente
+INGEST_MAX_RETRIES = 5  # Reintentos ante respuestas 429 (límite de cuota)
+INGEST_MANIFEST_PATH = (
+    ".cache/ingest_manifest.json"  # Hashes de las secciones indexadas
+)
+
+# ===============================
+# 🗑️ PARÁMETROS DE BORRADO (deleter.py)
+# ===============================
+DELETE_PAGE_SIZE = 1000  # IDs leídos por página (máx Azure: 1000)
+DELETE_BATCH_SIZE = 1000  # Documentos por lote de borrado (máx Azure: 1000)
+DELETE_WORKERS = 4  # Lotes de borrado enviados en paralelo
 
 # ===============================
 # 📊 PARÁMETROS DE EVALUACIÓN
 # ===============================
 K_EVAL_THRESHOLD = 0.6  # Porcentaje mínimo de documentos relevantes para evaluación
+EVAL_WORKERS = 4  # Escenarios ejecutados en paralelo por el evaluador por lotes
+EVAL_REPORT_DIR = "reports/evaluation"  # Carpeta de los informes JSON/CSV del evaluador
 
 # ===============================
 # 🧩 MAPEO DE SECCIONES A CATEGORÍAS (para filtrado por interés)
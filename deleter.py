@@ -1,17 +1,155 @@
 """
-Módulo para eliminar documentos del índice de Azure Cognitive Search por ID.
+Módulo para eliminar documentos del índice de Azure Cognitive Search por ID o por
+filtro.
+
+Todas las operaciones usan el `SearchClient` compartido de `modules.clients`, por lo que
+los bloques de borrado reutilizan la misma conexión HTTP.
+
+El borrado completo (`--all`) y por filtro (`--title`, `--source`, `--category`) es un
+pipeline en streaming: los IDs se leen por páginas ordenadas por `id` (paginación por
+clave, `id gt '<último>'`), de modo que no hay límite de 1000 resultados ni se guardan
+todos los IDs en memoria, y cada página se borra en lotes concurrentes acotados
+(`DELETE_WORKERS`) mientras se lee la siguiente. Requiere que el campo `id` del índice
+sea filtrable y ordenable.
+
+Los IDs eliminados se descartan también del manifiesto de ingesta, para que
+`uploader.py --sync` vuelva a subir esas secciones.
 
 Uso:
     python deleter.py --id 2beebada-685e-4fdd-97b1-38a83f093250
     python deleter.py --id id1 id2
     python deleter.py --all
+    python deleter.py --title Sydney
+    python deleter.py --source sydney.md
+    python deleter.py --category Playas --title Sydney
 """
 
 import argparse
-from azure.search.documents import SearchClient
-from azure.core.credentials import AzureKeyCredential
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterator, List, Optional
+
 from azure.core.exceptions import HttpResponseError
-from config.config import AZURE_SEARCH_ENDPOINT, AZURE_SEARCH_KEY, INDEX_NAME
+from azure.search.documents import SearchClient
+
+from config.config import (
+    DELETE_BATCH_SIZE,
+    DELETE_PAGE_SIZE,
+    DELETE_WORKERS,
+    DOCS_PATH,
+    INGEST_MANIFEST_PATH,
+)
+from modules.categories import category_registry
+from modules.clients import get_search_client
+from modules.manifest import IngestManifest
+
+
+# ---------- FILTROS ----------
+def _odata_string(value: str) -> str:
+    """
+    Convierte un valor en un literal de cadena OData (las comillas simples se duplican).
+    """
+    return "'" + value.replace("'", "''") + "'"
+
+
+def build_filter(
+    titles: Optional[List[str]] = None,
+    sources: Optional[List[str]] = None,
+    categories: Optional[List[str]] = None,
+) -> Optional[str]:
+    """
+    Construye el filtro OData que selecciona los documentos a eliminar.
+
+    Los valores de un mismo criterio se combinan con OR y los criterios entre sí con
+    AND.
+
+    Args:
+        titles (list[str] | None): Títulos de documento (ciudades), ej. "Sydney".
+        sources (list[str] | None): Archivos .md de origen, ej. "sydney.md". Sin
+            carpeta, se buscan en `DOCS_PATH`.
+        categories (list[str] | None): Categorías; se eliminan las secciones con alguna
+            de ellas.
+
+    Returns:
+        str | None: Expresión de filtro, o `None` si no se indicó ningún criterio.
+    """
+    conditions = []
+
+    if titles:
+        conditions.append(f"search.in(title, {_odata_string('|'.join(titles))}, '|')")
+
+    if sources:
+        # `source` tiene la forma "<ruta>#<sección>": se filtra por rango de prefijo
+        ranges = []
+        for source in sources:
+            path = (
+                source if os.path.dirname(source) else os.path.join(DOCS_PATH, source)
+            )
+            ranges.append(
+                f"(source ge {_odata_string(path + '#')} "
+                f"and source lt {_odata_string(path + '$')})"
+            )
+        conditions.append("(" + " or ".join(ranges) + ")")
+
+    if categories:
+        names = "|".join(category_registry.canonical(c) for c in categories)
+        conditions.append(f"category/any(c: search.in(c, {_odata_string(names)}, '|'))")
+
+    return " and ".join(conditions) or None
+
+
+# ---------- LECTURA DE IDS ----------
+def iter_document_ids(
+    search_client: SearchClient,
+    filter_expression: Optional[str] = None,
+    page_size: int = DELETE_PAGE_SIZE,
+) -> Iterator[List[str]]:
+    """
+    Recorre los IDs del índice por páginas ordenadas por `id` (paginación por clave).
+
+    Cada página se pide con `id gt '<último ID de la página anterior>'`, de modo que el
+    recorrido es correcto aunque los documentos ya leídos se eliminen mientras tanto.
+
+    Args:
+        search_client (SearchClient): Cliente del índice.
+        filter_expression (str | None): Filtro OData adicional.
+        page_size (int): IDs por página.
+
+    Yields:
+        list[str]: IDs de cada página, en orden ascendente.
+    """
+    last_id = None
+    while True:
+        conditions = [filter_expression] if filter_expression else []
+        if last_id is not None:
+            conditions.append(f"id gt {_odata_string(last_id)}")
+
+        results = search_client.search(
+            search_text="*",
+            select=["id"],
+            filter=" and ".join(f"({c})" for c in conditions) or None,
+            order_by=["id asc"],
+            top=page_size,
+        )
+        page = [result["id"] for result in results]
+        if not page:
+            return
+
+        yield page
+        if len(page) < page_size:
+            return
+        last_id = page[-1]
+
+
+# ---------- BORRADO ----------
+def _delete_batch(search_client: SearchClient, document_ids: List[str]) -> List[str]:
+    """
+    Elimina un lote de documentos y devuelve los IDs eliminados correctamente.
+    """
+    batch = [{"id": doc_id} for doc_id in document_ids]
+    results = search_client.delete_documents(documents=batch)
+    return [r.key for r in results if r.succeeded]
 
 
 def delete_documents_by_id(document_ids: list[str]):
@@ -25,69 +163,153 @@ def delete_documents_by_id(document_ids: list[str]):
         print("ℹ️ No hay IDs para eliminar.")
         return
 
-    batch = [{"@search.action": "delete", "id": doc_id} for doc_id in document_ids]
+    search_client = get_search_client()
 
-    search_client = SearchClient(
-        endpoint=AZURE_SEARCH_ENDPOINT,
-        index_name=INDEX_NAME,
-        credential=AzureKeyCredential(AZURE_SEARCH_KEY),
-    )
+    deleted = []
+    for i in range(0, len(document_ids), DELETE_BATCH_SIZE):
+        deleted.extend(
+            _delete_batch(search_client, document_ids[i : i + DELETE_BATCH_SIZE])
+        )
 
-    search_client.upload_documents(documents=batch)
-    print(f"✅ Eliminados {len(document_ids)} documento(s).")
+    manifest = IngestManifest.load(INGEST_MANIFEST_PATH)
+    manifest.forget(deleted)
+    manifest.save()
 
+    print(f"✅ Eliminados {len(deleted)} documento(s).")
 
-def delete_all_documents():
+
+def delete_by_filter(
+    filter_expression: Optional[str] = None, workers: int = DELETE_WORKERS
+) -> int:
     """
-    Recupera todos los IDs del índice y los elimina.
+    Elimina en streaming todos los documentos que cumplen el filtro (o todo el índice).
+
+    Las páginas de IDs se reparten en lotes de `DELETE_BATCH_SIZE` que se envían en
+    paralelo con `workers` hilos; como mucho hay `2 * workers` lotes en vuelo, así que
+    la memoria usada no depende del tamaño del índice.
+
+    Args:
+        filter_expression (str | None): Filtro OData (ver `build_filter`); `None` borra
+            todo.
+        workers (int): Lotes de borrado simultáneos.
+
+    Returns:
+        int: Número de documentos eliminados.
     """
-    search_client = SearchClient(
-        endpoint=AZURE_SEARCH_ENDPOINT,
-        index_name=INDEX_NAME,
-        credential=AzureKeyCredential(AZURE_SEARCH_KEY),
-    )
+    search_client = get_search_client()
+    manifest = IngestManifest.load(INGEST_MANIFEST_PATH)
 
-    print("🔍 Recuperando todos los IDs del índice...")
-    all_ids = []
-    results = search_client.search(search_text="*", select=["id"], top=1000)
-    for result in results:
-        all_ids.append(result["id"])
+    deleted = 0
+    start = time.perf_counter()
 
-    if not all_ids:
-        print("ℹ️ No se encontraron documentos en el índice.")
-        return
+    def collect(futures) -> int:
+        count = 0
+        for future in futures:
+            ids = future.result()
+            manifest.forget(ids)
+            count += len(ids)
+        return count
+
+    print("🔍 Recorriendo los IDs del índice...")
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = set()
+            for page in iter_document_ids(search_client, filter_expression):
+                for i in range(0, len(page), DELETE_BATCH_SIZE):
+                    pending.add(
+                        executor.submit(
+                            _delete_batch,
+                            search_client,
+                            page[i : i + DELETE_BATCH_SIZE],
+                        )
+                    )
 
-    # Borrar en bloques de 1000 usando la misma función
-    chunk_size = 1000
-    for i in range(0, len(all_ids), chunk_size):
-        chunk = all_ids[i : i + chunk_size]
-        delete_documents_by_id(chunk)
+                finished = {future for future in pending if future.done()}
+                pending -= finished
+                deleted += collect(finished)
 
-    print(f"🎉 Eliminación completada. Total eliminados: {len(all_ids)}")
+                # Se limitan los lotes en vuelo antes de pedir la siguiente página
+                while len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    deleted += collect(done)
+
+                elapsed = time.perf_counter() - start
+                rate = deleted / max(elapsed, 1e-9)
+                print(f"🗑️ {deleted} eliminados ({rate:.0f} docs/s)")
+
+            deleted += collect(wait(pending).done)
+    finally:
+        manifest.save()
+
+    if not deleted:
+        print("ℹ️ No se encontraron documentos que eliminar.")
+        return 0
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"🎉 Eliminación completada. Total eliminados: {deleted} "
+        f"en {elapsed:.1f}s ({deleted / max(elapsed, 1e-9):.0f} docs/s)"
+    )
+    return deleted
+
+
+def delete_all_documents():
+    """
+    Recorre todos los IDs del índice y los elimina en streaming.
+    """
+    delete_by_filter()
 
 
 def main():
     """
-    Ejecuta la eliminación desde CLI permitiendo múltiples IDs o eliminar todo con --all.
+    Ejecuta la eliminación desde CLI: por IDs, todo el índice con --all o por filtro
+    (--title, --source y --category, combinables entre sí).
     """
     parser = argparse.ArgumentParser(
         description="Elimina documentos del índice de Azure Search."
     )
-    group = parser.add_mutually_exclusive_group(required=True)
+    group = parser.add_mutually_exclusive_group()
     group.add_argument(
         "--id", nargs="+", help="Uno o más IDs de documentos a eliminar."
     )
     group.add_argument(
         "--all", action="store_true", help="Elimina todos los documentos del índice."
     )
+    parser.add_argument(
+        "--title",
+        nargs="+",
+        help="Elimina las secciones de uno o más títulos (ciudad).",
+    )
+    parser.add_argument(
+        "--source", nargs="+", help="Elimina las secciones de uno o más archivos .md."
+    )
+    parser.add_argument(
+        "--category",
+        nargs="+",
+        help="Elimina las secciones con alguna de las categorías indicadas.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DELETE_WORKERS,
+        help="Lotes de borrado enviados en paralelo.",
+    )
 
     args = parser.parse_args()
+    filter_expression = build_filter(args.title, args.source, args.category)
+    if bool(args.id or args.all) == bool(filter_expression):
+        parser.error(
+            "indica --id, --all o al menos un filtro (--title/--source/--category)"
+        )
 
     try:
         if args.all:
-            delete_all_documents()
-        else:
+            delete_by_filter(workers=args.workers)
+        elif args.id:
             delete_documents_by_id(args.id)
+        else:
+            print(f"🔎 Filtro: {filter_expression}")
+            delete_by_filter(filter_expression, workers=args.workers)
     except HttpResponseError as e:
         print(f"❌ Error de respuesta HTTP al eliminar documentos: {e}")
     except Exception as e:
@@ -0,0 +1,182 @@
+"""
+Agente responsable de consultar y alimentar la caché de respuestas del sistema.
+
+Se sitúa en la entrada del grafo, antes de la recuperación y de la generación con el
+LLM:
+- En un acierto, devuelve el itinerario ya generado y sus documentos, y el flujo termina
+  sin consultar el vector store ni Azure OpenAI.
+- En un fallo, el flujo continúa con normalidad.
+- Con `"cache_refresh"` (regenerar un itinerario) no se consulta la caché: el flujo
+  continúa y la nueva respuesta sustituye a la guardada.
+
+El nivel semántico compara solo el texto libre del prompt (lo que sigue a la plantilla
+`prompt_base`) entre prompts con los mismos parámetros estructurados. El prompt completo
+no sirve para esto: la plantilla compartida domina su embedding y dos peticiones a
+ciudades distintas con las mismas opciones quedarían a una distancia mínima. El
+embedding del texto libre se guarda en `"cache_embedding"` para que `"guardar"` no tenga
+que volver a calcularlo.
+
+Tras la generación, el nodo `"guardar"` almacena la respuesta para las siguientes
+peticiones.
+
+Requiere:
+- `ResponseCache` desde `modules.response_cache`.
+- `extract_prompt_parameters` desde `prompt_utils.py` para agrupar prompts con los
+  mismos parámetros.
+- Un vector store que implemente `.embedding_function` y `.aembedding_function`.
+- Un estado (`AgentState`) que contenga la entrada del usuario en `"input"`.
+"""
+
+import json
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, List, Optional
+
+from modules.graph.agent_state import AgentState
+from modules.prompt_utils import extract_prompt_parameters
+from modules.response_cache import ResponseCache
+
+# Solo para las anotaciones: el almacén real puede ser también un `LocalVectorStore`
+if TYPE_CHECKING:
+    from modules.azure_vector_store import AzureVectorStore
+
+
+@dataclass
+class CacheAgent:
+    """
+    Agente que resuelve peticiones desde la caché de respuestas y guarda las nuevas.
+
+    Atributos:
+        cache (ResponseCache): Caché de respuestas compartida.
+        vector_store (AzureVectorStore): Almacén vectorial usado para embeber la
+            consulta.
+    """
+
+    cache: ResponseCache
+    vector_store: "AzureVectorStore"
+
+    def lookup(self, state: AgentState) -> AgentState:
+        """
+        Busca la respuesta de la consulta en la caché (nivel exacto y, si procede,
+        semántico).
+
+        Args:
+            state (AgentState): Estado actual del grafo que debe incluir `"input"`.
+
+        Returns:
+            AgentState: Estado con `"cache_hit"` y, en un acierto, `"response"`,
+            `"retrieved_docs"` y `"query_embedding"`. En un fallo con nivel semántico,
+            incluye `"cache_embedding"`.
+        """
+        key, group, free_text = self._keys(state["input"])
+
+        # Nivel exacto: no requiere embedding
+        cached = self._exact_lookup(state, key)
+        if cached is not None:
+            return self._hit(cached)
+
+        if not self._semantic_enabled(group, free_text):
+            return {"cache_hit": False}
+
+        embedding = self.vector_store.embedding_function(free_text)
+        return self._semantic_lookup(state, key, group, embedding)
+
+    async def alookup(self, state: AgentState) -> AgentState:
+        """
+        Variante asíncrona de `lookup` (el embedding se calcula con el cliente
+        asíncrono).
+
+        Args:
+            state (AgentState): Estado actual del grafo que debe incluir `"input"`.
+
+        Returns:
+            AgentState: Estado actualizado, con los mismos campos que `lookup`.
+        """
+        key, group, free_text = self._keys(state["input"])
+
+        cached = self._exact_lookup(state, key)
+        if cached is not None:
+            return self._hit(cached)
+
+        if not self._semantic_enabled(group, free_text):
+            return {"cache_hit": False}
+
+        embedding = await self.vector_store.aembedding_function(free_text)
+        return self._semantic_lookup(state, key, group, embedding)
+
+    def store(self, state: AgentState) -> AgentState:
+        """
+        Guarda en la caché la respuesta generada por el LLM junto con sus documentos.
+
+        Args:
+            state (AgentState): Estado final del grafo tras el nodo `"llm"`.
+
+        Returns:
+            AgentState: Estado sin cambios.
+        """
+        response = state.get("response")
+        if isinstance(response, str) and response:
+            key, group, _ = self._keys(state["input"])
+            self.cache.put(
+                key,
+                {
+                    "response": response,
+                    "retrieved_docs": state.get("retrieved_docs", []),
+                    "query_embedding": state.get("query_embedding"),
+                },
+                group=group,
+                embedding=state.get("cache_embedding"),
+            )
+        return {}
+
+    def _keys(self, user_query: str) -> tuple[str, Optional[str], str]:
+        """
+        Calcula la clave exacta del prompt, el grupo de sus parámetros estructurados y
+        su texto libre.
+        """
+        params, free_text = extract_prompt_parameters(user_query)
+        group = json.dumps(params, sort_keys=True) if params else None
+        return self.cache.make_key(user_query), group, free_text
+
+    def _semantic_enabled(self, group: Optional[str], free_text: str) -> bool:
+        """
+        Indica si procede buscar por similitud: prompt con parámetros y texto libre, y
+        nivel semántico activo.
+        """
+        return (
+            group is not None and bool(free_text) and self.cache.semantic_distance > 0
+        )
+
+    def _exact_lookup(self, state: AgentState, key: str) -> Optional[dict]:
+        """
+        Busca la respuesta por clave exacta (nunca acierta si se pide regenerarla).
+        """
+        return None if state.get("cache_refresh") else self.cache.get(key)
+
+    def _semantic_lookup(
+        self, state: AgentState, key: str, group: str, embedding: List[float]
+    ) -> AgentState:
+        """
+        Busca por similitud del texto libre entre las respuestas del mismo grupo.
+        """
+        cached = None
+        if not state.get("cache_refresh"):
+            cached = self.cache.get(key, group=group, embedding=embedding)
+        if cached is not None:
+            # El embedding guardado es de otro prompt: se conserva el de esta consulta
+            return self._hit(
+                {**cached, "query_embedding": state.get("query_embedding")}
+            )
+        return {"cache_hit": False, "cache_embedding": embedding}
+
+    @staticmethod
+    def _hit(cached: dict) -> AgentState:
+        """
+        Construye el estado de un acierto de caché.
+        """
+        return {
+            "response": cached["response"],
+            "retrieved_docs": cached["retrieved_docs"],
+            "query_embedding": cached["query_embedding"],
+            "last_node": "cache",
+            "cache_hit": True,
+        }
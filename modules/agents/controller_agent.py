@@ -5,18 +5,39 @@ Este agente se encarga de preparar los mensajes en formato ChatML que serán env
 al modelo LLM, integrando la entrada del usuario con el contexto recuperado previamente.
 En caso de que la recuperación no proporcione resultados útiles, aplica un prompt de reserva.
 
+El contexto recuperado se empaqueta dentro de un presupuesto de tokens
+(`CONTEXT_MAX_TOKENS`) con `pack_context`, priorizando las secciones más similares y las
+que cubren los intereses del usuario, de modo que el tamaño del prompt (coste y tiempo
+hasta el primer token) queda acotado.
+
 Forma parte de la orquestación general y se activa tras la fase de recuperación de información.
 
 Requiere:
 - `build_chatml_messages` desde `prompt_utils.py` para ensamblar el contexto.
 - `load_prompt` para cargar un prompt alternativo si no hay contexto disponible.
-- Un estado (`AgentState`) con al menos `"input"` y opcionalmente `"response"` y `"last_node"`.
+- `pack_context` desde `context_packer.py` para ajustar el contexto al presupuesto de
+  tokens.
+- Un estado (`AgentState`) con al menos `"input"` y opcionalmente `"response"`,
+  `"last_node"` y `"context_sections"`.
 """
 
 from dataclasses import dataclass
 
+from config.config import (
+    CONTEXT_DEDUPE_THRESHOLD,
+    CONTEXT_INTEREST_WEIGHT,
+    CONTEXT_MAX_TOKENS,
+    CONTEXT_MIN_TRUNCATED_TOKENS,
+    CONTEXT_TRUNCATE,
+)
+from modules.categories import category_registry
+from modules.context_packer import pack_context
 from modules.graph.agent_state import AgentState
-from modules.prompt_utils import build_chatml_messages, load_prompt
+from modules.prompt_utils import (
+    build_chatml_messages,
+    extract_user_interests_from_prompt,
+    load_prompt,
+)
 
 
 @dataclass
@@ -39,21 +60,52 @@ class ControllerAgent:
         Ejecuta la lógica de control del flujo: prepara los mensajes en formato ChatML,
         especialmente después del nodo de recuperación ("consulta").
 
-        Si el nodo anterior fue "consulta" y no se obtuvo contexto, se carga un prompt de fallback.
+        Si el nodo anterior fue "consulta", las secciones de `"context_sections"` se
+        empaquetan dentro de `CONTEXT_MAX_TOKENS`; si no se obtuvo contexto, se carga un
+        prompt de fallback.
 
         Args:
             state (AgentState): Estado actual del grafo, que debe contener al menos
                                 la clave `"input"` con la entrada del usuario.
 
         Returns:
-            AgentState: Nuevo estado actualizado con los mensajes listos en `"response"`.
+            AgentState: Nuevo estado actualizado con los mensajes listos en `"response"`
+            y, tras la recuperación, los tokens del contexto incluido en
+            `"context_tokens"`.
         """
         response = state.get("response", "")
 
         if state.get("last_node") == "consulta":
+            context_tokens = 0
+            if state.get("context_sections") is not None:
+                response, context_tokens = self.pack(state)
+
             fallback_prompt = ""
             if not response:
                 fallback_prompt = load_prompt("fallback_prompt")
             response = build_chatml_messages(state["input"], response, fallback_prompt)
+            return {"response": response, "context_tokens": context_tokens}
 
         return {"response": response}
+
+    def pack(self, state: AgentState) -> tuple[str, int]:
+        """
+        Ajusta las secciones recuperadas al presupuesto de tokens del contexto.
+
+        Args:
+            state (AgentState): Estado con `"input"` y `"context_sections"`.
+
+        Returns:
+            tuple[str, int]: Contexto en Markdown y número de tokens que ocupa.
+        """
+        interests = extract_user_interests_from_prompt(state["input"])
+        context, _, tokens = pack_context(
+            state["context_sections"],
+            CONTEXT_MAX_TOKENS,
+            interests_mask=category_registry.mask(interests),
+            interest_weight=CONTEXT_INTEREST_WEIGHT,
+            dedupe_threshold=CONTEXT_DEDUPE_THRESHOLD,
+            truncate=CONTEXT_TRUNCATE,
+            min_truncated_tokens=CONTEXT_MIN_TRUNCATED_TOKENS,
+        )
+        return context, tokens
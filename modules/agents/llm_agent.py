@@ -8,15 +8,28 @@ como GPT-3.5-Turbo o GPT-4, configurado mediante Azure.
 Forma parte de una arquitectura RAG, ejecutándose típicamente después de la preparación del prompt
 por parte del controlador.
 
+Si el estado incluye `"stream": True`, la respuesta se solicita en modo streaming y cada
+fragmento se emite con el `stream_writer` de LangGraph (modo `"custom"`) a medida que
+llega.
+
 Requiere:
-- `call_openai_chat` desde `llm.py` para realizar la llamada a la API de Azure OpenAI.
+- `call_openai_chat` / `acall_openai_chat` desde `llm.py` para realizar la llamada a la
+  API de Azure OpenAI.
+- `stream_openai_chat` / `astream_openai_chat` para el modo streaming.
 - Un estado (`AgentState`) que contenga la clave `"response"` con los mensajes ChatML.
 """
 
 from dataclasses import dataclass
 
+from langgraph.config import get_stream_writer
+
 from modules.graph.agent_state import AgentState
-from modules.llm import call_openai_chat
+from modules.llm import (
+    acall_openai_chat,
+    astream_openai_chat,
+    call_openai_chat,
+    stream_openai_chat,
+)
 
 
 @dataclass
@@ -40,7 +53,44 @@ class LLMAgent:
         Returns:
             AgentState: Nuevo estado actualizado con la respuesta generada y control de flujo.
         """
-        result = call_openai_chat(state.get("response"))
+        if state.get("stream"):
+            # Emitimos cada fragmento al consumidor del grafo y acumulamos la respuesta
+            writer = get_stream_writer()
+            chunks = []
+            for chunk in stream_openai_chat(state.get("response")):
+                writer(chunk)
+                chunks.append(chunk)
+            result = "".join(chunks)
+        else:
+            result = call_openai_chat(state.get("response"))
+
+        return {
+            "response": result,
+            "last_node": "llm",
+        }
+
+    async def agenerate_response(self, state: AgentState) -> AgentState:
+        """
+        Variante asíncrona de `generate_response`.
+
+        Args:
+            state (AgentState): Estado actual del grafo, donde `state.get("response")`
+                                contiene los mensajes en formato ChatML.
+
+        Returns:
+            AgentState: Nuevo estado actualizado con la respuesta generada y control de
+            flujo.
+        """
+        if state.get("stream"):
+            writer = get_stream_writer()
+            chunks = []
+            async for chunk in astream_openai_chat(state.get("response")):
+                writer(chunk)
+                chunks.append(chunk)
+            result = "".join(chunks)
+        else:
+            result = await acall_openai_chat(state.get("response"))
+
         return {
             "response": result,
             "last_node": "llm",
@@ -3,26 +3,46 @@ Agente responsable de recuperar contexto relevante desde un almacén vectorial u
 
 Este agente forma parte de la arquitectura RAG (Retrieval-Augmented Generation) y se encarga de:
 - Realizar una búsqueda semántica en Azure Cognitive Search (vía `langchain_community.vectorstores.AzureSearch`).
-- Filtrar los documentos según los intereses del usuario y la sección del contenido.
-- Calcular similitudes con embeddings para aplicar un umbral de relevancia.
+- Filtrar los documentos según los intereses del usuario dentro de la propia búsqueda
+  (filtro por el campo `category`), con un número de resultados adaptado al número de
+  intereses.
+- Calcular similitudes con los vectores almacenados en el índice para aplicar un umbral
+  de relevancia.
 - Devolver las secciones útiles para ser usadas como contexto en la generación de respuestas.
 
 Requiere:
-- `RETRIEVER_K` y `SIMILARITY_THRESHOLD` definidos en `config`.
-- Un vector store que implemente `.similarity_search` y `.embedding_function`.
+- `RETRIEVER_K`, `RETRIEVER_K_PER_INTEREST`, `RETRIEVER_MIN_K`, `SIMILARITY_THRESHOLD`,
+  y `RETRIEVER_SIMILARITY_SOURCE` definidos en `config`.
+- `category_registry` desde `modules.categories` para normalizar intereses y calcular
+  máscaras.
+- Un vector store que implemente `.similarity_search_with_vectors` (con `categories`) y
+  `.embedding_function`.
 - Funciones de `prompt_utils`: `extract_user_interests_from_prompt`, `load_prompt`.
 - Un estado (`AgentState`) que contenga la entrada del usuario en `"input"`.
 """
 
 from dataclasses import dataclass
+from typing import TYPE_CHECKING, List
 
-from langchain_community.vectorstores import AzureSearch
-from sklearn.metrics.pairwise import cosine_similarity
+import numpy as np
+from langchain_core.documents import Document
 
-from config.config import RETRIEVER_K, SIMILARITY_THRESHOLD
+from config.config import (
+    RETRIEVER_K,
+    RETRIEVER_K_PER_INTEREST,
+    RETRIEVER_MIN_K,
+    RETRIEVER_SIMILARITY_SOURCE,
+    SIMILARITY_THRESHOLD,
+)
+from modules.categories import category_registry
 from modules.graph.agent_state import AgentState
+from modules.instrumentation import record_call
 from modules.prompt_utils import extract_user_interests_from_prompt
 
+# Solo para las anotaciones: el almacén real puede ser también un `LocalVectorStore`
+if TYPE_CHECKING:
+    from modules.azure_vector_store import AzureVectorStore
+
 
 @dataclass
 class RetrieverAgent:
@@ -30,103 +50,207 @@ class RetrieverAgent:
     Agente responsable de recuperar documentos relevantes desde un almacén vectorial
     según una consulta del usuario y un umbral de similitud.
 
-    Este agente filtra las secciones por interés temático y relevancia semántica antes de
-    entregarlas como contexto al siguiente paso del flujo (por ejemplo, generación con LLM).
+    Este agente filtra las secciones por interés temático (en la propia búsqueda) y por
+    relevancia semántica antes de entregarlas como contexto al siguiente paso del flujo
+    (por ejemplo, generación con LLM).
 
     Atributos:
-        vector_store (AzureSearch): Almacén vectorial con métodos de búsqueda y embeddings.
+        vector_store (AzureVectorStore): Almacén vectorial con métodos de búsqueda y
+            embeddings.
     """
 
-    vector_store: AzureSearch
+    vector_store: "AzureVectorStore"
 
     def get_context(self, state: AgentState) -> AgentState:
         """
         Recupera documentos relevantes para una consulta del usuario y filtra los resultados
         por similitud semántica y coincidencia temática con los intereses extraídos del prompt.
 
-        - Realiza una búsqueda semántica con `similarity_search`.
-        - Filtra secciones cuyo campo `metadata["section"]` coincida con los intereses.
-        - Calcula la similitud con el embedding de la consulta y aplica un umbral.
+        - Reutiliza el embedding de la consulta de `"query_embedding"` o lo calcula una
+          única vez.
+        - Realiza una búsqueda semántica con `similarity_search_with_vectors`
+          restringida a las secciones cuyo campo `category` coincide con los intereses,
+          pidiendo un K adaptativo (ver `_search_params`). Devuelve la similitud coseno
+          de cada sección a partir de su vector almacenado (sin re-embeber).
+        - Aplica el umbral de similitud.
         - Devuelve las secciones relevantes en el campo `"response"` del estado.
 
         Args:
-            state (AgentState): Estado actual del grafo que debe incluir `"input"` con la consulta del usuario.
+            state (AgentState): Estado actual del grafo que debe incluir `"input"` con
+                                la consulta del usuario y, opcionalmente,
+                                `"retriever_k"` y `"similarity_threshold"` para fijar el
+                                número de resultados y el umbral de similitud.
+
+        Returns:
+            AgentState: Estado actualizado con el contexto relevante en `"response"`,
+            `"last_node"` marcado como `"consulta"`, `"retrieved_docs"` con los
+            documentos recuperados y `"query_embedding"` con el embedding de la
+            consulta.
+        """
+        # Consulta del usuario desde el estado
+        user_query = state["input"]
+
+        # Embedding de la consulta: se reutiliza del estado o se calcula una única vez
+        query_embedding = state.get("query_embedding")
+        if query_embedding is None:
+            query_embedding = self.vector_store.embedding_function(user_query)
+
+        # Búsqueda semántica filtrada por intereses, con la similitud de cada resultado
+        record_call("search")
+        docs, similarities = self.vector_store.similarity_search_with_vectors(
+            user_query,
+            query_embedding,
+            use_stored_vectors=RETRIEVER_SIMILARITY_SOURCE == "vector",
+            **self._search_params(state),
+        )
+
+        return self._build_context(
+            query_embedding,
+            docs,
+            similarities,
+            state.get("similarity_threshold"),
+        )
+
+    async def aget_context(self, state: AgentState) -> AgentState:
+        """
+        Variante asíncrona de `get_context`: el embedding de la consulta y la búsqueda
+        se realizan con los clientes asíncronos, sin bloquear el bucle de eventos
+        durante la E/S.
+
+        Args:
+            state (AgentState): Estado actual del grafo que debe incluir `"input"` con
+                la consulta del usuario.
+
+        Returns:
+            AgentState: Estado actualizado, con los mismos campos que `get_context`.
+        """
+        user_query = state["input"]
+
+        query_embedding = state.get("query_embedding")
+        if query_embedding is None:
+            query_embedding = await self.vector_store.aembedding_function(user_query)
+
+        record_call("search")
+        docs, similarities = await self.vector_store.asimilarity_search_with_vectors(
+            user_query,
+            query_embedding,
+            use_stored_vectors=RETRIEVER_SIMILARITY_SOURCE == "vector",
+            **self._search_params(state),
+        )
+
+        return self._build_context(
+            query_embedding,
+            docs,
+            similarities,
+            state.get("similarity_threshold"),
+        )
+
+    def _search_params(self, state: AgentState) -> dict:
+        """
+        Calcula las categorías a filtrar y el número de resultados de la búsqueda.
+
+        Los intereses extraídos del prompt se traducen a los nombres de categoría
+        indexados. Como todos los resultados ya cumplen el filtro, K se adapta al número
+        de intereses (`RETRIEVER_K_PER_INTEREST` por interés, entre `RETRIEVER_MIN_K` y
+        `RETRIEVER_K`), salvo que el estado fije `"retriever_k"`.
+
+        Args:
+            state (AgentState): Estado actual del grafo.
 
         Returns:
-            AgentState: Estado actualizado con el contexto relevante en `"response"`, `"last_node"` marcado como `"consulta"` y `"retrieved_docs"` con los documentos recuperados.
+            dict: Parámetros `k` y `categories` para `similarity_search_with_vectors`.
+        """
+        interests = extract_user_interests_from_prompt(state["input"])
+        categories = [category_registry.canonical(i) for i in dict.fromkeys(interests)]
+
+        k = state.get("retriever_k")
+        if k is None:
+            k = RETRIEVER_K
+            if categories:
+                k = min(
+                    RETRIEVER_K,
+                    max(RETRIEVER_MIN_K, RETRIEVER_K_PER_INTEREST * len(categories)),
+                )
+
+        return {"k": k, "categories": categories or None}
+
+    def _build_context(
+        self,
+        query_embedding: List[float],
+        docs: List[Document],
+        similarities: np.ndarray,
+        threshold: float | None = None,
+    ) -> AgentState:
+        """
+        Aplica el umbral de similitud a los documentos recuperados y construye el
+        contexto en Markdown.
+
+        Args:
+            query_embedding (List[float]): Embedding de la consulta.
+            docs (List[Document]): Documentos devueltos por la búsqueda.
+            similarities (np.ndarray): Similitud coseno de cada documento con la
+                consulta.
+            threshold (float | None): Similitud mínima para considerar relevante un
+                documento (por defecto, `SIMILARITY_THRESHOLD`).
+
+        Returns:
+            AgentState: Estado actualizado con `"response"`, `"last_node"`,
+            `"retrieved_docs"`, `"context_sections"` y `"query_embedding"`.
         """
         result = ""  # Inicializamos el resultado (bloque de contexto)
         retrieved_docs = []  # Lista para almacenar documentos recuperados
 
-        # Consulta del usuario desde el estado
-        user_query = state["input"]
+        if threshold is None:
+            threshold = SIMILARITY_THRESHOLD
+
+        # El filtro temático ya se aplicó en la búsqueda: solo queda el umbral
+        relevant_idx = np.flatnonzero(similarities >= threshold)
+
+        context_sections = []  # Secciones candidatas para el empaquetado del contexto
+
+        # Si hay documentos relevantes, los estructuramos en Markdown
+        if relevant_idx.size:
+            result_sections = []
+            retrieved_docs = []
+
+            for idx in relevant_idx:
+                doc, similarity = docs[idx], float(similarities[idx])
+                title = doc.metadata.get("title", "Sin título")
+                section = doc.metadata.get("section", "Sin sección")
+                categories = doc.metadata.get("category", [])
+                category_mask = doc.metadata.get("category_mask")
+                if category_mask is None:
+                    category_mask = category_registry.mask(categories)
+                content = doc.page_content.strip()
+
+                result_sections.append(f"## {title} > {section}\n\n{content}")
+                context_sections.append(
+                    {
+                        "title": title,
+                        "section": section,
+                        "content": content,
+                        "similarity": similarity,
+                        "category_mask": category_mask,
+                    }
+                )
+
+                retrieved_docs.append(
+                    {
+                        "id": f"{title}#{section}",
+                        "category": categories,
+                        "category_mask": category_mask,
+                        "similarity": round(similarity, 4),
+                    }
+                )
 
-        # Extraemos los intereses desde el prompt rellenado
-        user_interests = extract_user_interests_from_prompt(user_query)
-
-        # Normalizamos los intereses a minúsculas para hacer matching más robusto
-        user_interests_normalized = [i.lower() for i in user_interests]
-
-        # Búsqueda semántica en el vector store (Azure Search), top-k resultados
-        docs = self.vector_store.similarity_search(user_query, k=RETRIEVER_K)
-
-        # Calculamos el embedding del usuario para medir similitud más adelante
-        query_embedding = self.vector_store.embedding_function(user_query)
-
-        # Filtrado por coincidencia temática en metadatos de sección
-        category_filtered_docs = []
-        for doc in docs:
-            categories = [c.lower() for c in doc.metadata.get("category", [])]
-
-            if not user_interests_normalized or any(
-                interest in categories for interest in user_interests_normalized
-            ):
-                category_filtered_docs.append(doc)
-
-        # Si hay documentos que pasaron el primer filtro, evaluamos la similitud exacta
-        if category_filtered_docs:
-            relevant, similarities = [], []
-            for doc in category_filtered_docs:
-                # Combinamos título y contenido para obtener el embedding final
-                title = doc.metadata.get("title", "")
-                combined_text = f"{title}. {doc.page_content}"
-                doc_embedding = self.vector_store.embedding_function(combined_text)
-
-                # Similitud coseno entre consulta y documento
-                similarity = cosine_similarity([query_embedding], [doc_embedding])[0][0]
-
-                # Si supera el umbral, lo consideramos relevante
-                if similarity >= SIMILARITY_THRESHOLD:
-                    relevant.append(doc)
-                    similarities.append(similarity)
-
-            # Si hay documentos relevantes, los estructuramos en Markdown
-            if relevant:
-                result_sections = []
-                retrieved_docs = []
-
-                for doc, similarity in zip(relevant, similarities):
-                    title = doc.metadata.get("title", "Sin título")
-                    section = doc.metadata.get("section", "Sin sección")
-                    categories = doc.metadata.get("category", [])
-                    content = doc.page_content.strip()
-
-                    result_sections.append(f"## {title} > {section}\n\n{content}")
-
-                    retrieved_docs.append(
-                        {
-                            "id": f"{title}#{section}",
-                            "category": categories,
-                            "similarity": round(similarity, 4),
-                        }
-                    )
-
-                # Unimos las secciones en un solo bloque de texto
-                result = "\n\n".join(result_sections)
+            # Unimos las secciones en un solo bloque de texto
+            result = "\n\n".join(result_sections)
 
         # Devolvemos el estado actualizado con el contexto, el nodo actual y los documentos recuperados
         return {
             "response": result,
             "last_node": "consulta",
             "retrieved_docs": retrieved_docs,
+            "context_sections": context_sections,
+            "query_embedding": query_embedding,
         }
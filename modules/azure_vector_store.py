@@ -0,0 +1,319 @@
+"""
+Almacén vectorial de Azure Cognitive Search (`VECTOR_BACKEND = "azure"`).
+
+`AzureVectorStore` extiende `AzureSearch` de LangChain para realizar búsquedas híbridas
+(semánticas + léxicas) sobre un índice existente, devolviendo además la similitud coseno
+de cada resultado sin re-embeber su texto. Las búsquedas síncronas usan el
+`SearchClient` compartido de `modules.clients` y las asíncronas, el `SearchClient`
+asíncrono del bucle de eventos en curso.
+
+Este módulo importa `langchain_community` y el SDK de Azure Search, por lo que solo se
+carga al construir el vector store (ver `modules.vector`).
+"""
+
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import numpy as np
+from azure.search.documents import SearchClient
+from langchain_community.vectorstores import AzureSearch
+from langchain_community.vectorstores.azuresearch import (
+    FIELDS_CONTENT,
+    FIELDS_CONTENT_VECTOR,
+)
+from langchain_core.documents import Document
+
+from modules.clients import get_async_search_client
+from modules.similarity import cosine_similarities
+
+
+class AzureVectorStore(AzureSearch):
+    """
+    Almacén vectorial de Azure Cognitive Search que devuelve la similitud coseno de cada
+    resultado.
+
+    El índice ya guarda el embedding de cada sección en el campo `content_vector`
+    (escrito por `uploader.py`), por lo que no es necesario volver a embeber el texto de
+    los documentos recuperados para aplicar el umbral de relevancia: basta con pedir el
+    vector junto al resultado o, en búsquedas puramente vectoriales, convertir la
+    puntuación del propio motor.
+
+    Ofrece variantes asíncronas (`aembedding_function`,
+    `asimilarity_search_with_vectors`) basadas en el cliente asíncrono de Azure Search y
+    en `aembed_query` del modelo de embeddings. El cliente asíncrono (`async_client`) es
+    el del bucle de eventos en curso (`get_async_search_client`), no el que crea
+    `AzureSearch` al construirse.
+
+    Si se pasa `search_client`, sustituye al cliente síncrono que crea `AzureSearch`, de
+    modo que las búsquedas comparten el pool de conexiones del resto del proceso.
+    """
+
+    # Campos devueltos cuando se solicitan los vectores almacenados
+    SELECT_FIELDS = [
+        "id",
+        "title",
+        "section",
+        "category",
+        "source",
+        FIELDS_CONTENT,
+        FIELDS_CONTENT_VECTOR,
+    ]
+
+    def __init__(
+        self,
+        *args,
+        async_embedding_function: Optional[
+            Callable[[str], Awaitable[List[float]]]
+        ] = None,
+        search_client: Optional[SearchClient] = None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.async_embedding_function = async_embedding_function
+        if search_client is not None:
+            self.client = search_client
+
+    @property
+    def async_client(self):
+        """
+        `SearchClient` asíncrono del bucle de eventos en curso (`None` fuera de él).
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+        return get_async_search_client(self._index_name)
+
+    @async_client.setter
+    def async_client(self, client) -> None:
+        # `AzureSearch` crea un único cliente asíncrono, que quedaría ligado al primer
+        # bucle que lo use: se usa en su lugar el cliente por bucle de `modules.clients`
+        pass
+
+    def __del__(self) -> None:
+        # Los clientes son compartidos (ver `modules.clients`): no se cierran aquí
+        pass
+
+    async def aembedding_function(self, text: str) -> List[float]:
+        """
+        Calcula de forma asíncrona el embedding de un texto.
+
+        Si no se configuró `async_embedding_function`, ejecuta la función síncrona en un
+        hilo.
+
+        Args:
+            text (str): Texto a embeber.
+
+        Returns:
+            List[float]: Embedding del texto.
+        """
+        if self.async_embedding_function is not None:
+            return await self.async_embedding_function(text)
+        return await asyncio.to_thread(self.embedding_function, text)
+
+    def similarity_search_with_vectors(
+        self,
+        query: str,
+        embedding: List[float],
+        k: int = 4,
+        filters: Optional[str] = None,
+        use_stored_vectors: bool = True,
+        categories: Optional[List[str]] = None,
+    ) -> Tuple[List[Document], np.ndarray]:
+        """
+        Busca los documentos más cercanos a la consulta y calcula su similitud coseno
+        localmente.
+
+        La similitud de todos los candidatos se calcula de una vez con un producto
+        matriz-vector sobre los vectores normalizados (ver `modules.similarity`).
+
+        - Con `use_stored_vectors=True` se respeta el `search_type` del almacén (híbrido
+          por defecto) y se solicita el campo `content_vector` de cada resultado para
+          comparar con `embedding`.
+        - Con `use_stored_vectors=False` se realiza una búsqueda puramente vectorial y
+          la similitud se deriva de `@search.score`, sin transferir los vectores.
+
+        Args:
+            query (str): Texto de la consulta (usado en la parte léxica de la búsqueda
+                híbrida).
+            embedding (List[float]): Embedding ya calculado de la consulta.
+            k (int): Número máximo de documentos a devolver.
+            filters (str | None): Expresión OData opcional de filtrado.
+            use_stored_vectors (bool): Si se usan los vectores almacenados o la
+                puntuación del motor.
+            categories (List[str] | None): Si se indica, solo se devuelven secciones con
+                alguna de estas categorías; el filtro se envía a Azure Search junto a la
+                consulta.
+
+        Returns:
+            Tuple[List[Document], np.ndarray]: Documentos recuperados y array `float32`
+            con la similitud coseno de cada uno con la consulta (en el mismo orden).
+        """
+        results = self._simple_search(
+            embedding,
+            **self._search_kwargs(query, k, filters, use_stored_vectors, categories),
+        )
+        return self._results_with_similarity(
+            list(results), embedding, use_stored_vectors
+        )
+
+    async def asimilarity_search_with_vectors(
+        self,
+        query: str,
+        embedding: List[float],
+        k: int = 4,
+        filters: Optional[str] = None,
+        use_stored_vectors: bool = True,
+        categories: Optional[List[str]] = None,
+    ) -> Tuple[List[Document], np.ndarray]:
+        """
+        Variante asíncrona de `similarity_search_with_vectors` (cliente asíncrono de
+        Azure Search).
+
+        Args:
+            query (str): Texto de la consulta (usado en la parte léxica de la búsqueda
+                híbrida).
+            embedding (List[float]): Embedding ya calculado de la consulta.
+            k (int): Número máximo de documentos a devolver.
+            filters (str | None): Expresión OData opcional de filtrado.
+            use_stored_vectors (bool): Si se usan los vectores almacenados o la
+                puntuación del motor.
+            categories (List[str] | None): Categorías admitidas (filtro en el servidor).
+
+        Returns:
+            Tuple[List[Document], np.ndarray]: Documentos recuperados y su similitud
+            coseno.
+        """
+        results = await self._asimple_search(
+            embedding,
+            **self._search_kwargs(query, k, filters, use_stored_vectors, categories),
+        )
+        results = [result async for result in results]
+        return self._results_with_similarity(results, embedding, use_stored_vectors)
+
+    def _search_kwargs(
+        self,
+        query: str,
+        k: int,
+        filters: Optional[str],
+        use_stored_vectors: bool,
+        categories: Optional[List[str]] = None,
+    ) -> dict:
+        """
+        Construye los parámetros de búsqueda comunes a las variantes síncrona y
+        asíncrona.
+
+        Sin vectores almacenados (`use_stored_vectors=False`) la consulta es siempre
+        puramente vectorial (`text_query="*"`, sin ranking semántico): es el único caso
+        en que `@search.score` se puede convertir en similitud coseno (ver
+        `score_to_cosine`).
+        """
+        if categories:
+            category_filter = self.category_filter(categories)
+            filters = (
+                f"({filters}) and {category_filter}" if filters else category_filter
+            )
+
+        if use_stored_vectors:
+            text_query = query if self.search_type == "hybrid" else "*"
+            return {
+                "text_query": text_query,
+                "k": k,
+                "filters": filters,
+                "select": self.SELECT_FIELDS,
+            }
+        return {"text_query": "*", "k": k, "filters": filters}
+
+    def _results_with_similarity(
+        self, results: List[dict], embedding: List[float], use_stored_vectors: bool
+    ) -> Tuple[List[Document], np.ndarray]:
+        """
+        Convierte los resultados de Azure Search en documentos y calcula su similitud en
+        bloque.
+
+        Raises:
+            ValueError: Si faltan vectores almacenados en una búsqueda híbrida (su
+                puntuación no es una similitud coseno) o si la puntuación no procede de
+                una consulta vectorial con métrica coseno.
+        """
+        docs, doc_vectors, scores = [], [], []
+        for result in results:
+            doc_vectors.append(result.get(FIELDS_CONTENT_VECTOR))
+            scores.append(result["@search.score"])
+
+            metadata = {
+                key: value
+                for key, value in result.items()
+                if key not in (FIELDS_CONTENT, FIELDS_CONTENT_VECTOR)
+                and not key.startswith("@")
+            }
+            docs.append(
+                Document(page_content=result[FIELDS_CONTENT], metadata=metadata)
+            )
+
+        if use_stored_vectors and all(v is not None for v in doc_vectors):
+            similarities = cosine_similarities(embedding, doc_vectors)
+        elif use_stored_vectors and self.search_type == "hybrid":
+            raise ValueError(
+                f"❌ El índice no devuelve '{FIELDS_CONTENT_VECTOR}' y la puntuación "
+                "de una búsqueda híbrida no es una similitud coseno; marca el campo "
+                "como recuperable o usa RETRIEVER_SIMILARITY_SOURCE = 'score'."
+            )
+        elif any("@search.reranker_score" in result for result in results):
+            raise ValueError(
+                "❌ La puntuación incluye ranking semántico y no es una similitud "
+                "coseno."
+            )
+        else:
+            similarities = self.score_to_cosine(np.asarray(scores, dtype=np.float32))
+
+        return docs, similarities
+
+    @staticmethod
+    def category_filter(categories: List[str]) -> str:
+        """
+        Traduce una lista de categorías a un filtro OData sobre el campo colección
+        `category`.
+
+        Se usa `search.in` con `|` como delimitador, ya que las categorías pueden
+        contener espacios; las comillas simples se escapan duplicándolas.
+
+        Args:
+            categories (List[str]): Categorías admitidas (tal y como están indexadas).
+
+        Returns:
+            str: Expresión OData, p. ej.
+            `category/any(c: search.in(c, 'Naturaleza|Playas', '|'))`.
+        """
+        values = "|".join(category.replace("'", "''") for category in categories)
+        return f"category/any(c: search.in(c, '{values}', '|'))"
+
+    @staticmethod
+    def score_to_cosine(score: float | np.ndarray) -> float | np.ndarray:
+        """
+        Convierte la puntuación `@search.score` de una consulta vectorial con métrica
+        coseno en la similitud coseno original.
+
+        Azure Search puntúa como `1 / (1 + distancia)`, siendo `distancia = 1 - coseno`.
+        La conversión solo es válida para consultas puramente vectoriales sobre un campo
+        con métrica coseno: las búsquedas híbridas (fusión RRF) o con ranking semántico
+        puntúan en otra escala. Con métrica coseno la puntuación está en [1/3, 1]; fuera
+        de ese rango se rechaza en lugar de devolver una similitud errónea.
+
+        Args:
+            score (float | np.ndarray): Puntuación (o array de puntuaciones) devuelta
+                por Azure Search.
+
+        Returns:
+            float | np.ndarray: Similitud coseno equivalente.
+
+        Raises:
+            ValueError: Si alguna puntuación está fuera del rango de la métrica coseno.
+        """
+        scores = np.asarray(score)
+        if scores.size and (scores.min() < 1 / 3 - 1e-6 or scores.max() > 1 + 1e-6):
+            raise ValueError(
+                "❌ @search.score fuera de [1/3, 1]: la consulta no es puramente "
+                "vectorial con métrica coseno."
+            )
+        return 2.0 - 1.0 / score
@@ -0,0 +1,134 @@
+"""
+Registro de categorías temáticas con representación compacta en máscaras de bits.
+
+Las categorías de las secciones (`SECTION_TO_CATEGORIES`) y los intereses seleccionables
+en la interfaz (`ui_options.yaml`) se registran una única vez, asignando a cada
+categoría una posición de bit. Así, el conjunto de categorías de una sección o de los
+intereses de un usuario se representa con un entero, y las comprobaciones de
+coincidencia y cobertura se reducen a operaciones AND/OR y recuento de bits, en lugar de
+comparar listas de cadenas en minúsculas.
+
+Las posiciones se asignan en orden de aparición (primero `SECTION_TO_CATEGORIES`,
+después los intereses de la interfaz), sin distinguir mayúsculas.
+
+Expone:
+- `CategoryRegistry`: registro de categorías y conversión entre nombres y máscaras.
+- `category_registry`: instancia construida desde `config` en su primer uso (`Lazy`), de
+  modo que importar este módulo no lee `ui_options.yaml`.
+"""
+
+from typing import Dict, Iterable, List
+
+import numpy as np
+import yaml
+
+from config.config import SECTION_TO_CATEGORIES, UI_OPTIONS_PATH
+from modules.lazy import Lazy
+
+# Las máscaras se almacenan en arrays `int64` de NumPy: se reserva el bit de signo
+MAX_CATEGORIES = 63
+
+
+class CategoryRegistry:
+    """
+    Registro inmutable de categorías con una posición de bit por categoría.
+
+    Atributos:
+        names (List[str]): Nombres canónicos (tal y como están indexados), por posición
+            de bit.
+    """
+
+    def __init__(self, names: Iterable[str]):
+        self.names: List[str] = []
+        self._bits: Dict[str, int] = {}
+
+        for name in names:
+            key = name.strip().lower()
+            if key and key not in self._bits:
+                self._bits[key] = len(self.names)
+                self.names.append(name.strip())
+
+        if len(self.names) > MAX_CATEGORIES:
+            raise ValueError(
+                f"❌ Demasiadas categorías ({len(self.names)}); "
+                f"el máximo es {MAX_CATEGORIES}"
+            )
+
+    @classmethod
+    def from_config(cls) -> "CategoryRegistry":
+        """
+        Construye el registro a partir de `SECTION_TO_CATEGORIES` y de los intereses de
+        la interfaz.
+
+        Returns:
+            CategoryRegistry: Registro con todas las categorías conocidas.
+        """
+        with open(UI_OPTIONS_PATH, "r", encoding="utf-8") as f:
+            ui_interests = yaml.safe_load(f).get("intereses", [])
+
+        section_categories = [
+            category
+            for categories in SECTION_TO_CATEGORIES.values()
+            for category in categories
+        ]
+        return cls(section_categories + ui_interests)
+
+    def canonical(self, name: str) -> str:
+        """
+        Devuelve el nombre indexado de una categoría (o el propio nombre si no está
+        registrada).
+
+        Args:
+            name (str): Nombre en cualquier combinación de mayúsculas.
+
+        Returns:
+            str: Nombre canónico.
+        """
+        bit = self._bits.get(name.strip().lower())
+        return name if bit is None else self.names[bit]
+
+    def mask(self, names: Iterable[str]) -> int:
+        """
+        Convierte una colección de categorías en su máscara de bits (se ignoran las
+        desconocidas).
+
+        Args:
+            names (Iterable[str]): Nombres de categorías.
+
+        Returns:
+            int: Máscara con un bit activo por categoría registrada.
+        """
+        mask = 0
+        for name in names or []:
+            bit = self._bits.get(name.strip().lower())
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def masks(self, category_lists: Iterable[Iterable[str]]) -> np.ndarray:
+        """
+        Calcula la máscara de cada lista de categorías como un array `int64`.
+
+        Args:
+            category_lists (Iterable[Iterable[str]]): Categorías de cada sección.
+
+        Returns:
+            np.ndarray: Máscara de cada sección, en el mismo orden.
+        """
+        return np.array([self.mask(names) for names in category_lists], dtype=np.int64)
+
+    def names_for(self, mask: int) -> List[str]:
+        """
+        Convierte una máscara en la lista de nombres canónicos de sus categorías.
+
+        Args:
+            mask (int): Máscara de bits.
+
+        Returns:
+            List[str]: Categorías activas, por posición de bit.
+        """
+        return [name for bit, name in enumerate(self.names) if mask >> bit & 1]
+
+
+# Se construye en el primer uso (ver `modules.lazy`)
+category_registry = Lazy(CategoryRegistry.from_config)
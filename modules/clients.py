@@ -0,0 +1,201 @@
+"""
+Clientes HTTP compartidos para Azure Cognitive Search y Azure OpenAI.
+
+Crear un `SearchClient` o un cliente de OpenAI por llamada obliga a abrir una conexión
+nueva (DNS, TCP y handshake TLS) en cada petición, lo que supone una parte apreciable de
+la latencia frente a Azure. Este módulo crea cada cliente una única vez por proceso,
+sobre un pool de conexiones persistentes (keep-alive) dimensionado, con tiempos de
+espera y política de reintentos tomados de `config` (`HTTP_*`). Los pools mantienen
+conexiones separadas por endpoint, de modo que un mismo cliente HTTP sirve a la vez para
+generación y embeddings.
+
+Los clientes asíncronos quedan ligados al bucle de eventos en el que abren sus
+conexiones, así que no se comparten en todo el proceso sino por bucle (`LazyPerLoop`):
+cada `asyncio.run` (o cada hilo con su propio bucle) recibe los suyos.
+
+Expone:
+- `get_search_client`: `SearchClient` compartido para un índice (por defecto,
+  `INDEX_NAME`).
+- `search_client_options`: opciones de reintento y tiempo de espera para clientes de
+  Azure Search construidos por terceros (p. ej. `AzureSearch` de LangChain).
+- `get_async_search_client`: `SearchClient` asíncrono del bucle de eventos en curso.
+- `get_http_client` / `get_async_http_client`: clientes `httpx` compartidos para Azure
+  OpenAI (el asíncrono, uno por bucle de eventos).
+"""
+
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+import requests
+from azure.core.credentials import AzureKeyCredential
+from azure.core.pipeline.transport import RequestsTransport
+from azure.search.documents import SearchClient
+
+from config.config import (
+    AZURE_SEARCH_ENDPOINT,
+    AZURE_SEARCH_KEY,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP_MAX_RETRIES,
+    HTTP_READ_TIMEOUT,
+    HTTP_RETRY_BACKOFF,
+    INDEX_NAME,
+)
+from modules.lazy import LazyPerLoop
+
+# `httpx` solo lo usan los clientes de Azure OpenAI: se importa al crearlos, de modo
+# que los procesos que solo usan Azure Search (p. ej. `deleter.py`) no lo cargan
+if TYPE_CHECKING:
+    import httpx
+    from azure.search.documents.aio import SearchClient as AsyncSearchClient
+
+
+# ---------- AZURE COGNITIVE SEARCH ----------
+def search_client_options() -> dict:
+    """
+    Opciones de la pipeline de `azure-core` (reintentos y tiempos de espera) según
+    `config`.
+
+    Returns:
+        dict: Argumentos adicionales para `SearchClient` / `AsyncSearchClient`.
+    """
+    return {
+        "retry_total": HTTP_MAX_RETRIES,
+        "retry_backoff_factor": HTTP_RETRY_BACKOFF,
+        "connection_timeout": HTTP_CONNECT_TIMEOUT,
+        "read_timeout": HTTP_READ_TIMEOUT,
+    }
+
+
+@lru_cache(maxsize=None)
+def _search_session() -> requests.Session:
+    """
+    Sesión `requests` con un pool de conexiones persistentes hacia Azure Search.
+
+    Los reintentos los gestiona la pipeline de `azure-core`, no el adaptador.
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        pool_maxsize=HTTP_MAX_CONNECTIONS,
+        max_retries=0,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+@lru_cache(maxsize=None)
+def get_search_client(index_name: str = INDEX_NAME) -> SearchClient:
+    """
+    Devuelve el `SearchClient` compartido del índice indicado, creándolo la primera vez.
+
+    El cliente es seguro para su uso desde varios hilos y no debe cerrarse (ni usarse
+    con `with`), ya que comparte la sesión HTTP con el resto del proceso.
+
+    Args:
+        index_name (str): Nombre del índice de Azure Search.
+
+    Returns:
+        SearchClient: Cliente autenticado con la clave de administración.
+    """
+    return SearchClient(
+        endpoint=AZURE_SEARCH_ENDPOINT,
+        index_name=index_name,
+        credential=AzureKeyCredential(AZURE_SEARCH_KEY),
+        transport=RequestsTransport(session=_search_session(), session_owner=False),
+        **search_client_options(),
+    )
+
+
+def _build_async_search_client(index_name: str) -> "AsyncSearchClient":
+    from azure.search.documents.aio import SearchClient as AsyncSearchClient
+
+    return AsyncSearchClient(
+        endpoint=AZURE_SEARCH_ENDPOINT,
+        index_name=index_name,
+        credential=AzureKeyCredential(AZURE_SEARCH_KEY),
+        **search_client_options(),
+    )
+
+
+@lru_cache(maxsize=None)
+def _async_search_clients(index_name: str) -> LazyPerLoop:
+    return LazyPerLoop(lambda: _build_async_search_client(index_name))
+
+
+def get_async_search_client(index_name: str = INDEX_NAME) -> "AsyncSearchClient":
+    """
+    Devuelve el `SearchClient` asíncrono del índice para el bucle de eventos en curso.
+
+    Args:
+        index_name (str): Nombre del índice de Azure Search.
+
+    Returns:
+        AsyncSearchClient: Cliente autenticado con la clave de administración.
+
+    Raises:
+        RuntimeError: Si se llama fuera de un bucle de eventos en ejecución.
+    """
+    return _async_search_clients(index_name).resolve()
+
+
+# ---------- AZURE OPENAI ----------
+def _limits() -> "httpx.Limits":
+    import httpx
+
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+
+
+def http_timeout() -> "httpx.Timeout":
+    """
+    Tiempos de espera de las peticiones a Azure OpenAI según `config`.
+
+    Returns:
+        httpx.Timeout: Tiempo de lectura `HTTP_READ_TIMEOUT` y de conexión
+        `HTTP_CONNECT_TIMEOUT`.
+    """
+    import httpx
+
+    return httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+
+
+@lru_cache(maxsize=None)
+def get_http_client() -> "httpx.Client":
+    """
+    Devuelve el cliente `httpx` síncrono compartido por los clientes de Azure OpenAI.
+
+    Returns:
+        httpx.Client: Cliente con pool de conexiones persistentes.
+    """
+    import httpx
+
+    return httpx.Client(limits=_limits(), timeout=http_timeout())
+
+
+def _build_async_http_client() -> "httpx.AsyncClient":
+    import httpx
+
+    return httpx.AsyncClient(limits=_limits(), timeout=http_timeout())
+
+
+_async_http_clients = LazyPerLoop(_build_async_http_client)
+
+
+def get_async_http_client() -> "httpx.AsyncClient":
+    """
+    Devuelve el cliente `httpx` asíncrono de Azure OpenAI del bucle de eventos en curso.
+
+    Returns:
+        httpx.AsyncClient: Cliente con pool de conexiones persistentes.
+
+    Raises:
+        RuntimeError: Si se llama fuera de un bucle de eventos en ejecución.
+    """
+    return _async_http_clients.resolve()
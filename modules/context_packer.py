@@ -0,0 +1,179 @@
+"""
+Empaquetado del contexto recuperado dentro de un presupuesto de tokens.
+
+El retriever devuelve todas las secciones que superan el umbral de similitud, sin límite
+de tamaño. Este módulo selecciona cuáles entran en el prompt del LLM, midiendo cada una
+con la misma codificación `tiktoken` (`encoding`) que el resto del sistema:
+
+1. Elimina secciones duplicadas o casi duplicadas (solapamiento de tokens, índice de
+   Jaccard).
+2. Ordena de forma voraz por similitud con la consulta más una bonificación por los
+   intereses del usuario que la sección cubre y que aún no cubre ninguna sección
+   elegida.
+3. Añade secciones mientras quepan en el presupuesto; opcionalmente, trunca la primera
+   que no cabe si queda espacio suficiente.
+
+Expone:
+- `pack_context`: devuelve el contexto en Markdown, las secciones incluidas y los tokens
+  usados.
+"""
+
+from typing import List, Tuple
+
+from modules.prompt_utils import encoding
+
+# Separador entre secciones del contexto
+SECTION_SEPARATOR = "\n\n"
+TRUNCATION_MARK = " […]"
+
+
+def format_section(section: dict, content: str = None) -> str:
+    """
+    Formatea una sección como bloque Markdown del contexto.
+
+    Args:
+        section (dict): Sección con `"title"`, `"section"` y `"content"`.
+        content (str | None): Contenido alternativo (por ejemplo, truncado).
+
+    Returns:
+        str: Bloque `## título > sección` seguido del contenido.
+    """
+    body = section["content"] if content is None else content
+    return f"## {section['title']} > {section['section']}\n\n{body}"
+
+
+def pack_context(
+    sections: List[dict],
+    max_tokens: int,
+    interests_mask: int = 0,
+    interest_weight: float = 0.1,
+    dedupe_threshold: float = 0.8,
+    truncate: bool = True,
+    min_truncated_tokens: int = 64,
+) -> Tuple[str, List[dict], int]:
+    """
+    Selecciona y formatea las secciones que caben en un presupuesto de tokens.
+
+    Args:
+        sections (List[dict]): Secciones candidatas con `"title"`, `"section"`,
+            `"content"`, `"similarity"` y, opcionalmente, `"category_mask"` y
+            `"block_tokens"` (tokens del bloque ya formateado, para no volver a
+            codificarlo; ver `run_prompt_batch`).
+        max_tokens (int): Presupuesto máximo de tokens del contexto.
+        interests_mask (int): Máscara de bits de los intereses del usuario.
+        interest_weight (float): Bonificación por cada fracción de intereses nuevos
+            cubiertos.
+        dedupe_threshold (float): Índice de Jaccard de tokens a partir del cual dos
+            secciones se consideran duplicadas (se conserva la más similar). 0 desactiva
+            la deduplicación.
+        truncate (bool): Si se trunca la primera sección que no cabe entera.
+        min_truncated_tokens (int): Mínimo de tokens de contenido para incluir una
+            sección truncada.
+
+    Returns:
+        Tuple[str, List[dict], int]: Contexto en Markdown, secciones incluidas (en
+        orden) y número de tokens del contexto.
+    """
+    candidates = []
+    for section in sorted(sections, key=lambda s: s["similarity"], reverse=True):
+        tokens = section.get("block_tokens")
+        if tokens is None:
+            tokens = encoding.encode(format_section(section))
+        token_set = set(tokens)
+
+        # Las secciones casi idénticas a otra más similar ya elegida se descartan
+        if dedupe_threshold > 0 and any(
+            _jaccard(token_set, other["token_set"]) >= dedupe_threshold
+            for other in candidates
+        ):
+            continue
+        candidates.append(
+            {"section": section, "tokens": len(tokens), "token_set": token_set}
+        )
+
+    separator_tokens = len(encoding.encode(SECTION_SEPARATOR))
+    interest_count = interests_mask.bit_count()
+
+    blocks, packed, used, covered = [], [], 0, 0
+    while candidates:
+        # Selección voraz: similitud + bonificación por intereses aún no cubiertos
+        best = max(
+            candidates,
+            key=lambda c: _score(
+                c["section"], interests_mask, covered, interest_count, interest_weight
+            ),
+        )
+        candidates.remove(best)
+
+        cost = best["tokens"] + (separator_tokens if blocks else 0)
+        section = best["section"]
+
+        if used + cost <= max_tokens:
+            blocks.append(format_section(section))
+        elif truncate:
+            block = _truncated_block(
+                section,
+                max_tokens - used - (cost - best["tokens"]),
+                min_truncated_tokens,
+            )
+            if block is None:
+                continue
+            blocks.append(block)
+            packed.append(section)
+            break
+        else:
+            continue
+
+        packed.append(section)
+        used += cost
+        covered |= section.get("category_mask") or 0
+
+    context = SECTION_SEPARATOR.join(blocks)
+    return context, packed, len(encoding.encode(context))
+
+
+def _score(
+    section: dict,
+    interests_mask: int,
+    covered: int,
+    interest_count: int,
+    interest_weight: float,
+) -> float:
+    """
+    Puntuación de una sección: similitud más la fracción de intereses nuevos que cubre.
+    """
+    if not interest_count:
+        return section["similarity"]
+
+    mask = section.get("category_mask") or 0
+    new_bits = (mask & interests_mask & ~covered).bit_count()
+    return section["similarity"] + interest_weight * new_bits / interest_count
+
+
+def _truncated_block(
+    section: dict, available_tokens: int, min_truncated_tokens: int
+) -> str | None:
+    """
+    Formatea una sección recortando su contenido para que ocupe como mucho
+    `available_tokens`.
+
+    Returns:
+        str | None: Bloque truncado o `None` si no queda espacio para
+        `min_truncated_tokens`.
+    """
+    overhead = len(encoding.encode(format_section(section, content=TRUNCATION_MARK)))
+    content_tokens = available_tokens - overhead
+    if content_tokens < min_truncated_tokens:
+        return None
+
+    content = encoding.decode(encoding.encode(section["content"])[:content_tokens])
+    return format_section(section, content=content.rstrip() + TRUNCATION_MARK)
+
+
+def _jaccard(a: set, b: set) -> float:
+    """
+    Índice de Jaccard entre dos conjuntos de tokens.
+    """
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
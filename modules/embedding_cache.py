@@ -0,0 +1,282 @@
+"""
+Caché persistente de embeddings direccionada por contenido.
+
+Este módulo evita volver a solicitar a Azure OpenAI el embedding de textos ya vistos. Es
+compartido por el uploader, el retriever y el evaluador a través del objeto `embeddings`
+de `modules.vector`.
+
+Componentes:
+- `EmbeddingCache`: almacén en SQLite donde cada vector se guarda como blob `float32`,
+  indexado por el hash de (despliegue, versión de la API, texto normalizado). Aplica una
+  política de expulsión LRU limitada por número de entradas.
+- `CachedEmbeddings`: envoltorio compatible con `langchain_core.embeddings.Embeddings`
+  que consulta la caché antes de delegar en el modelo real (`embed_query` /
+  `embed_documents`). En las variantes asíncronas, las lecturas y escrituras de SQLite
+  se ejecutan en un hilo (`asyncio.to_thread`) para no bloquear el bucle de eventos.
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normaliza un texto antes de calcular su clave en la caché.
+
+    Aplica normalización Unicode NFC, elimina espacios en los extremos y colapsa
+    secuencias de espacios en blanco en un único espacio.
+
+    Args:
+        text (str): Texto original.
+
+    Returns:
+        str: Texto normalizado.
+    """
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+class EmbeddingCache:
+    """
+    Caché de embeddings en disco basada en SQLite con expulsión LRU.
+
+    Atributos:
+        path (str): Ruta del fichero SQLite.
+        max_entries (int): Número máximo de vectores almacenados antes de expulsar los
+            menos usados.
+    """
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_last_access ON embeddings (last_access)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(namespace: str, text: str) -> str:
+        """
+        Calcula la clave de un texto dentro de un espacio de nombres (despliegue y
+        versión de la API).
+
+        Args:
+            namespace (str): Identificador del modelo de embeddings.
+            text (str): Texto a embeber.
+
+        Returns:
+            str: Hash SHA-256 en hexadecimal.
+        """
+        payload = f"{namespace}\x00{normalize_text(text)}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        """
+        Recupera los vectores almacenados para un conjunto de claves y actualiza su
+        último acceso.
+
+        Args:
+            keys (Iterable[str]): Claves a consultar.
+
+        Returns:
+            Dict[str, List[float]]: Vectores encontrados, indexados por clave.
+        """
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        if not keys:
+            return found
+
+        with self._lock:
+            # SQLite limita el número de parámetros por consulta
+            for i in range(0, len(keys), 500):
+                chunk = keys[i : i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                self._conn.commit()
+
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]):
+        """
+        Guarda varios vectores en la caché y expulsa las entradas menos usadas si se
+        supera el límite.
+
+        Args:
+            items (Dict[str, List[float]]): Vectores a guardar, indexados por clave.
+        """
+        if not items:
+            return
+
+        now = time.time()
+        rows = [
+            (key, np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for key, vector in items.items()
+        ]
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_access) "
+                "VALUES (?, ?, ?)",
+                rows,
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN ("
+                    "SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            self._conn.commit()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Envoltorio de un modelo de embeddings que reutiliza los vectores guardados en
+    `EmbeddingCache`.
+
+    Solo los textos ausentes de la caché (deduplicados) se envían al modelo subyacente.
+
+    Atributos:
+        embeddings (Embeddings): Modelo de embeddings real (por ejemplo,
+            `AzureOpenAIEmbeddings`).
+        cache (EmbeddingCache): Caché persistente compartida.
+        namespace (str): Identificador del despliegue y la versión de la API usados en
+            las claves.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, namespace: str):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.namespace = namespace
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Devuelve los embeddings de varios textos, consultando primero la caché.
+
+        Args:
+            texts (List[str]): Textos a embeber.
+
+        Returns:
+            List[List[float]]: Embeddings en el mismo orden que `texts`.
+        """
+        keys, vectors, missing = self._lookup(texts)
+        if missing:
+            computed = self.embeddings.embed_documents(list(missing.values()))
+            vectors.update(self._store(missing, computed))
+
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Devuelve el embedding de una consulta, consultando primero la caché.
+
+        Args:
+            text (str): Texto de la consulta.
+
+        Returns:
+            List[float]: Embedding del texto.
+        """
+        (key,), vectors, missing = self._lookup([text])
+        if missing:
+            computed = [self.embeddings.embed_query(text)]
+            vectors.update(self._store(missing, computed))
+
+        return vectors[key]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Variante asíncrona de `embed_documents`.
+
+        Args:
+            texts (List[str]): Textos a embeber.
+
+        Returns:
+            List[List[float]]: Embeddings en el mismo orden que `texts`.
+        """
+        keys, vectors, missing = await asyncio.to_thread(self._lookup, texts)
+        if missing:
+            computed = await self.embeddings.aembed_documents(list(missing.values()))
+            vectors.update(await asyncio.to_thread(self._store, missing, computed))
+
+        return [vectors[key] for key in keys]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """
+        Variante asíncrona de `embed_query`.
+
+        Args:
+            text (str): Texto de la consulta.
+
+        Returns:
+            List[float]: Embedding del texto.
+        """
+        (key,), vectors, missing = await asyncio.to_thread(self._lookup, [text])
+        if missing:
+            computed = [await self.embeddings.aembed_query(text)]
+            vectors.update(await asyncio.to_thread(self._store, missing, computed))
+
+        return vectors[key]
+
+    def _lookup(
+        self, texts: List[str]
+    ) -> Tuple[List[str], Dict[str, List[float]], Dict[str, str]]:
+        """
+        Calcula las claves de los textos y separa los vectores en caché de los
+        pendientes.
+
+        Returns:
+            Tuple: Claves en orden, vectores encontrados y textos pendientes (sin
+            duplicados).
+        """
+        keys = [self.cache.make_key(self.namespace, text) for text in texts]
+        vectors = self.cache.get_many(keys)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+
+        return keys, vectors, missing
+
+    def _store(
+        self, missing: Dict[str, str], computed: List[List[float]]
+    ) -> Dict[str, List[float]]:
+        """
+        Guarda en la caché los vectores recién calculados para los textos pendientes.
+        """
+        new_vectors = dict(zip(missing.keys(), computed))
+        self.cache.put_many(new_vectors)
+        return new_vectors
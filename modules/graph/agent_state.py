@@ -13,10 +13,30 @@ Campos:
 - last_node (str): Último nodo ejecutado en el flujo (por ejemplo, "consulta" o "llm").
 - retrieved_docs (List[dict]): Lista de documentos relevantes recuperados,
   con el formato "título#sección".
+- query_embedding (List[float]): Embedding de la entrada del usuario, calculado una sola
+  vez por ejecución y reutilizado en la búsqueda vectorial, el umbral de similitud y la
+  evaluación.
+- stream (bool): Si la respuesta del LLM debe emitirse en streaming (modo `"custom"` de
+  LangGraph).
+- cache_hit (bool): Si la respuesta se ha obtenido de la caché de respuestas.
+- cache_refresh (bool): Si se ignora la respuesta cacheada para volver a generarla.
+- cache_embedding (List[float]): Embedding del texto libre del prompt, usado por el
+  nivel semántico de la caché de respuestas.
+- retriever_k (int): Número de documentos a recuperar para esta consulta (sustituye al K
+  adaptativo).
+- similarity_threshold (float): Umbral de similitud para esta consulta (sustituye a
+  `SIMILARITY_THRESHOLD`).
+- context_sections (List[dict]): Secciones recuperadas (título, sección, contenido,
+  similitud y máscara de categorías) que el controlador empaqueta dentro del presupuesto
+  de tokens.
+- context_tokens (int): Tokens del contexto finalmente incluido en el prompt.
+- node_metrics (List[dict]): Métricas de cada nodo ejecutado (tiempo, llamadas externas,
+  tokens y caché). Cada nodo añade su registro a la lista (reductor `operator.add`), ver
+  `modules.instrumentation`.
 """
 
-
-from typing import List, TypedDict
+import operator
+from typing import Annotated, List, TypedDict
 
 
 class AgentState(TypedDict, total=False):
@@ -28,10 +48,30 @@ class AgentState(TypedDict, total=False):
         response (str | None): Respuesta generada o contexto recuperado.
         last_node (str | None): Nombre del último nodo ejecutado.
         retrieved_docs (List[dict] | None): Documentos relevantes recuperados".
+        query_embedding (List[float] | None): Embedding de la entrada del usuario.
+        stream (bool | None): Si la respuesta del LLM se emite en streaming.
+        cache_hit (bool | None): Si la respuesta procede de la caché de respuestas.
+        cache_refresh (bool | None): Si se ignora la caché para regenerar la respuesta.
+        cache_embedding (List[float] | None): Embedding del texto libre del prompt.
+        retriever_k (int | None): K de la búsqueda para esta consulta (opcional).
+        similarity_threshold (float | None): Umbral de similitud para esta consulta
+            (opcional).
+        context_sections (List[dict] | None): Secciones candidatas para el contexto.
+        context_tokens (int | None): Tokens del contexto incluido en el prompt.
+        node_metrics (List[dict] | None): Métricas acumuladas de los nodos ejecutados.
     """
 
     input: str
     response: str = None
     last_node: str = None
     retrieved_docs: List[dict] = None
-
+    query_embedding: List[float] = None
+    stream: bool = None
+    cache_hit: bool = None
+    cache_refresh: bool = None
+    cache_embedding: List[float] = None
+    retriever_k: int = None
+    similarity_threshold: float = None
+    context_sections: List[dict] = None
+    context_tokens: int = None
+    node_metrics: Annotated[List[dict], operator.add] = None
@@ -2,33 +2,52 @@
 Construcción del flujo principal del sistema usando LangGraph.
 
 Este módulo define el grafo de agentes que implementa el flujo RAG (Retrieval-Augmented Generation)
-para planificación de viajes. Coordina tres agentes principales:
+para planificación de viajes. Coordina cuatro agentes principales:
 
-1. `ControllerAgent`: Decide el siguiente paso en el flujo.
-2. `RetrieverAgent`: Recupera contexto relevante desde el vector store.
-3. `LLMAgent`: Genera la respuesta final usando un modelo LLM desplegado en Azure OpenAI.
+1. `CacheAgent`: Resuelve la petición desde la caché de respuestas si es posible.
+2. `ControllerAgent`: Decide el siguiente paso en el flujo.
+3. `RetrieverAgent`: Recupera contexto relevante desde el vector store.
+4. `LLMAgent`: Genera la respuesta final usando un modelo LLM desplegado en Azure
+   OpenAI.
 
 El grafo sigue el siguiente esquema:
 
-    controlador ──▶ (consulta ──▶ controlador)* ──▶ llm ──▶ END
+    cache ──▶ END                                                  (acierto)
+    cache ──▶ controlador ──▶ (consulta ──▶ controlador)* ──▶ llm ──▶ guardar ──▶ END
 
-Donde `consulta` puede repetirse en ciclos hasta que se complete el contexto y se pase a `llm`.
+Donde `consulta` puede repetirse en ciclos hasta que se complete el contexto y se pase a
+`llm`. Si `RESPONSE_CACHE_ENABLED` está desactivado, el grafo empieza en `controlador` y
+termina en `llm`.
+
+Los nodos de E/S (`cache`, `consulta` y `llm`) se registran con una implementación
+síncrona y otra asíncrona, de modo que el grafo compilado admite tanto `invoke` como
+`ainvoke`.
+
+Todos los nodos se envuelven con `instrument_node` (ver `modules.instrumentation`), que
+añade al estado (`node_metrics`) el tiempo, las llamadas externas, los tokens y el
+resultado de caché de cada ejecución de un nodo.
 
 Requiere:
 - LangGraph (`StateGraph`) para la definición del flujo.
-- Implementaciones de los agentes (`ControllerAgent`, `RetrieverAgent`, `LLMAgent`).
+- Implementaciones de los agentes (`CacheAgent`, `ControllerAgent`, `RetrieverAgent`,
+  `LLMAgent`).
 - Estado de grafo definido en `AgentState`.
 - `vector_store` configurado para búsquedas semánticas.
+- `response_cache` compartida entre ejecuciones.
 """
 
 from typing import Literal
 
 from langgraph.graph import END, StateGraph
 
+from config.config import RESPONSE_CACHE_ENABLED
+from modules.agents.cache_agent import CacheAgent
 from modules.agents.controller_agent import ControllerAgent
 from modules.agents.llm_agent import LLMAgent
 from modules.agents.retriever_agent import RetrieverAgent
 from modules.graph.agent_state import AgentState
+from modules.instrumentation import instrument_node
+from modules.response_cache import response_cache
 from modules.vector import vector_store
 
 
@@ -36,11 +55,13 @@ def build_langgraph_controller_flow() -> StateGraph:
     """
     Construye un grafo LangGraph con el flujo RAG completo: recuperación + generación.
 
-    Este flujo conecta tres agentes en la siguiente lógica:
-        controlador -> (consulta -> controlador)* -> llm -> END
+    Este flujo conecta los agentes en la siguiente lógica:
+        cache -> END
+        cache -> controlador -> (consulta -> controlador)* -> llm -> guardar -> END
 
     El controlador decide si se debe realizar una consulta al vector store o si se puede
-    proceder directamente a la generación de respuesta con el modelo LLM.
+    proceder directamente a la generación de respuesta con el modelo LLM. Un acierto en
+    la caché de respuestas termina el flujo sin recuperación ni generación.
 
     Returns:
         StateGraph: Grafo LangGraph ya compilado y listo para ejecutarse.
@@ -49,22 +70,44 @@ def build_langgraph_controller_flow() -> StateGraph:
     retriever_agent = RetrieverAgent(vector_store)
     llm_agent = LLMAgent()
     controller = ControllerAgent()
+    cache_agent = CacheAgent(response_cache, vector_store)
 
     # Crear grafo con esquema de estado definido
     workflow = StateGraph(AgentState)
 
     # Registrar nodos en el grafo
-    workflow.add_node("controlador", controller.run)
-    workflow.add_node("consulta", retriever_agent.get_context)
-    workflow.add_node("llm", llm_agent.generate_response)
-
-    # Definir punto de entrada
-    workflow.set_entry_point("controlador")
+    workflow.add_node("controlador", instrument_node("controlador", controller.run))
+    workflow.add_node(
+        "consulta",
+        instrument_node(
+            "consulta", retriever_agent.get_context, retriever_agent.aget_context
+        ),
+    )
+    workflow.add_node(
+        "llm",
+        instrument_node(
+            "llm", llm_agent.generate_response, llm_agent.agenerate_response
+        ),
+    )
 
     # Definir transiciones condicionales
     workflow.add_conditional_edges("controlador", next_node)
     workflow.add_edge("consulta", "controlador")
-    workflow.add_edge("llm", END)
+
+    if RESPONSE_CACHE_ENABLED:
+        workflow.add_node(
+            "cache", instrument_node("cache", cache_agent.lookup, cache_agent.alookup)
+        )
+        workflow.add_node("guardar", instrument_node("guardar", cache_agent.store))
+
+        # La caché es el punto de entrada; en un acierto el flujo termina directamente
+        workflow.set_entry_point("cache")
+        workflow.add_conditional_edges("cache", after_cache)
+        workflow.add_edge("llm", "guardar")
+        workflow.add_edge("guardar", END)
+    else:
+        workflow.set_entry_point("controlador")
+        workflow.add_edge("llm", END)
 
     # Compilar el grafo para su ejecución
     return workflow.compile()
@@ -87,3 +130,20 @@ def next_node(state: AgentState) -> Literal["consulta", "llm"]:
         return "consulta"
 
     return "llm"
+
+
+def after_cache(state: AgentState) -> Literal["controlador", "__end__"]:
+    """
+    Determina si el flujo termina tras consultar la caché de respuestas.
+
+    Args:
+        state (AgentState): Estado actual del flujo.
+
+    Returns:
+        Literal["controlador", "__end__"]: `END` en un acierto de caché, `"controlador"`
+        en otro caso.
+    """
+    if state.get("cache_hit"):
+        return END
+
+    return "controlador"
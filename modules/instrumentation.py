@@ -0,0 +1,403 @@
+"""
+Instrumentación del grafo de agentes: tiempos, llamadas externas, tokens y caché por
+nodo.
+
+Cada nodo registrado en `build_langgraph_controller_flow` se envuelve con
+`instrument_node`, que mide su tiempo real y abre un registro (`NodeMetrics`) en una
+`ContextVar` mientras se ejecuta. Las llamadas a servicios externos lo anotan desde el
+propio punto de llamada:
+
+- `record_call(kind)`: una llamada externa (`"embedding"`, `"search"`, `"llm"`).
+- `record_usage(usage)`: tokens de entrada y salida de `response.usage` de OpenAI.
+
+Al terminar, el registro del nodo se añade al campo `node_metrics` del estado (con
+reductor de concatenación), de modo que funciona igual con `invoke`, `ainvoke` y
+`stream`, y con varias ejecuciones concurrentes. El runner lo resume con `summarize_run`
+en el campo `"metrics"` del resultado y lo exporta con `export_run` a los destinos
+configurados en `METRICS_SINKS`:
+
+- `"log"` (`LogSink`): una línea por ejecución con el logger `koalaroute.metrics`.
+- `"prometheus"` (`PrometheusSink`): contadores acumulados en formato de texto de
+  Prometheus.
+- `"otel"` (`OpenTelemetrySink`): una traza con un span por nodo (requiere
+  `opentelemetry-api`).
+
+Se pueden añadir destinos propios con `register_sink` (cualquier objeto con
+`export(run)`).
+"""
+
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Protocol
+
+from config.config import METRICS_SINKS
+
+if TYPE_CHECKING:
+    from langchain_core.runnables import RunnableLambda
+
+logger = logging.getLogger("koalaroute.metrics")
+
+
+# ---------- REGISTRO POR NODO ----------
+@dataclass
+class NodeMetrics:
+    """
+    Métricas de una ejecución de un nodo del grafo.
+
+    Atributos:
+        node (str): Nombre del nodo.
+        start_ns (int): Inicio (`time.time_ns`), usado para reconstruir los spans.
+        wall_ms (float): Tiempo real del nodo en milisegundos.
+        calls (dict[str, int]): Llamadas externas por tipo.
+        prompt_tokens (int): Tokens de entrada enviados al LLM.
+        completion_tokens (int): Tokens generados por el LLM.
+        cache_hit (bool | None): Resultado de la consulta a la caché de respuestas (si
+            aplica).
+    """
+
+    node: str
+    start_ns: int = 0
+    wall_ms: float = 0.0
+    calls: Dict[str, int] = field(default_factory=dict)
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cache_hit: Optional[bool] = None
+
+
+_current: ContextVar[Optional[NodeMetrics]] = ContextVar(
+    "koalaroute_node_metrics", default=None
+)
+
+
+def record_call(kind: str, count: int = 1) -> None:
+    """
+    Anota una llamada externa en el nodo en ejecución (no hace nada fuera del grafo).
+
+    Args:
+        kind (str): Tipo de llamada, p. ej. `"embedding"`, `"search"` o `"llm"`.
+        count (int): Número de llamadas.
+    """
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.calls[kind] = metrics.calls.get(kind, 0) + count
+
+
+def record_usage(usage) -> None:
+    """
+    Anota los tokens de una respuesta del LLM en el nodo en ejecución.
+
+    Args:
+        usage: Objeto `usage` de la respuesta (`prompt_tokens`, `completion_tokens`) o
+        `None`.
+    """
+    metrics = _current.get()
+    if metrics is not None and usage is not None:
+        metrics.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+        metrics.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+
+
+def instrument_node(
+    name: str, func: Callable, afunc: Optional[Callable] = None
+) -> "RunnableLambda":
+    """
+    Envuelve un nodo del grafo para medir su ejecución.
+
+    El estado devuelto por el nodo se amplía con `{"node_metrics": [registro]}`; si el
+    nodo devuelve `"cache_hit"`, se anota como acierto o fallo de caché.
+
+    Args:
+        name (str): Nombre con el que se registra el nodo.
+        func (Callable): Implementación síncrona del nodo.
+        afunc (Callable | None): Implementación asíncrona (opcional).
+
+    Returns:
+        RunnableLambda: Nodo instrumentado, listo para `workflow.add_node`.
+    """
+    from langchain_core.runnables import RunnableLambda
+
+    def start() -> tuple:
+        metrics = NodeMetrics(node=name, start_ns=time.time_ns())
+        return metrics, _current.set(metrics), time.perf_counter()
+
+    def finish(metrics: NodeMetrics, began: float, update) -> dict:
+        metrics.wall_ms = round((time.perf_counter() - began) * 1000, 3)
+        update = dict(update or {})
+        if "cache_hit" in update:
+            metrics.cache_hit = bool(update["cache_hit"])
+        update["node_metrics"] = [asdict(metrics)]
+        return update
+
+    def run(state):
+        metrics, token, began = start()
+        try:
+            update = func(state)
+        finally:
+            _current.reset(token)
+        return finish(metrics, began, update)
+
+    if afunc is None:
+        return RunnableLambda(run, name=name)
+
+    async def arun(state):
+        metrics, token, began = start()
+        try:
+            update = await afunc(state)
+        finally:
+            _current.reset(token)
+        return finish(metrics, began, update)
+
+    return RunnableLambda(run, afunc=arun, name=name)
+
+
+# ---------- RESUMEN POR EJECUCIÓN ----------
+def summarize_run(
+    node_metrics: List[dict], total_ms: float, error: Optional[str] = None
+) -> dict:
+    """
+    Agrega los registros por nodo de una ejecución del grafo.
+
+    Args:
+        node_metrics (List[dict]): Registros de `NodeMetrics`, en orden de ejecución.
+        total_ms (float): Tiempo total de la ejecución en milisegundos.
+        error (str | None): Tipo de la excepción, si la ejecución falló.
+
+    Returns:
+        dict: `total_ms`, `nodes` (ms, ejecuciones y llamadas por nodo), `calls`
+        totales, `prompt_tokens`, `completion_tokens`, `cache_hit`, `error` y los
+        registros en `trace`.
+    """
+    nodes, calls = {}, {}
+    prompt_tokens = completion_tokens = 0
+    cache_hit = None
+    for record in node_metrics:
+        node = nodes.setdefault(record["node"], {"ms": 0.0, "runs": 0, "calls": {}})
+        node["ms"] = round(node["ms"] + record["wall_ms"], 3)
+        node["runs"] += 1
+        for kind, count in record["calls"].items():
+            node["calls"][kind] = node["calls"].get(kind, 0) + count
+            calls[kind] = calls.get(kind, 0) + count
+        prompt_tokens += record["prompt_tokens"]
+        completion_tokens += record["completion_tokens"]
+        if record["cache_hit"] is not None:
+            cache_hit = record["cache_hit"]
+
+    return {
+        "total_ms": round(total_ms, 3),
+        "nodes": nodes,
+        "calls": calls,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "cache_hit": cache_hit,
+        "error": error,
+        "trace": node_metrics,
+    }
+
+
+# ---------- DESTINOS ----------
+class MetricsSink(Protocol):
+    """
+    Destino de las métricas: recibe el resumen de cada ejecución (`summarize_run`).
+    """
+
+    def export(self, run: dict) -> None: ...
+
+
+class LogSink:
+    """
+    Escribe una línea por ejecución en el logger `koalaroute.metrics` (nivel INFO).
+    """
+
+    def export(self, run: dict) -> None:
+        nodes = " ".join(
+            f"{name}={node['ms']:.1f}ms" for name, node in run["nodes"].items()
+        )
+        calls = ",".join(f"{kind}:{count}" for kind, count in run["calls"].items())
+        logger.info(
+            "run total=%.1fms %s calls=%s tokens=%d/%d cache_hit=%s error=%s",
+            run["total_ms"],
+            nodes,
+            calls or "-",
+            run["prompt_tokens"],
+            run["completion_tokens"],
+            run["cache_hit"],
+            run["error"],
+        )
+
+
+class PrometheusSink:
+    """
+    Acumula contadores de todas las ejecuciones y los expone en formato de texto de
+    Prometheus.
+
+    `render()` devuelve el texto listo para un endpoint `/metrics` o para el recolector
+    de ficheros de texto de node_exporter.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[tuple, float] = {}
+
+    def _add(self, name: str, labels: tuple, value: float) -> None:
+        key = (name, labels)
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def export(self, run: dict) -> None:
+        with self._lock:
+            status = "error" if run["error"] else "ok"
+            self._add("koalaroute_runs_total", (("status", status),), 1)
+            self._add("koalaroute_run_duration_ms_sum", (), run["total_ms"])
+            self._add("koalaroute_run_duration_ms_count", (), 1)
+            for name, node in run["nodes"].items():
+                labels = (("node", name),)
+                self._add("koalaroute_node_duration_ms_sum", labels, node["ms"])
+                self._add("koalaroute_node_duration_ms_count", labels, node["runs"])
+                for kind, count in node["calls"].items():
+                    self._add(
+                        "koalaroute_external_calls_total",
+                        labels + (("kind", kind),),
+                        count,
+                    )
+            for kind in ("prompt", "completion"):
+                self._add(
+                    "koalaroute_llm_tokens_total",
+                    (("type", kind),),
+                    run[f"{kind}_tokens"],
+                )
+            if run["cache_hit"] is not None:
+                result = "hit" if run["cache_hit"] else "miss"
+                self._add("koalaroute_cache_lookups_total", (("result", result),), 1)
+
+    def render(self) -> str:
+        """
+        Devuelve las métricas acumuladas en formato de exposición de texto de
+        Prometheus.
+        """
+        types = {
+            "koalaroute_runs_total": "counter",
+            "koalaroute_run_duration_ms": "summary",
+            "koalaroute_node_duration_ms": "summary",
+            "koalaroute_external_calls_total": "counter",
+            "koalaroute_llm_tokens_total": "counter",
+            "koalaroute_cache_lookups_total": "counter",
+        }
+        with self._lock:
+            counters = sorted(self._counters.items())
+
+        lines, declared = [], set()
+        for (name, labels), value in counters:
+            family = name.removesuffix("_sum").removesuffix("_count")
+            if family not in declared:
+                lines.append(f"# TYPE {family} {types.get(family, 'untyped')}")
+                declared.add(family)
+            label_text = ",".join(f'{key}="{val}"' for key, val in labels)
+            lines.append(
+                f"{name}{{{label_text}}} {value:g}" if labels else f"{name} {value:g}"
+            )
+        return "\n".join(lines) + "\n"
+
+
+class OpenTelemetrySink:
+    """
+    Exporta cada ejecución como una traza de OpenTelemetry: un span `run_prompt` con un
+    span hijo por nodo, con sus llamadas, tokens y resultado de caché como atributos.
+
+    Usa el `TracerProvider` global, que la aplicación debe configurar con su exportador.
+    Requiere el paquete opcional `opentelemetry-api`.
+    """
+
+    def __init__(self):
+        from opentelemetry import trace
+
+        self._trace = trace
+        self._tracer = trace.get_tracer("koalaroute")
+
+    def export(self, run: dict) -> None:
+        records = run["trace"]
+        end_ns = time.time_ns()
+        start_ns = end_ns - int(run["total_ms"] * 1e6)
+        if records:
+            start_ns = min(start_ns, records[0]["start_ns"])
+
+        root = self._tracer.start_span("run_prompt", start_time=start_ns)
+        root.set_attribute("koalaroute.prompt_tokens", run["prompt_tokens"])
+        root.set_attribute("koalaroute.completion_tokens", run["completion_tokens"])
+        if run["cache_hit"] is not None:
+            root.set_attribute("koalaroute.cache_hit", run["cache_hit"])
+        if run["error"]:
+            root.set_status(self._trace.Status(self._trace.StatusCode.ERROR))
+
+        context = self._trace.set_span_in_context(root)
+        for record in records:
+            span = self._tracer.start_span(
+                record["node"], context=context, start_time=record["start_ns"]
+            )
+            for kind, count in record["calls"].items():
+                span.set_attribute(f"koalaroute.calls.{kind}", count)
+            span.set_attribute("koalaroute.prompt_tokens", record["prompt_tokens"])
+            span.set_attribute(
+                "koalaroute.completion_tokens", record["completion_tokens"]
+            )
+            if record["cache_hit"] is not None:
+                span.set_attribute("koalaroute.cache_hit", record["cache_hit"])
+            span.end(end_time=record["start_ns"] + int(record["wall_ms"] * 1e6))
+        root.end(end_time=end_ns)
+
+
+SINK_TYPES = {
+    "log": LogSink,
+    "prometheus": PrometheusSink,
+    "otel": OpenTelemetrySink,
+}
+
+sinks: List[MetricsSink] = []
+
+
+def register_sink(sink: MetricsSink) -> MetricsSink:
+    """
+    Añade un destino al que se exportan todas las ejecuciones siguientes.
+
+    Args:
+        sink (MetricsSink): Objeto con un método `export(run)`.
+
+    Returns:
+        MetricsSink: El mismo destino (para poder guardarlo, p. ej.
+        `PrometheusSink().render`).
+    """
+    sinks.append(sink)
+    return sink
+
+
+def get_sink(sink_type: type) -> Optional[MetricsSink]:
+    """
+    Devuelve el primer destino registrado del tipo indicado, p. ej.
+    `get_sink(PrometheusSink)`.
+    """
+    return next((sink for sink in sinks if isinstance(sink, sink_type)), None)
+
+
+def export_run(run: dict) -> None:
+    """
+    Envía el resumen de una ejecución a todos los destinos; un destino que falla no
+    interrumpe la respuesta al usuario.
+
+    Args:
+        run (dict): Resumen de `summarize_run`.
+    """
+    for sink in sinks:
+        try:
+            sink.export(run)
+        except Exception as e:
+            print(f"⚠️ Error exportando métricas a {type(sink).__name__}: {e}")
+
+
+# Destinos configurados en `METRICS_SINKS`; los opcionales sin dependencia se omiten
+for _name in METRICS_SINKS:
+    try:
+        register_sink(SINK_TYPES[_name]())
+    except KeyError:
+        raise ValueError(f"❌ Destino de métricas desconocido: '{_name}'") from None
+    except ImportError as e:
+        print(f"⚠️ Destino de métricas '{_name}' no disponible: {e}")
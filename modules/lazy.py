@@ -0,0 +1,125 @@
+"""
+Construcción diferida y memoizada de los objetos costosos del sistema.
+
+Los clientes de Azure, los modelos de embeddings, el vector store, el codificador de
+tokens y el grafo compilado se exponen como `Lazy`: un objeto ligero que se puede
+importar sin coste y que construye el objeto real (importando sus dependencias) la
+primera vez que se accede a uno de sus atributos. Así, importar un módulo no arrastra
+LangChain, OpenAI o `tiktoken` hasta que se usan, y los procesos que no los necesitan
+(p. ej. `deleter.py`) nunca los cargan.
+
+Los clientes asíncronos (`httpx.AsyncClient`, `AsyncAzureOpenAI`, el `SearchClient`
+de `azure.search.documents.aio`) quedan ligados al bucle de eventos en el que abren sus
+conexiones, por lo que no pueden compartirse entre bucles (p. ej. entre dos
+`asyncio.run`). Para ellos, `LazyPerLoop` construye un objeto por cada bucle.
+
+Uso:
+    embeddings = Lazy(_build_embeddings)
+    embeddings.embed_query("texto")  # construye el modelo la primera vez
+
+    async_client = LazyPerLoop(_build_async_client)
+    await async_client.chat.completions.create(...)  # un cliente por bucle de eventos
+"""
+
+import asyncio
+import threading
+import weakref
+from typing import Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class Lazy(Generic[T]):
+    """
+    Proxy que construye su objeto una única vez, en el primer acceso, y delega en él.
+
+    La construcción es segura entre hilos: si varios hilos acceden a la vez, la fábrica
+    se ejecuta una sola vez y todos reciben el mismo objeto.
+
+    Atributos:
+        factory (Callable[[], T]): Función sin argumentos que construye el objeto.
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._built = False
+        self._value = None
+
+    def resolve(self) -> T:
+        """
+        Devuelve el objeto real, construyéndolo si aún no existe.
+
+        Returns:
+            T: Objeto construido por la fábrica.
+        """
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self._value = self._factory()
+                    self._built = True
+        return self._value
+
+    @property
+    def is_built(self) -> bool:
+        """
+        Indica si el objeto ya se ha construido.
+        """
+        return self._built
+
+    def __getattr__(self, name: str):
+        # Solo se invoca para atributos que no son del propio proxy
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(self.resolve(), name)
+
+    def __repr__(self) -> str:
+        state = repr(self._value) if self._built else "sin construir"
+        return f"Lazy({getattr(self._factory, '__name__', 'factory')}: {state})"
+
+
+class LazyPerLoop(Generic[T]):
+    """
+    Proxy que construye un objeto por bucle de eventos, en el primer acceso desde él.
+
+    Los objetos se indexan por el bucle en ejecución; los de bucles ya cerrados se
+    descartan en el siguiente acceso, de modo que sus conexiones se liberan con el
+    recolector.
+
+    Atributos:
+        factory (Callable[[], T]): Función sin argumentos que construye el objeto.
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._values: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, T]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def resolve(self) -> T:
+        """
+        Devuelve el objeto del bucle de eventos en curso, construyéndolo si no existe.
+
+        Returns:
+            T: Objeto construido por la fábrica para este bucle.
+
+        Raises:
+            RuntimeError: Si se llama fuera de un bucle de eventos en ejecución.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            for closed in [other for other in self._values if other.is_closed()]:
+                del self._values[closed]
+            if loop not in self._values:
+                self._values[loop] = self._factory()
+            return self._values[loop]
+
+    def __getattr__(self, name: str):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(self.resolve(), name)
+
+    def __repr__(self) -> str:
+        name = getattr(self._factory, "__name__", "factory")
+        return f"LazyPerLoop({name}: {len(self._values)} bucle(s))"
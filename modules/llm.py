@@ -2,32 +2,97 @@
 Inicializa el cliente de Azure OpenAI para la generación de respuestas conversacionales.
 
 Este módulo realiza lo siguiente:
-- Configura el cliente `AzureOpenAI` con las credenciales y endpoint definidos.
+- Configura los clientes `AzureOpenAI` y `AsyncAzureOpenAI` con las credenciales y
+  endpoint definidos, sobre los clientes HTTP compartidos de `modules.clients`
+  (conexiones persistentes, tiempos de espera y reintentos según `config`). Ambos se
+  construyen (e importan `openai`) en su primer uso; el asíncrono, uno por bucle de
+  eventos (`LazyPerLoop`), ya que su pool de conexiones queda ligado al bucle que lo
+  usa.
 - Expone una función para generar respuestas usando el modelo desplegado (como GPT-3.5-Turbo o GPT-4).
 - Utiliza el formato ChatML con roles (`system`, `user`, `assistant`) compatible con Azure OpenAI.
+- Con el proveedor `"stub"` (`KOALA_PROVIDER=stub`) usa en su lugar los clientes
+  simulados de `modules.stubs`, con la misma interfaz y latencias deterministas, sin
+  red.
 
 Expone:
 - `call_openai_chat`: función que recibe una lista de mensajes ChatML y devuelve la respuesta generada
   por el modelo configurado.
+- `acall_openai_chat`: variante asíncrona de `call_openai_chat`.
+- `stream_openai_chat` / `astream_openai_chat`: generan la respuesta en modo streaming
+  (`stream=True`), devolviendo los fragmentos de texto a medida que el modelo los
+  produce.
+
+Cada llamada se anota en la instrumentación del nodo en curso (`record_call("llm")`)
+junto con los tokens de `response.usage`. En streaming, si el servicio no envía `usage`,
+los tokens se estiman con `encoding`.
 """
 
-from openai import AzureOpenAI
+from types import SimpleNamespace
+from typing import AsyncIterator, Iterator
 
 from config.config import (
     API_VERSION_LLM,
     AZURE_OPENAI_API_KEY,
     AZURE_OPENAI_DEPLOYMENT,
     AZURE_OPENAI_ENDPOINT,
+    HTTP_MAX_RETRIES,
     MAX_COMPLETION_TOKENS,
+    PROVIDER,
     TEMPERATURE,
 )
+from modules.clients import get_async_http_client, get_http_client, http_timeout
+from modules.instrumentation import record_call, record_usage
+from modules.lazy import Lazy, LazyPerLoop
+from modules.prompt_utils import encoding
+
+
+def _build_client():
+    """
+    Instancia del cliente de Azure OpenAI, configurado con credenciales del entorno.
+    """
+    if PROVIDER == "stub":
+        from modules.stubs import StubChatClient
+
+        return StubChatClient()
+
+    from openai import AzureOpenAI
+
+    return AzureOpenAI(
+        api_key=AZURE_OPENAI_API_KEY,
+        api_version=API_VERSION_LLM,
+        azure_endpoint=AZURE_OPENAI_ENDPOINT,
+        http_client=get_http_client(),
+        max_retries=HTTP_MAX_RETRIES,
+        timeout=http_timeout(),
+    )
+
+
+def _build_async_client():
+    """
+    Cliente asíncrono equivalente, para atender varias peticiones concurrentes en un
+    mismo proceso.
+    """
+    if PROVIDER == "stub":
+        from modules.stubs import AsyncStubChatClient
+
+        return AsyncStubChatClient()
+
+    from openai import AsyncAzureOpenAI
+
+    return AsyncAzureOpenAI(
+        api_key=AZURE_OPENAI_API_KEY,
+        api_version=API_VERSION_LLM,
+        azure_endpoint=AZURE_OPENAI_ENDPOINT,
+        http_client=get_async_http_client(),
+        max_retries=HTTP_MAX_RETRIES,
+        timeout=http_timeout(),
+    )
 
-# Instancia del cliente de Azure OpenAI, configurado con credenciales del entorno
-client = AzureOpenAI(
-    api_key=AZURE_OPENAI_API_KEY,
-    api_version=API_VERSION_LLM,
-    azure_endpoint=AZURE_OPENAI_ENDPOINT,
-)
+
+# Ambos clientes se construyen en su primer uso; el asíncrono, una vez por bucle de
+# eventos (ver `modules.lazy`)
+client = Lazy(_build_client)
+async_client = LazyPerLoop(_build_async_client)
 
 # Nombre del modelo/despliegue definido en Azure (ej. "gpt-35-turbo")
 deployment_name = AZURE_OPENAI_DEPLOYMENT
@@ -54,4 +119,100 @@ def call_openai_chat(prompt_messages: list[dict]) -> str:
         temperature=TEMPERATURE,
         max_tokens=MAX_COMPLETION_TOKENS,
     )
+    record_call("llm")
+    record_usage(response.usage)
+    return response.choices[0].message.content
+
+
+async def acall_openai_chat(prompt_messages: list[dict]) -> str:
+    """
+    Variante asíncrona de `call_openai_chat` basada en `AsyncAzureOpenAI`.
+
+    Args:
+        prompt_messages (list[dict]): Lista de mensajes con estructura ChatML.
+
+    Returns:
+        str: Contenido de la respuesta generada por el modelo.
+    """
+    response = await async_client.chat.completions.create(
+        model=deployment_name,
+        messages=prompt_messages,
+        temperature=TEMPERATURE,
+        max_tokens=MAX_COMPLETION_TOKENS,
+    )
+    record_call("llm")
+    record_usage(response.usage)
     return response.choices[0].message.content
+
+
+def stream_openai_chat(prompt_messages: list[dict]) -> Iterator[str]:
+    """
+    Genera una respuesta en modo streaming a partir de una lista de mensajes ChatML.
+
+    Permite mostrar los primeros tokens al usuario sin esperar a la respuesta completa.
+
+    Args:
+        prompt_messages (list[dict]): Lista de mensajes con estructura ChatML.
+
+    Yields:
+        str: Fragmentos de texto de la respuesta, en orden.
+    """
+    stream = client.chat.completions.create(
+        model=deployment_name,
+        messages=prompt_messages,
+        temperature=TEMPERATURE,
+        max_tokens=MAX_COMPLETION_TOKENS,
+        stream=True,
+        # El último fragmento (sin `choices`) trae el `usage` de la petición
+        stream_options={"include_usage": True},
+    )
+    record_call("llm")
+    usage, pieces = None, []
+    for chunk in stream:
+        usage = getattr(chunk, "usage", None) or usage
+        # Azure puede enviar fragmentos sin `choices` (p. ej. del filtro de contenido)
+        if chunk.choices and chunk.choices[0].delta.content:
+            pieces.append(chunk.choices[0].delta.content)
+            yield chunk.choices[0].delta.content
+    record_usage(usage or _estimate_usage(prompt_messages, "".join(pieces)))
+
+
+async def astream_openai_chat(prompt_messages: list[dict]) -> AsyncIterator[str]:
+    """
+    Variante asíncrona de `stream_openai_chat`.
+
+    Args:
+        prompt_messages (list[dict]): Lista de mensajes con estructura ChatML.
+
+    Yields:
+        str: Fragmentos de texto de la respuesta, en orden.
+    """
+    stream = await async_client.chat.completions.create(
+        model=deployment_name,
+        messages=prompt_messages,
+        temperature=TEMPERATURE,
+        max_tokens=MAX_COMPLETION_TOKENS,
+        stream=True,
+        # El último fragmento (sin `choices`) trae el `usage` de la petición
+        stream_options={"include_usage": True},
+    )
+    record_call("llm")
+    usage, pieces = None, []
+    async for chunk in stream:
+        usage = getattr(chunk, "usage", None) or usage
+        if chunk.choices and chunk.choices[0].delta.content:
+            pieces.append(chunk.choices[0].delta.content)
+            yield chunk.choices[0].delta.content
+    record_usage(usage or _estimate_usage(prompt_messages, "".join(pieces)))
+
+
+def _estimate_usage(prompt_messages: list[dict], completion: str) -> SimpleNamespace:
+    """
+    Estima con `encoding` los tokens de una respuesta en streaming sin `usage`.
+    """
+    return SimpleNamespace(
+        prompt_tokens=sum(
+            len(encoding.encode(m.get("content") or "")) for m in prompt_messages
+        ),
+        completion_tokens=len(encoding.encode(completion)),
+    )
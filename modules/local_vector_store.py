@@ -0,0 +1,465 @@
+"""
+Almacén vectorial local en proceso, alternativo a Azure Cognitive Search.
+
+El corpus completo (unas pocas guías de ciudades divididas en secciones `##`) cabe
+holgadamente en memoria, por lo que la búsqueda puede resolverse localmente por fuerza
+bruta sin salir a la red:
+
+- `vectors.npy`: matriz `float32` (una fila por sección) con los embeddings ya
+  normalizados, abierta como memoria mapeada (`np.load(..., mmap_mode="r")`).
+- `metadata.json`: sidecar con los metadatos de cada fila (id, title, section, category,
+  source) y su contenido, en el mismo orden que la matriz.
+- `ivf.npz` (opcional): índice aproximado IVF (ver `modules.ann_index`) para corpus
+  grandes.
+- `categories.json`: orden de bits del registro de categorías con el que se calcularon
+  las máscaras `category_mask` del sidecar (ver `modules.categories`).
+
+El índice se genera con `python uploader.py --export-local`, se actualiza de forma
+incremental con `python uploader.py --sync` (`upsert` / `delete`) y se selecciona con
+`VECTOR_BACKEND = "local"` en `config`. `search_mode` elige entre búsqueda exacta
+(`"exact"`) y aproximada (`"ivf"`); en ambos casos el filtrado por categorías se aplica
+antes de puntuar, con una operación AND sobre la máscara de bits de cada sección.
+
+Expone:
+- `LocalVectorStore`: almacén con la misma interfaz que usa el `RetrieverAgent` sobre
+  `AzureVectorStore`.
+- `save_local_index`: escribe la matriz, el sidecar y opcionalmente el índice IVF a
+  partir de documentos ya vectorizados.
+"""
+
+import asyncio
+import json
+import os
+import re
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from modules.ann_index import IVFIndex, default_nlist, top_k
+from modules.categories import category_registry
+from modules.similarity import normalize_rows, normalize_vector
+
+VECTORS_FILE = "vectors.npy"
+METADATA_FILE = "metadata.json"
+IVF_FILE = "ivf.npz"
+CATEGORIES_FILE = "categories.json"
+
+# Metadatos de cada sección guardados en el sidecar (además del contenido)
+METADATA_FIELDS = ["id", "title", "section", "category", "category_mask", "source"]
+
+# Única expresión OData admitida en `filters`: la de `AzureVectorStore.category_filter`
+_CATEGORY_FILTER = re.compile(
+    r"^\s*category/any\(c: search\.in\(c, '(?P<values>(?:[^']|'')*)', '\|'\)\)\s*$"
+)
+
+
+class LocalVectorStore:
+    """
+    Almacén vectorial en memoria con búsqueda por similitud coseno exacta o aproximada
+    (IVF).
+
+    Atributos:
+        path (str | None): Carpeta del índice local (`vectors.npy` + `metadata.json`);
+            con `None` el almacén empieza vacío, vive solo en memoria y se rellena con
+            `upsert`.
+        embedding_function (Callable[[str], List[float]]): Función de embeddings de
+            consultas.
+        async_embedding_function (Callable | None): Variante asíncrona (opcional).
+        search_mode (str): `"exact"` (fuerza bruta) o `"ivf"` (índice aproximado).
+        nprobe (int): Listas sondeadas por consulta en modo `"ivf"`.
+        vectors (np.ndarray): Matriz memoria-mapeada de vectores normalizados.
+        metadata (List[dict]): Metadatos y contenido de cada fila de `vectors`.
+        ann_index (IVFIndex | None): Índice aproximado (solo en modo `"ivf"`).
+    """
+
+    def __init__(
+        self,
+        path: Optional[str],
+        embedding_function: Callable[[str], List[float]],
+        async_embedding_function: Optional[
+            Callable[[str], Awaitable[List[float]]]
+        ] = None,
+        search_mode: str = "exact",
+        nprobe: int = 8,
+        nlist: int = 0,
+        train_iterations: int = 20,
+    ):
+        if search_mode not in ("exact", "ivf"):
+            raise ValueError(f"❌ Modo de búsqueda local desconocido: '{search_mode}'")
+
+        self.path = path
+        self.embedding_function = embedding_function
+        self.async_embedding_function = async_embedding_function
+        self.search_mode = search_mode
+        self.nprobe = nprobe
+        self.nlist = nlist
+        self.train_iterations = train_iterations
+
+        vectors_path = os.path.join(path or "", VECTORS_FILE)
+        metadata_path = os.path.join(path or "", METADATA_FILE)
+        if path is None:
+            # Almacén solo en memoria: se rellena con `upsert`
+            self.vectors = np.empty((0, 0), dtype=np.float32)
+            self.metadata = []
+        elif os.path.isfile(vectors_path) and os.path.isfile(metadata_path):
+            self.vectors = np.load(vectors_path, mmap_mode="r")
+            with open(metadata_path, "r", encoding="utf-8") as f:
+                self.metadata = json.load(f)
+
+            # Si el registro de categorías cambió, las máscaras guardadas no son válidas
+            if _stored_categories(path) != category_registry.names:
+                for entry in self.metadata:
+                    entry["category_mask"] = category_registry.mask(entry["category"])
+        else:
+            # Índice vacío: las búsquedas no devuelven resultados hasta generarlo
+            print(
+                f"⚠️ Índice local no encontrado en '{path}'. "
+                "Genéralo con: python uploader.py --export-local"
+            )
+            self.vectors = np.empty((0, 0), dtype=np.float32)
+            self.metadata = []
+
+        if len(self.metadata) != self.vectors.shape[0]:
+            raise ValueError(
+                f"❌ Índice local inconsistente: {self.vectors.shape[0]} vectores y "
+                f"{len(self.metadata)} entradas de metadatos"
+            )
+
+        # Índice aproximado: se carga si existe y está alineado; si no, se entrena
+        self.ann_index = None
+        if search_mode == "ivf" and self.metadata:
+            ivf_path = os.path.join(path or "", IVF_FILE)
+            if path is not None and os.path.isfile(ivf_path):
+                self.ann_index = IVFIndex.load(ivf_path)
+            if self.ann_index is None or self.ann_index.assignments.shape[0] != len(
+                self.metadata
+            ):
+                self._train_ann_index()
+
+        self._build_category_index()
+
+    async def aembedding_function(self, text: str) -> List[float]:
+        """
+        Calcula de forma asíncrona el embedding de un texto.
+
+        Args:
+            text (str): Texto a embeber.
+
+        Returns:
+            List[float]: Embedding del texto.
+        """
+        if self.async_embedding_function is not None:
+            return await self.async_embedding_function(text)
+        return await asyncio.to_thread(self.embedding_function, text)
+
+    def similarity_search_with_vectors(
+        self,
+        query: str,
+        embedding: List[float],
+        k: int = 4,
+        filters: Optional[str] = None,
+        use_stored_vectors: bool = True,
+        categories: Optional[List[str]] = None,
+    ) -> Tuple[List[Document], np.ndarray]:
+        """
+        Devuelve las `k` secciones más similares a la consulta y su similitud coseno.
+
+        En modo `"exact"` la similitud con todas las secciones se obtiene con un único
+        producto matriz-vector; en modo `"ivf"` solo se puntúan las listas sondeadas del
+        índice aproximado. `query` y `use_stored_vectors` se aceptan por compatibilidad
+        con `AzureVectorStore` (la búsqueda local es siempre vectorial).
+
+        Args:
+            query (str): Texto de la consulta (no utilizado).
+            embedding (List[float]): Embedding ya calculado de la consulta.
+            k (int): Número máximo de documentos a devolver.
+            filters (str | None): Filtro OData por categorías con el formato de
+                `AzureVectorStore.category_filter`; se combina con `categories` (AND).
+            use_stored_vectors (bool): No utilizado.
+            categories (List[str] | None): Si se indica, solo se consideran secciones
+                con alguna de estas categorías (sin distinguir mayúsculas); el filtro se
+                aplica antes de puntuar.
+
+        Returns:
+            Tuple[List[Document], np.ndarray]: Documentos ordenados por similitud
+            descendente y array `float32` con su similitud coseno.
+
+        Raises:
+            ValueError: Si `filters` no es un filtro por categorías.
+        """
+        filter_categories = parse_category_filter(filters) if filters else None
+
+        if not self.metadata or k <= 0:
+            return [], np.empty(0, dtype=np.float32)
+
+        query_vector = normalize_vector(embedding)
+        allowed = self._category_mask(categories) if categories else None
+        if filter_categories is not None:
+            by_filter = self._category_mask(filter_categories)
+            allowed = by_filter if allowed is None else allowed & by_filter
+
+        if self.ann_index is not None:
+            rows, similarities = self.ann_index.search(
+                self.vectors, query_vector, k, self.nprobe, allowed
+            )
+        elif allowed is not None:
+            rows = np.flatnonzero(allowed)
+            rows, similarities = top_k(rows, self.vectors[rows] @ query_vector, k)
+        else:
+            rows = np.arange(len(self.metadata))
+            rows, similarities = top_k(rows, self.vectors @ query_vector, k)
+
+        docs = [self._to_document(self.metadata[i]) for i in rows]
+        return docs, similarities
+
+    async def asimilarity_search_with_vectors(
+        self,
+        query: str,
+        embedding: List[float],
+        k: int = 4,
+        filters: Optional[str] = None,
+        use_stored_vectors: bool = True,
+        categories: Optional[List[str]] = None,
+    ) -> Tuple[List[Document], np.ndarray]:
+        """
+        Variante asíncrona de `similarity_search_with_vectors` (la búsqueda es local y
+        no bloquea).
+
+        Args:
+            query (str): Texto de la consulta (no utilizado).
+            embedding (List[float]): Embedding ya calculado de la consulta.
+            k (int): Número máximo de documentos a devolver.
+            filters (str | None): Filtro OData por categorías (ver la variante
+                síncrona).
+            use_stored_vectors (bool): No utilizado.
+            categories (List[str] | None): Categorías admitidas (prefiltro).
+
+        Returns:
+            Tuple[List[Document], np.ndarray]: Documentos recuperados y su similitud
+            coseno.
+        """
+        return self.similarity_search_with_vectors(
+            query, embedding, k, filters, use_stored_vectors, categories
+        )
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs) -> List[Document]:
+        """
+        Busca las `k` secciones más similares a un texto (interfaz de `VectorStore` de
+        LangChain).
+
+        Args:
+            query (str): Texto de la consulta.
+            k (int): Número máximo de documentos a devolver.
+
+        Returns:
+            List[Document]: Documentos ordenados por similitud descendente.
+        """
+        docs, _ = self.similarity_search_with_vectors(
+            query, self.embedding_function(query), k=k
+        )
+        return docs
+
+    def upsert(self, documents: List[dict]) -> None:
+        """
+        Inserta o reemplaza secciones en el índice (por `"id"`), sin re-entrenar el
+        índice IVF.
+
+        Los cambios quedan en memoria hasta llamar a `save`.
+
+        Args:
+            documents (List[dict]): Documentos con `"content_vector"`, `"content"` y
+                metadatos.
+        """
+        if not documents:
+            return
+
+        self.delete([doc["id"] for doc in documents])
+
+        new_vectors = normalize_rows([doc["content_vector"] for doc in documents])
+        if self.metadata:
+            self.vectors = np.concatenate([np.asarray(self.vectors), new_vectors])
+        else:
+            self.vectors = new_vectors
+        self.metadata.extend(_to_entry(doc) for doc in documents)
+
+        if self.ann_index is not None:
+            self.ann_index.add(new_vectors)
+        elif self.search_mode == "ivf":
+            self._train_ann_index()
+
+        self._build_category_index()
+
+    def delete(self, ids: List[str]) -> List[str]:
+        """
+        Elimina secciones del índice por ID. Los cambios quedan en memoria hasta llamar
+        a `save`.
+
+        Args:
+            ids (List[str]): IDs de las secciones a eliminar.
+
+        Returns:
+            List[str]: IDs efectivamente eliminados.
+        """
+        ids = set(ids)
+        keep = np.array([entry["id"] not in ids for entry in self.metadata], dtype=bool)
+        if keep.all():
+            return []
+
+        removed = [entry["id"] for entry in self.metadata if entry["id"] in ids]
+        self.vectors = np.asarray(self.vectors)[keep]
+        self.metadata = [entry for entry, kept in zip(self.metadata, keep) if kept]
+
+        if self.ann_index is not None:
+            self.ann_index.remove(keep)
+
+        self._build_category_index()
+        return removed
+
+    def save(self) -> None:
+        """
+        Escribe en disco la matriz, el sidecar y, si existe, el índice IVF.
+        """
+        if self.path is None:
+            raise ValueError("❌ El almacén en memoria (path=None) no se puede guardar")
+        _write_index(self.path, self.vectors, self.metadata, self.ann_index)
+
+    def _train_ann_index(self) -> None:
+        """
+        Entrena el índice IVF sobre la matriz actual (`nlist` = 0 usa `default_nlist`).
+        """
+        self.ann_index = IVFIndex.train(
+            self.vectors,
+            self.nlist or default_nlist(len(self.metadata)),
+            self.train_iterations,
+        )
+
+    def _build_category_index(self) -> None:
+        """
+        Reúne en un array `int64` la máscara de categorías de cada fila.
+        """
+        self.category_masks = np.array(
+            [entry["category_mask"] for entry in self.metadata], dtype=np.int64
+        )
+
+    def _category_mask(self, categories: List[str]) -> np.ndarray:
+        """
+        Máscara booleana de las filas que tienen al menos una de las categorías
+        indicadas.
+        """
+        return (self.category_masks & category_registry.mask(categories)) != 0
+
+    @staticmethod
+    def _to_document(entry: dict) -> Document:
+        """
+        Convierte una entrada del sidecar en un `Document` de LangChain.
+        """
+        metadata = {key: entry.get(key) for key in METADATA_FIELDS}
+        return Document(page_content=entry["content"], metadata=metadata)
+
+
+def parse_category_filter(filters: str) -> List[str]:
+    """
+    Extrae las categorías de un filtro OData generado por
+    `AzureVectorStore.category_filter`.
+
+    Args:
+        filters (str): Expresión OData, p. ej.
+            `category/any(c: search.in(c, 'Naturaleza|Playas', '|'))`.
+
+    Returns:
+        List[str]: Categorías del filtro.
+
+    Raises:
+        ValueError: Si la expresión no tiene ese formato (el almacén local no evalúa
+        OData).
+    """
+    match = _CATEGORY_FILTER.match(filters)
+    if not match:
+        raise ValueError(
+            f"❌ El almacén local solo admite filtros por categoría, no: {filters!r}"
+        )
+    return [value.replace("''", "'") for value in match.group("values").split("|")]
+
+
+def save_local_index(
+    path: str, documents: List[dict], nlist: int = 0, train_iterations: int = 20
+) -> None:
+    """
+    Escribe el índice local a partir de documentos con el formato de `uploader.py`.
+
+    Los vectores se guardan normalizados para que la similitud coseno se reduzca a un
+    producto escalar. Si `nlist` es mayor que cero, se entrena y guarda también el
+    índice IVF.
+
+    Args:
+        path (str): Carpeta de destino del índice.
+        documents (List[dict]): Documentos con `"content_vector"`, `"content"` y
+            metadatos.
+        nlist (int): Número de listas del índice IVF (0 = no generar índice aproximado).
+        train_iterations (int): Iteraciones de k-means del entrenamiento del índice IVF.
+    """
+    vectors = normalize_rows([doc["content_vector"] for doc in documents])
+    metadata = [_to_entry(doc) for doc in documents]
+    ann_index = IVFIndex.train(vectors, nlist, train_iterations) if nlist > 0 else None
+
+    _write_index(path, vectors, metadata, ann_index)
+
+
+def _to_entry(document: dict) -> dict:
+    """
+    Convierte un documento de `uploader.py` en una entrada del sidecar (metadatos +
+    contenido).
+    """
+    return {
+        **{key: document.get(key) for key in METADATA_FIELDS},
+        "category_mask": category_registry.mask(document.get("category")),
+        "content": document["content"],
+    }
+
+
+def _stored_categories(path: str) -> Optional[List[str]]:
+    """
+    Lee el orden de bits de categorías guardado junto al índice (o `None` si no existe).
+    """
+    categories_path = os.path.join(path, CATEGORIES_FILE)
+    if not os.path.isfile(categories_path):
+        return None
+    with open(categories_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_index(
+    path: str,
+    vectors: np.ndarray,
+    metadata: List[dict],
+    ann_index: Optional[IVFIndex] = None,
+) -> None:
+    """
+    Escribe los ficheros del índice local, cada uno en un temporal sustituido de forma
+    atómica.
+    """
+    os.makedirs(path, exist_ok=True)
+
+    vectors_path = os.path.join(path, VECTORS_FILE)
+    metadata_path = os.path.join(path, METADATA_FILE)
+    ivf_path = os.path.join(path, IVF_FILE)
+    categories_path = os.path.join(path, CATEGORIES_FILE)
+
+    with open(vectors_path + ".tmp", "wb") as f:
+        np.save(f, np.asarray(vectors, dtype=np.float32))
+    with open(metadata_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(metadata, f, ensure_ascii=False)
+    with open(categories_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(category_registry.names, f, ensure_ascii=False)
+    if ann_index is not None:
+        ann_index.save(ivf_path + ".tmp")
+
+    os.replace(vectors_path + ".tmp", vectors_path)
+    os.replace(metadata_path + ".tmp", metadata_path)
+    os.replace(categories_path + ".tmp", categories_path)
+    if ann_index is not None:
+        os.replace(ivf_path + ".tmp", ivf_path)
+    elif os.path.isfile(ivf_path):
+        # Un índice IVF previo ya no estaría alineado con la nueva matriz
+        os.remove(ivf_path)
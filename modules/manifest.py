@@ -0,0 +1,192 @@
+"""
+Manifiesto local de ingesta para la re-indexación incremental del índice de Azure
+Search.
+
+El manifiesto guarda, por cada sección indexada, su ID determinista, el archivo y la
+sección de origen y un hash de su contenido. `uploader.py --sync` lo compara con los
+archivos .md actuales para subir solo las secciones nuevas o modificadas y eliminar las
+que ya no existen.
+
+Expone:
+- `make_document_id`: ID determinista a partir de (archivo, título de sección).
+- `section_hash`: hash del contenido indexable de una sección.
+- `source_file`: archivo .md de origen de una sección.
+- `IngestManifest`: lectura, comparación con las secciones actuales, actualización y
+  escritura atómica del manifiesto en JSON.
+"""
+
+import hashlib
+import json
+import os
+import uuid
+from typing import Dict, Iterable, List, Tuple
+
+
+def make_document_id(file_name: str, section_key: str) -> str:
+    """
+    Genera un ID estable (UUID v5) para una sección a partir de su archivo y título.
+
+    Args:
+        file_name (str): Nombre del archivo Markdown (ej: "sydney.md").
+        section_key (str): Título de la sección, desambiguado si se repite en el
+            archivo.
+
+    Returns:
+        str: ID determinista compatible con la clave del índice.
+    """
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{file_name}#{section_key}"))
+
+
+def section_hash(document: dict) -> str:
+    """
+    Calcula el hash del contenido indexable de una sección (sin ID, vector ni campos
+    derivados).
+
+    Incluye título, sección, categorías, contenido y origen, de modo que un cambio en
+    cualquiera de ellos (también en `SECTION_TO_CATEGORIES`) provoca la re-indexación de
+    la sección. El origen no depende de la posición de la sección en el archivo. La
+    máscara `category_mask` se deriva de las categorías y no forma parte del hash.
+
+    Args:
+        document (dict): Documento del índice.
+
+    Returns:
+        str: Hash SHA-256 en hexadecimal.
+    """
+    payload = {
+        key: value
+        for key, value in document.items()
+        if key not in ("id", "content_vector", "category_mask")
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def source_file(document: dict) -> str:
+    """
+    Obtiene el nombre del archivo .md de origen a partir del campo `source`
+    ("ruta#sección").
+
+    Args:
+        document (dict): Documento del índice.
+
+    Returns:
+        str: Nombre del archivo (ej: "sydney.md").
+    """
+    return os.path.basename(document["source"].split("#", 1)[0])
+
+
+class IngestManifest:
+    """
+    Manifiesto de secciones indexadas, persistido como JSON.
+
+    Atributos:
+        path (str): Ruta del fichero del manifiesto.
+        entries (Dict[str, dict]): Entradas por ID con `file`, `title`, `section` y
+            `hash`.
+    """
+
+    def __init__(self, path: str, entries: Dict[str, dict] | None = None):
+        self.path = path
+        self.entries = entries or {}
+
+    @classmethod
+    def load(cls, path: str) -> "IngestManifest":
+        """
+        Carga el manifiesto desde disco, o devuelve uno vacío si aún no existe.
+
+        Args:
+            path (str): Ruta del fichero del manifiesto.
+
+        Returns:
+            IngestManifest: Manifiesto cargado.
+        """
+        if not os.path.isfile(path):
+            return cls(path)
+
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(path, json.load(f))
+
+    def save(self):
+        """
+        Escribe el manifiesto de forma atómica (fichero temporal + renombrado).
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def record(self, documents: Iterable[dict]):
+        """
+        Registra (o actualiza) las secciones indexadas correctamente.
+
+        Args:
+            documents (Iterable[dict]): Documentos subidos al índice.
+        """
+        for doc in documents:
+            self.entries[doc["id"]] = {
+                "file": source_file(doc),
+                "title": doc["title"],
+                "section": doc["section"],
+                "hash": section_hash(doc),
+            }
+
+    def diff(
+        self, documents: List[dict], unreadable: Iterable[str] = ()
+    ) -> Tuple[List[dict], List[str]]:
+        """
+        Compara las secciones actuales con las registradas.
+
+        Args:
+            documents (List[dict]): Documentos construidos a partir de los .md actuales.
+            unreadable (Iterable[str]): Archivos que no se pudieron leer; sus secciones
+                registradas se conservan.
+
+        Returns:
+            Tuple[List[dict], List[str]]: Documentos nuevos o modificados e IDs
+            registrados que ya no existen.
+        """
+        current_ids = {doc["id"] for doc in documents}
+        changed = [
+            doc
+            for doc in documents
+            if self.entries.get(doc["id"], {}).get("hash") != section_hash(doc)
+        ]
+        protected = set(self.ids_for_files(unreadable))
+        removed = [
+            doc_id
+            for doc_id in self.entries
+            if doc_id not in current_ids and doc_id not in protected
+        ]
+        return changed, removed
+
+    def forget(self, document_ids: Iterable[str]):
+        """
+        Elimina del manifiesto las secciones indicadas.
+
+        Args:
+            document_ids (Iterable[str]): IDs a olvidar.
+        """
+        for doc_id in document_ids:
+            self.entries.pop(doc_id, None)
+
+    def ids_for_files(self, file_names: Iterable[str]) -> List[str]:
+        """
+        Devuelve los IDs registrados para un conjunto de archivos.
+
+        Args:
+            file_names (Iterable[str]): Nombres de archivo.
+
+        Returns:
+            list[str]: IDs de las secciones de esos archivos.
+        """
+        file_names = set(file_names)
+        return [
+            doc_id
+            for doc_id, entry in self.entries.items()
+            if entry["file"] in file_names
+        ]
@@ -0,0 +1,123 @@
+"""
+Lectura de las guías de ciudades (`.md` de `DOCS_PATH`) y división en secciones
+indexables.
+
+Cada archivo Markdown tiene un título de nivel 1 (la ciudad) y secciones de nivel 2
+(`##`); cada sección se convierte en un documento del índice con un ID determinista por
+(archivo, sección) y las categorías de `SECTION_TO_CATEGORIES`.
+
+Lo usan `uploader.py` (ingesta en Azure Search o en el índice local) y el almacén de
+búsqueda en memoria del proveedor `"stub"` (ver `modules.stubs`).
+
+Expone:
+- `split_markdown_sections`: título y secciones de un texto Markdown.
+- `build_section_documents`: documentos del índice (sin vector) de un archivo.
+- `list_md_files`: archivos .md que deben indexarse.
+"""
+
+import os
+import re
+from collections import Counter
+from typing import List, Optional, Tuple
+
+from config.config import DOCS_PATH, SECTION_TO_CATEGORIES
+from modules.manifest import make_document_id
+
+
+def split_markdown_sections(text: str) -> Tuple[Optional[str], List[Tuple[str, str]]]:
+    """
+    Extrae el título principal y divide un documento Markdown en secciones por
+    encabezados de nivel 2 (##).
+
+    Args:
+        text (str): Contenido completo del archivo Markdown.
+
+    Returns:
+        Tuple[str | None, list[tuple[str, str]]]:
+            - Título principal (extraído del primer encabezado de nivel 1).
+            - Lista de tuplas con secciones (titulo, contenido).
+    """
+    # Extraer título principal (primer encabezado de nivel 1)
+    title_match = re.search(r"^\s*#\s+(.*)", text, re.MULTILINE)
+    title = title_match.group(1).strip() if title_match else None
+
+    # Dividir por encabezados de nivel 2
+    # Captura cada sección ## ... hasta el siguiente ## o el fin del texto
+    pattern = r"(?:^|\n)(## .+?)(?=\n## |\Z)"
+    matches = re.findall(pattern, text, flags=re.DOTALL)
+
+    sections = []
+    for match in matches:
+        lines = match.strip().splitlines()
+        section_title = lines[0].lstrip("#").strip()
+        section_body = "\n".join(lines[1:]).strip()
+        sections.append((section_title, section_body))
+
+    return title, sections
+
+
+def build_section_documents(file_name: str) -> Tuple[Optional[str], List[dict]]:
+    """
+    Lee un archivo .md y construye los documentos del índice (sin vector) para cada
+    sección.
+
+    El título del documento se extrae automáticamente del primer encabezado de nivel 1
+    (# Ciudad). El ID de cada sección es determinista (ver `make_document_id`), de modo
+    que volver a subir un archivo reemplaza sus secciones en lugar de duplicarlas. Ni el
+    ID ni el origen (`"<ruta>#<sección>"`) dependen de la posición de la sección, así
+    que insertar o borrar una sección no altera el hash de las demás.
+
+    Args:
+        file_name (str): Nombre del archivo Markdown en DOCS_PATH.
+
+    Returns:
+        Tuple[str | None, list[dict]]: Título del documento y lista de documentos por
+        sección.
+    """
+    file_path = os.path.join(DOCS_PATH, file_name)
+    if not os.path.isfile(file_path):
+        raise FileNotFoundError(f"❌ Archivo no encontrado: {file_path}")
+
+    with open(file_path, "r", encoding="utf-8") as f:
+        content = f.read()
+
+    # Obtener título y secciones desde el Markdown
+    title, section_chunks = split_markdown_sections(content)
+
+    documents = []
+    seen_titles = Counter()
+    for section_title, section_text in section_chunks:
+        categories = SECTION_TO_CATEGORIES.get(section_title.strip(), [])
+
+        # ID determinista por (archivo, sección); las secciones repetidas se numeran
+        seen_titles[section_title] += 1
+        section_key = section_title
+        if seen_titles[section_title] > 1:
+            section_key = f"{section_title}#{seen_titles[section_title]}"
+
+        documents.append(
+            {
+                "id": make_document_id(file_name, section_key),
+                "title": title,
+                "section": section_title,
+                "category": categories,
+                "content": section_text,
+                "source": f"{file_path}#{section_key}",
+            }
+        )
+
+    return title, documents
+
+
+def list_md_files() -> List[str]:
+    """
+    Devuelve los archivos .md de DOCS_PATH que deben indexarse (excluye la plantilla).
+
+    Returns:
+        list[str]: Nombres de archivo.
+    """
+    return [
+        f
+        for f in os.listdir(DOCS_PATH)
+        if f.endswith(".md") and f.lower() != "template.md"
+    ]
@@ -3,20 +3,214 @@ Este módulo contiene utilidades para construir prompts estructurados compatible
 
 Funciones principales:
 - Construcción de mensajes en formato ChatML (`build_chatml_messages`).
-- Carga de prompts desde un archivo YAML (`load_prompt`, `load_formatted_prompt`).
+- Carga de prompts desde un archivo YAML (`load_prompt`, `load_formatted_prompt`) a
+  través de `prompt_registry`, que analiza el archivo una sola vez, precompila las
+  plantillas y solo lo vuelve a leer cuando cambia su fecha de modificación.
 - Extracción de intereses del usuario desde un prompt personalizado (`extract_user_interests_from_prompt`).
+- Extracción de los parámetros estructurados de un prompt rellenado con `prompt_base`
+  (`extract_prompt_parameters`).
 
 Todos los mensajes siguen el formato esperado por modelos como `gpt-3.5-turbo` o `gpt-4` cuando se usa la API de Azure OpenAI.
 """
 
+import os
 import re
+import string
+import threading
+
 import yaml
-from tiktoken import get_encoding
 
-from config.config import ENCODING_NAME, PROMPT_PATH
+from config.config import ENCODING_NAME, PROMPT_PATH, PROVIDER
+from modules.lazy import Lazy
+
+
+def _load_encoding():
+    """
+    Carga el codificador de `tiktoken` (importa la librería y, la primera vez, su tabla
+    BPE).
+
+    Con el proveedor `"stub"` usa `StubEncoding`, que no necesita descargar la tabla.
+    """
+    if PROVIDER == "stub":
+        from modules.stub_encoding import StubEncoding
+
+        return StubEncoding()
+
+    from tiktoken import get_encoding
+
+    return get_encoding(ENCODING_NAME)
+
+
+# Codificador de tokens para medir longitud de prompts (se carga en el primer uso)
+encoding = Lazy(_load_encoding)
+
+# Conversiones admitidas en los campos de las plantillas (`{campo!r}`, etc.)
+_CONVERSIONS = {"r": repr, "s": str, "a": ascii}
+
+
+class PromptRegistry:
+    """
+    Registro en memoria de los prompts del archivo YAML.
+
+    El archivo se analiza una única vez y se vuelve a cargar solo cuando cambia su
+    `mtime` (recarga en caliente). Al cargarlo, cada prompt se precompila en sus
+    fragmentos literales y campos (`string.Formatter().parse`) y se prepara la expresión
+    regular que permite extraer sus parámetros de un prompt rellenado; los tokens de su
+    parte estática se cuentan con `encoding` en la primera consulta. A partir de ahí,
+    construir un prompt es trabajo puro con cadenas en memoria.
+
+    Atributos:
+        path (str): Ruta del archivo YAML de prompts.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mtime = None
+        self._prompts = {}
+        self._templates = {}
+        self._static_tokens = {}
+        self._patterns = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str:
+        """
+        Devuelve el texto de un prompt.
+
+        Args:
+            key (str): Clave del prompt a recuperar.
+
+        Returns:
+            str: Texto del prompt correspondiente.
+
+        Raises:
+            KeyError: Si la clave no existe en el archivo YAML.
+        """
+        return self._entry("_prompts", key)
+
+    def format(self, key: str, **kwargs) -> str:
+        """
+        Rellena una plantilla precompilada con las variables indicadas.
+
+        Args:
+            key (str): Clave de la plantilla.
+            **kwargs: Variables de la plantilla (como {days}, {interests}, etc.).
+
+        Returns:
+            str: Prompt con las variables ya reemplazadas.
+
+        Raises:
+            KeyError: Si la clave o alguna de las variables no existen.
+        """
+        parts = []
+        for literal, field, spec, conversion in self._entry("_templates", key):
+            parts.append(literal)
+            if field is not None:
+                value = kwargs[field]
+                if conversion:
+                    value = _CONVERSIONS[conversion](value)
+                parts.append(format(value, spec or ""))
+        return "".join(parts)
+
+    def static_token_count(self, key: str) -> int:
+        """
+        Número de tokens de la parte estática de un prompt (sin contar sus variables).
+
+        Args:
+            key (str): Clave del prompt.
+
+        Returns:
+            int: Tokens de los fragmentos literales, medidos con `encoding` (se calculan
+            en la primera consulta de cada prompt, para no cargar el codificador al leer
+            el archivo).
+        """
+        parts = self._entry("_templates", key)
+        if key not in self._static_tokens:
+            self._static_tokens[key] = len(
+                encoding.encode("".join(part[0] for part in parts))
+            )
+        return self._static_tokens[key]
+
+    def parameter_pattern(self, key: str) -> re.Pattern:
+        """
+        Expresión regular que reconoce un prompt rellenado con la plantilla indicada.
 
-# Codificador de tokens para medir longitud de prompts
-encoding = get_encoding(ENCODING_NAME)
+        Cada `{campo}` es un grupo con nombre y los espacios de la plantilla admiten
+        cualquier separador en blanco (ver `extract_prompt_parameters`).
+
+        Args:
+            key (str): Clave de la plantilla.
+
+        Returns:
+            re.Pattern: Expresión compilada (sin distinguir mayúsculas).
+        """
+        return self._entry("_patterns", key)
+
+    def _entry(self, cache_name: str, key: str):
+        """
+        Recupera una entrada precalculada, recargando antes el archivo si ha cambiado.
+        """
+        self._refresh()
+        cache = getattr(self, cache_name)
+        if key not in cache:
+            raise KeyError(f"❌ Clave de prompt '{key}' no encontrada en {self.path}")
+        return cache[key]
+
+    def _refresh(self) -> None:
+        """
+        Vuelve a analizar el archivo YAML si su fecha de modificación ha cambiado.
+        """
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime == self._mtime:
+            return
+
+        with self._lock:
+            if mtime == self._mtime:
+                return
+
+            with open(self.path, "r", encoding="utf-8") as f:
+                prompts = {
+                    key: value
+                    for key, value in (yaml.safe_load(f) or {}).items()
+                    if isinstance(value, str) and value
+                }
+
+            templates = {
+                key: list(string.Formatter().parse(text))
+                for key, text in prompts.items()
+            }
+            self._static_tokens = {}
+            self._patterns = {
+                key: _compile_parameter_pattern(text) for key, text in prompts.items()
+            }
+            self._prompts, self._templates = prompts, templates
+            self._mtime = mtime
+
+
+def _compile_parameter_pattern(template: str) -> re.Pattern:
+    """
+    Convierte una plantilla en una expresión regular con un grupo con nombre por campo.
+    """
+    # Cada fragmento literal se escapa y los espacios admiten cualquier blanco
+    pattern = ""
+    for literal, field, _, _ in string.Formatter().parse(template.strip()):
+        if literal[:1].isspace():
+            pattern += r"\s*"
+        pattern += r"\s+".join(re.escape(part) for part in literal.split())
+        if literal[-1:].isspace():
+            pattern += r"\s*"
+        if field:
+            pattern += rf"(?P<{field}>.+?)"
+
+    return re.compile(pattern, re.IGNORECASE | re.DOTALL)
+
+
+# Registro compartido de prompts del sistema
+prompt_registry = PromptRegistry(PROMPT_PATH)
+
+# Captura intereses hasta el primer punto tras ellos
+_INTERESTS_PATTERN = re.compile(
+    r"intereses:\s*(?P<interests>.+?)\.", re.IGNORECASE | re.DOTALL
+)
 
 
 def build_chatml_messages(
@@ -55,7 +249,7 @@ def build_chatml_messages(
 
 def load_prompt(key: str) -> str:
     """
-    Carga un prompt desde el archivo YAML a partir de una clave.
+    Obtiene un prompt del archivo YAML a partir de una clave (desde `prompt_registry`).
 
     Args:
         key (str): Clave del prompt a recuperar.
@@ -66,17 +260,12 @@ def load_prompt(key: str) -> str:
     Raises:
         KeyError: Si la clave no existe en el archivo YAML.
     """
-    with open(PROMPT_PATH, "r", encoding="utf-8") as f:
-        data = yaml.safe_load(f)
-
-    if key not in data:
-        raise KeyError(f"❌ Clave de prompt '{key}' no encontrada en {PROMPT_PATH}")
-    return data[key]
+    return prompt_registry.get(key)
 
 
 def load_formatted_prompt(key: str, **kwargs) -> str:
     """
-    Carga un prompt desde el YAML y lo formatea con variables dinámicas.
+    Obtiene una plantilla precompilada del YAML y la formatea con variables dinámicas.
 
     Args:
         key (str): Clave del prompt a recuperar.
@@ -85,14 +274,7 @@ def load_formatted_prompt(key: str, **kwargs) -> str:
     Returns:
         str: Prompt con las variables ya reemplazadas.
     """
-    with open(PROMPT_PATH, "r", encoding="utf-8") as f:
-        data = yaml.safe_load(f)
-
-    template = data.get(key)
-    if not template:
-        raise KeyError(f"❌ Clave '{key}' no encontrada en el YAML.")
-
-    return template.format(**kwargs)
+    return prompt_registry.format(key, **kwargs)
 
 
 def extract_user_interests_from_prompt(
@@ -111,11 +293,45 @@ def extract_user_interests_from_prompt(
     Returns:
         list[str]: Lista de intereses normalizados (en minúsculas y sin espacios sobrantes).
     """
-    # Captura intereses hasta el primer punto tras ellos
-    pattern = r"intereses:\s*(?P<interests>.+?)\."
-
-    match = re.search(pattern, filled_prompt, re.IGNORECASE | re.DOTALL)
+    match = _INTERESTS_PATTERN.search(filled_prompt)
     if match:
         interests_str = match.group("interests").strip()
         return [i.strip().lower() for i in interests_str.split(",") if i.strip()]
     return []
+
+
+def extract_prompt_parameters(
+    filled_prompt: str, key: str = "prompt_base"
+) -> tuple[dict, str]:
+    """
+    Separa un prompt rellenado con una plantilla del YAML en sus parámetros y el texto
+    libre.
+
+    La plantilla precompilada en `prompt_registry` (cada `{campo}` es un grupo con
+    nombre) se compara con el inicio del prompt; lo que queda tras la plantilla es el
+    texto libre escrito por el usuario. Los valores se normalizan (minúsculas, espacios
+    colapsados) y los intereses se ordenan, de modo que dos prompts con la misma
+    selección en la interfaz producen los mismos parámetros.
+
+    Args:
+        filled_prompt (str): Texto completo del prompt ya instanciado.
+        key (str): Clave de la plantilla utilizada para rellenar el prompt.
+
+    Returns:
+        tuple[dict, str]: Parámetros extraídos (vacío si el prompt no sigue la
+        plantilla) y texto libre restante (el prompt completo si no hay coincidencia).
+    """
+    match = prompt_registry.parameter_pattern(key).match(filled_prompt.strip())
+    if not match:
+        return {}, filled_prompt
+
+    params = {
+        field: " ".join(value.split()).lower()
+        for field, value in match.groupdict().items()
+    }
+    if "interests" in params:
+        params["interests"] = ", ".join(
+            sorted(i.strip() for i in params["interests"].split(",") if i.strip())
+        )
+
+    return params, filled_prompt.strip()[match.end() :].strip()
@@ -0,0 +1,152 @@
+"""
+Utilidades de control de cuota para las llamadas a Azure OpenAI.
+
+Este módulo permite respetar las cuotas de tokens por minuto (TPM) y peticiones por
+minuto (RPM) de un despliegue cuando varias tareas concurrentes comparten el mismo
+endpoint:
+
+- `TokenBucket`: cubo de tokens thread-safe que se rellena de forma continua.
+- `RateLimiter`: combina un cubo de TPM y otro de RPM para reservar cuota antes de cada
+  llamada.
+- `call_with_backoff`: reintenta una llamada ante respuestas 429, respetando la cabecera
+  `Retry-After` cuando el servicio la envía y aplicando espera exponencial en caso
+  contrario.
+"""
+
+import random
+import threading
+import time
+from typing import Any, Callable, Optional
+
+
+class TokenBucket:
+    """
+    Cubo de tokens thread-safe con relleno continuo.
+
+    Atributos:
+        capacity (float): Número máximo de tokens acumulables.
+        refill_rate (float): Tokens añadidos por segundo.
+    """
+
+    def __init__(self, capacity: float, refill_rate: float):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated_at
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.refill_rate)
+        self._updated_at = now
+
+    def acquire(self, amount: float = 1.0):
+        """
+        Bloquea hasta disponer de `amount` tokens y los consume.
+
+        Si se piden más tokens que la capacidad del cubo, se espera a tenerlo lleno y se
+        deja el saldo en negativo, de modo que la deuda se paga en las siguientes
+        peticiones.
+
+        Args:
+            amount (float): Tokens a consumir.
+        """
+        while True:
+            with self._lock:
+                self._refill()
+                needed = min(amount, self.capacity)
+                if self._tokens >= needed:
+                    self._tokens -= amount
+                    return
+                wait = (needed - self._tokens) / self.refill_rate
+            time.sleep(wait)
+
+
+class RateLimiter:
+    """
+    Limitador combinado de tokens por minuto (TPM) y peticiones por minuto (RPM).
+
+    Atributos:
+        tokens (TokenBucket): Cubo de tokens por minuto.
+        requests (TokenBucket): Cubo de peticiones por minuto.
+    """
+
+    def __init__(self, tokens_per_minute: int, requests_per_minute: int):
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+
+    def acquire(self, tokens: int):
+        """
+        Reserva una petición y `tokens` tokens de cuota, bloqueando si es necesario.
+
+        Args:
+            tokens (int): Tokens estimados de la petición.
+        """
+        self.requests.acquire(1)
+        self.tokens.acquire(tokens)
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Extrae el tiempo de espera indicado por el servicio en una respuesta 429.
+
+    Admite las cabeceras `retry-after-ms` (Azure OpenAI) y `retry-after` (segundos).
+
+    Args:
+        error (Exception): Excepción lanzada por el cliente HTTP.
+
+    Returns:
+        float | None: Segundos a esperar, o None si la excepción no es un 429.
+    """
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(
+        response, "status_code", None
+    )
+    if status != 429:
+        return None
+
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000.0
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return 0.0
+
+
+def call_with_backoff(
+    fn: Callable[..., Any],
+    *args: Any,
+    max_retries: int = 5,
+    base_delay: float = 1.0,
+    **kwargs: Any,
+) -> Any:
+    """
+    Ejecuta `fn` reintentando cuando el servicio responde 429 (límite de cuota).
+
+    Se respeta `Retry-After` si está presente; si no, se espera `base_delay * 2^intento`
+    con un pequeño margen aleatorio. Cualquier otro error se propaga inmediatamente.
+
+    Args:
+        fn (Callable): Función a ejecutar.
+        *args: Argumentos posicionales de `fn`.
+        max_retries (int): Número máximo de reintentos.
+        base_delay (float): Espera base (segundos) para el backoff exponencial.
+        **kwargs: Argumentos con nombre de `fn`.
+
+    Returns:
+        Any: Resultado de `fn`.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            wait = retry_after_seconds(e)
+            if wait is None or attempt == max_retries:
+                raise
+            if not wait:
+                wait = base_delay * (2**attempt)
+            time.sleep(wait + random.uniform(0, base_delay / 2))
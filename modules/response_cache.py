@@ -0,0 +1,175 @@
+"""
+Caché en memoria de respuestas generadas (itinerarios) con expiración TTL y expulsión
+LRU.
+
+Muchas peticiones de la interfaz comparten los mismos parámetros estructurados de
+`prompt_base` (días, presupuesto, tipo de viaje e intereses) y solo difieren en la
+redacción del texto libre. Esta caché permite devolver un itinerario ya generado sin
+repetir la recuperación ni la llamada al LLM, que es el paso más costoso del flujo.
+
+Dos niveles de búsqueda:
+- Exacto: clave `sha256` del prompt normalizado (Unicode NFC, minúsculas, espacios
+  colapsados).
+- Semántico (opcional, desactivado por defecto): entre las entradas con los mismos
+  parámetros estructurados (`group`), devuelve la más cercana si la distancia coseno
+  entre los embeddings del texto libre (ver `CacheAgent`) no supera `semantic_distance`.
+
+Expone:
+- `ResponseCache`: implementación de la caché.
+- `response_cache`: instancia configurada desde `config`, compartida por el grafo.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+
+from config.config import (
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_SEMANTIC_DISTANCE,
+    RESPONSE_CACHE_TTL_SECONDS,
+)
+from modules.embedding_cache import normalize_text
+from modules.similarity import cosine_similarities
+
+
+class ResponseCache:
+    """
+    Caché LRU con TTL de respuestas, con búsqueda exacta y búsqueda semántica por grupo.
+
+    Es segura para su uso desde varios hilos (un único `threading.Lock` protege el
+    estado).
+
+    Atributos:
+        ttl_seconds (float): Tiempo de vida de cada entrada, en segundos.
+        max_entries (int): Número máximo de entradas antes de expulsar las menos usadas.
+        semantic_distance (float): Distancia coseno máxima para un acierto semántico
+            (0 desactiva el nivel semántico).
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int, semantic_distance: float):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.semantic_distance = semantic_distance
+        self._entries = OrderedDict()  # clave -> (instante, grupo, embedding, valor)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(prompt: str) -> str:
+        """
+        Calcula la clave exacta de un prompt a partir de su forma normalizada.
+
+        Args:
+            prompt (str): Prompt completo enviado al grafo.
+
+        Returns:
+            str: Hash hexadecimal `sha256` del prompt normalizado.
+        """
+        return hashlib.sha256(
+            normalize_text(prompt).lower().encode("utf-8")
+        ).hexdigest()
+
+    def get(
+        self,
+        key: str,
+        group: Optional[str] = None,
+        embedding: Optional[List[float]] = None,
+    ) -> Optional[dict]:
+        """
+        Busca una respuesta en la caché, primero por clave exacta y después por
+        similitud.
+
+        Args:
+            key (str): Clave exacta del prompt (ver `make_key`).
+            group (str | None): Identificador de los parámetros estructurados del
+                prompt.
+            embedding (List[float] | None): Embedding de la consulta para el nivel
+                semántico.
+
+        Returns:
+            dict | None: Valor almacenado o `None` si no hay acierto.
+        """
+        with self._lock:
+            self._evict_expired()
+
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][3]
+
+            if group is None or embedding is None or self.semantic_distance <= 0:
+                return None
+
+            candidates = [
+                (candidate_key, entry[2])
+                for candidate_key, entry in self._entries.items()
+                if entry[1] == group and entry[2] is not None
+            ]
+            if not candidates:
+                return None
+
+            similarities = cosine_similarities(
+                embedding, [vector for _, vector in candidates]
+            )
+            best = int(np.argmax(similarities))
+            if 1.0 - similarities[best] > self.semantic_distance:
+                return None
+
+            best_key = candidates[best][0]
+            self._entries.move_to_end(best_key)
+            return self._entries[best_key][3]
+
+    def put(
+        self,
+        key: str,
+        value: dict,
+        group: Optional[str] = None,
+        embedding: Optional[List[float]] = None,
+    ) -> None:
+        """
+        Guarda una respuesta en la caché, expulsando las entradas menos usadas si se
+        supera el límite.
+
+        Args:
+            key (str): Clave exacta del prompt (ver `make_key`).
+            value (dict): Valor a almacenar (respuesta y documentos recuperados).
+            group (str | None): Identificador de los parámetros estructurados del
+                prompt.
+            embedding (List[float] | None): Embedding de la consulta para el nivel
+                semántico.
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic(), group, embedding, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Elimina todas las entradas de la caché.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _evict_expired(self) -> None:
+        """
+        Elimina las entradas cuyo tiempo de vida ha expirado (debe llamarse con el lock
+        adquirido).
+        """
+        deadline = time.monotonic() - self.ttl_seconds
+        expired = [key for key, entry in self._entries.items() if entry[0] < deadline]
+        for key in expired:
+            del self._entries[key]
+
+
+# Caché compartida por todas las ejecuciones del grafo en el proceso
+response_cache = ResponseCache(
+    ttl_seconds=RESPONSE_CACHE_TTL_SECONDS,
+    max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+    semantic_distance=RESPONSE_CACHE_SEMANTIC_DISTANCE,
+)
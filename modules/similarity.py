@@ -0,0 +1,80 @@
+"""
+Utilidades vectorizadas de similitud coseno basadas en NumPy.
+
+Este módulo sustituye las llamadas a `sklearn.metrics.pairwise.cosine_similarity`
+documento a documento por operaciones sobre matrices completas:
+- Los vectores se convierten a `float32` y se normalizan una única vez (norma L2).
+- La similitud de una consulta con todos los candidatos se obtiene con un único producto
+  matriz-vector.
+
+Expone:
+- `normalize_rows`: normaliza por filas una matriz de vectores.
+- `normalize_vector`: normaliza un único vector.
+- `cosine_similarities`: similitud coseno entre una consulta y un conjunto de vectores.
+"""
+
+from typing import Sequence
+
+import numpy as np
+
+
+def normalize_rows(vectors: Sequence[Sequence[float]] | np.ndarray) -> np.ndarray:
+    """
+    Convierte una colección de vectores en una matriz `float32` con filas de norma
+    unitaria.
+
+    Las filas con norma cero se mantienen a cero para evitar divisiones inválidas.
+
+    Args:
+        vectors (Sequence[Sequence[float]] | np.ndarray): Vectores a normalizar (uno por
+            fila).
+
+    Returns:
+        np.ndarray: Matriz `float32` de forma (n, dim) normalizada por filas.
+    """
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0.0] = 1.0
+    return matrix / norms
+
+
+def normalize_vector(vector: Sequence[float] | np.ndarray) -> np.ndarray:
+    """
+    Convierte un vector en un array `float32` de norma unitaria.
+
+    Args:
+        vector (Sequence[float] | np.ndarray): Vector a normalizar.
+
+    Returns:
+        np.ndarray: Vector `float32` normalizado (o a cero si su norma es cero).
+    """
+    return normalize_rows(vector)[0]
+
+
+def cosine_similarities(
+    query: Sequence[float] | np.ndarray,
+    vectors: Sequence[Sequence[float]] | np.ndarray,
+    normalized: bool = False,
+) -> np.ndarray:
+    """
+    Calcula la similitud coseno entre una consulta y todos los vectores candidatos.
+
+    Args:
+        query (Sequence[float] | np.ndarray): Vector de la consulta.
+        vectors (Sequence[Sequence[float]] | np.ndarray): Vectores candidatos (uno por
+            fila).
+        normalized (bool): Indica si `vectors` ya es una matriz `float32` normalizada
+                           por filas, en cuyo caso se evita volver a normalizarla.
+
+    Returns:
+        np.ndarray: Array `float32` con la similitud de cada candidato, en el mismo
+        orden.
+    """
+    if len(vectors) == 0:
+        return np.empty(0, dtype=np.float32)
+
+    matrix = vectors if normalized else normalize_rows(vectors)
+    return matrix @ normalize_vector(query)
@@ -0,0 +1,52 @@
+"""
+Tokenizador determinista y sin red para el proveedor `"stub"` (`KOALA_PROVIDER=stub`).
+
+Sustituye a la codificación de `tiktoken`, cuya tabla BPE se descarga de internet en el
+primer uso. Vive separado de `modules.stubs` para que contar tokens (p. ej. al pintar la
+interfaz) no importe LangChain ni el almacén vectorial.
+
+Expone:
+- `StubEncoding`: tokenizador por palabras y signos de puntuación.
+"""
+
+import re
+import threading
+from typing import List
+
+
+class StubEncoding:
+    """
+    Sustituto sin red de la codificación de `tiktoken` (`encode` / `decode`).
+
+    Cada palabra o grupo de signos, con el espacio que la precede, es un token, lo que
+    da recuentos del mismo orden que `cl100k_base` para textos en español. Los
+    identificadores se asignan en orden de aparición y `decode(encode(texto)) == texto`.
+    """
+
+    _PATTERN = re.compile(r"\s*\w+|\s*[^\w\s]+|\s+")
+
+    def __init__(self):
+        self._ids = {}
+        self._pieces = []
+        self._lock = threading.Lock()
+
+    def encode(self, text: str) -> List[int]:
+        """
+        Divide un texto en tokens y devuelve sus identificadores.
+        """
+        tokens = []
+        for piece in self._PATTERN.findall(text):
+            token = self._ids.get(piece)
+            if token is None:
+                with self._lock:
+                    token = self._ids.setdefault(piece, len(self._pieces))
+                    if token == len(self._pieces):
+                        self._pieces.append(piece)
+            tokens.append(token)
+        return tokens
+
+    def decode(self, tokens: List[int]) -> str:
+        """
+        Reconstruye el texto a partir de identificadores devueltos por `encode`.
+        """
+        return "".join(self._pieces[token] for token in tokens)
@@ -0,0 +1,287 @@
+"""
+Implementaciones deterministas, en proceso y sin red de los servicios externos del
+sistema.
+
+Se activan con el proveedor `"stub"` (`KOALA_PROVIDER=stub`, ver `config.PROVIDER`) y
+permiten ejecutar el flujo completo (`run_prompt`) sin credenciales de Azure, por
+ejemplo en los benchmarks de `benchmarks/`, de modo que las regresiones de la
+orquestación propia se miden por separado de la variabilidad de los servicios reales.
+
+Componentes:
+- `HashEmbeddings`: embeddings deterministas por hashing de palabras (mismo texto →
+  mismo vector, textos con palabras en común → vectores cercanos).
+- `StubChatClient` / `AsyncStubChatClient`: imitan `client.chat.completions.create` de
+  OpenAI (con y sin `stream=True`), con latencia hasta el primer token y velocidad de
+  generación muestreadas de distribuciones normales configurables y reproducibles
+  (`STUB_LLM_*`).
+- `build_stub_vector_store`: `LocalVectorStore` en memoria con las secciones de
+  `DOCS_PATH/*.md` embebidas con `HashEmbeddings`.
+
+El tokenizador equivalente (`StubEncoding`) está en `modules.stub_encoding`, para que
+medir tokens no importe LangChain.
+"""
+
+import asyncio
+import hashlib
+import json
+import re
+import time
+from types import SimpleNamespace
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config.config import (
+    ANN_NLIST,
+    ANN_NPROBE,
+    ANN_TRAIN_ITERATIONS,
+    LOCAL_SEARCH_MODE,
+    STUB_EMBEDDING_DIM,
+    STUB_LLM_COMPLETION_TOKENS,
+    STUB_LLM_TOKENS_PER_S,
+    STUB_LLM_TOKENS_PER_S_STD,
+    STUB_LLM_TTFT_MS,
+    STUB_LLM_TTFT_STD_MS,
+    STUB_SEED,
+)
+from modules.instrumentation import record_call
+from modules.local_vector_store import LocalVectorStore
+from modules.markdown_sections import build_section_documents, list_md_files
+from modules.prompt_utils import encoding
+
+
+def _digest(text: str, seed: int) -> bytes:
+    """
+    Hash estable (independiente de `PYTHONHASHSEED`) de un texto con semilla.
+    """
+    return hashlib.blake2b(
+        text.encode("utf-8"), digest_size=8, salt=seed.to_bytes(8, "little")
+    ).digest()
+
+
+# ---------- EMBEDDINGS ----------
+class HashEmbeddings(Embeddings):
+    """
+    Embeddings deterministas: cada palabra suma ±1 en una dimensión elegida por su hash.
+
+    El vector resultante se normaliza, por lo que la similitud coseno entre dos textos
+    crece con las palabras que comparten, suficiente para que la recuperación sea
+    coherente en pruebas. Como el modelo real, anota cada llamada en la instrumentación
+    del nodo en curso.
+
+    Atributos:
+        dim (int): Dimensión de los vectores.
+        seed (int): Semilla del hash (cambia la asignación palabra → dimensión).
+    """
+
+    def __init__(self, dim: int = STUB_EMBEDDING_DIM, seed: int = STUB_SEED):
+        self.dim = dim
+        self.seed = seed
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            value = int.from_bytes(_digest(word, self.seed), "little")
+            vector[value % self.dim] += 1.0 if (value >> 32) & 1 else -1.0
+
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        record_call("embedding")
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        record_call("embedding")
+        return self._embed(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return self.embed_query(text)
+
+
+# ---------- CHAT ----------
+class _StubCompletionPlan:
+    """
+    Respuesta simulada de una petición: texto, tokens y tiempos, derivados de los
+    mensajes.
+
+    La semilla del generador aleatorio depende de los mensajes, de modo que la misma
+    petición tiene siempre la misma latencia con independencia del orden o la
+    concurrencia.
+    """
+
+    def __init__(self, messages: List[dict], max_tokens: int, seed: int):
+        payload = json.dumps(messages, ensure_ascii=False, sort_keys=True)
+        rng = np.random.default_rng(int.from_bytes(_digest(payload, seed), "little"))
+
+        self.ttft = max(rng.normal(STUB_LLM_TTFT_MS, STUB_LLM_TTFT_STD_MS), 0.0) / 1000
+        self.tokens_per_s = max(
+            rng.normal(STUB_LLM_TOKENS_PER_S, STUB_LLM_TOKENS_PER_S_STD), 1.0
+        )
+        self.prompt_tokens = sum(
+            len(encoding.encode(m.get("content") or "")) for m in messages
+        )
+        self.completion_tokens = min(STUB_LLM_COMPLETION_TOKENS, max_tokens)
+
+        # El texto repite las palabras del último mensaje (una palabra ≈ un token)
+        words = re.findall(r"\w+", messages[-1].get("content") or "") or ["koala"]
+        self.pieces = [
+            ("" if i == 0 else " ") + words[i % len(words)]
+            for i in range(self.completion_tokens)
+        ]
+
+    def usage(self) -> SimpleNamespace:
+        return SimpleNamespace(
+            prompt_tokens=self.prompt_tokens,
+            completion_tokens=self.completion_tokens,
+            total_tokens=self.prompt_tokens + self.completion_tokens,
+        )
+
+    def response(self, model: str) -> SimpleNamespace:
+        message = SimpleNamespace(role="assistant", content="".join(self.pieces))
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")],
+            usage=self.usage(),
+        )
+
+    def chunks(
+        self, model: str, include_usage: bool = False
+    ) -> Iterator[Tuple[float, SimpleNamespace]]:
+        """
+        Genera `(espera en segundos, fragmento)` para cada token de la respuesta.
+
+        Con `include_usage`, como el servicio real, añade un último fragmento sin
+        `choices` con el `usage` de la petición.
+        """
+        for i, piece in enumerate(self.pieces):
+            delta = SimpleNamespace(content=piece)
+            chunk = SimpleNamespace(
+                model=model,
+                choices=[SimpleNamespace(index=0, delta=delta, finish_reason=None)],
+                usage=None,
+            )
+            yield (self.ttft if i == 0 else 1.0 / self.tokens_per_s), chunk
+        if include_usage:
+            yield 0.0, SimpleNamespace(model=model, choices=[], usage=self.usage())
+
+
+class StubChatClient:
+    """
+    Cliente de chat simulado con la interfaz de `openai.AzureOpenAI` usada por
+    `modules.llm`.
+
+    `chat.completions.create` espera la latencia hasta el primer token más la generación
+    de `completion_tokens` a la velocidad muestreada y devuelve un objeto con `choices`
+    y `usage`; con `stream=True` devuelve un iterador de fragmentos con
+    `choices[0].delta.content`.
+
+    Atributos:
+        seed (int): Semilla de las latencias simuladas.
+    """
+
+    def __init__(self, seed: int = STUB_SEED):
+        self.seed = seed
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(
+        self,
+        model: str,
+        messages: List[dict],
+        max_tokens: int = STUB_LLM_COMPLETION_TOKENS,
+        stream: bool = False,
+        stream_options: Optional[dict] = None,
+        **kwargs,
+    ):
+        plan = _StubCompletionPlan(messages, max_tokens, self.seed)
+        if stream:
+            include_usage = bool((stream_options or {}).get("include_usage"))
+            return self._stream(plan, model, include_usage)
+
+        time.sleep(plan.ttft + plan.completion_tokens / plan.tokens_per_s)
+        return plan.response(model)
+
+    @staticmethod
+    def _stream(
+        plan: _StubCompletionPlan, model: str, include_usage: bool
+    ) -> Iterator[SimpleNamespace]:
+        for delay, chunk in plan.chunks(model, include_usage):
+            time.sleep(delay)
+            yield chunk
+
+
+class AsyncStubChatClient:
+    """
+    Variante asíncrona de `StubChatClient` (interfaz de `openai.AsyncAzureOpenAI`).
+
+    Atributos:
+        seed (int): Semilla de las latencias simuladas.
+    """
+
+    def __init__(self, seed: int = STUB_SEED):
+        self.seed = seed
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(
+        self,
+        model: str,
+        messages: List[dict],
+        max_tokens: int = STUB_LLM_COMPLETION_TOKENS,
+        stream: bool = False,
+        stream_options: Optional[dict] = None,
+        **kwargs,
+    ):
+        plan = _StubCompletionPlan(messages, max_tokens, self.seed)
+        if stream:
+            include_usage = bool((stream_options or {}).get("include_usage"))
+            return self._stream(plan, model, include_usage)
+
+        await asyncio.sleep(plan.ttft + plan.completion_tokens / plan.tokens_per_s)
+        return plan.response(model)
+
+    @staticmethod
+    async def _stream(
+        plan: _StubCompletionPlan, model: str, include_usage: bool
+    ) -> AsyncIterator[SimpleNamespace]:
+        for delay, chunk in plan.chunks(model, include_usage):
+            await asyncio.sleep(delay)
+            yield chunk
+
+
+# ---------- BÚSQUEDA ----------
+def build_stub_vector_store(embeddings: Embeddings) -> LocalVectorStore:
+    """
+    Construye un almacén vectorial en memoria con todas las secciones de `DOCS_PATH`.
+
+    Args:
+        embeddings (Embeddings): Modelo con el que se embeben secciones y consultas.
+
+    Returns:
+        LocalVectorStore: Almacén con la misma interfaz que el de Azure Search.
+    """
+    documents = []
+    for file_name in sorted(list_md_files()):
+        _, file_documents = build_section_documents(file_name)
+        documents.extend(file_documents)
+
+    vectors = embeddings.embed_documents([doc["content"] for doc in documents])
+    for doc, vector in zip(documents, vectors):
+        doc["content_vector"] = vector
+
+    store = LocalVectorStore(
+        None,
+        embedding_function=embeddings.embed_query,
+        async_embedding_function=embeddings.aembed_query,
+        search_mode=LOCAL_SEARCH_MODE,
+        nprobe=ANN_NPROBE,
+        nlist=ANN_NLIST,
+        train_iterations=ANN_TRAIN_ITERATIONS,
+    )
+    store.upsert(documents)
+    return store
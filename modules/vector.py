@@ -1,50 +1,197 @@
 """
-Módulo para inicializar los embeddings y el vector store de Azure Cognitive Search.
+Módulo para inicializar los embeddings y el vector store utilizado por el sistema.
 
 Este módulo configura dos componentes esenciales para la fase de recuperación semántica (RAG):
 
-1. `embeddings`: Modelo de embeddings de Azure OpenAI, encargado de convertir textos en vectores
-   utilizando un despliegue configurado del modelo `text-embedding-3-large` (u otro compatible).
-2. `vector_store`: Objeto `AzureSearch` de LangChain configurado para realizar búsquedas híbridas
-   (semánticas + léxicas) sobre un índice existente en Azure Cognitive Search.
+1. `embeddings`: Modelo de embeddings de Azure OpenAI, encargado de convertir textos en
+   vectores utilizando un despliegue configurado del modelo `text-embedding-3-large` (u
+   otro compatible). Si `EMBEDDING_CACHE_ENABLED` está activo, se envuelve en
+   `CachedEmbeddings` para reutilizar los vectores ya calculados (ver
+   `modules.embedding_cache`). Las variantes asíncronas usan un modelo por bucle de
+   eventos (`LoopAwareEmbeddings`).
+2. `vector_store`: Objeto `AzureVectorStore` (ver `modules.azure_vector_store`)
+   configurado para realizar búsquedas híbridas (semánticas + léxicas) sobre un índice
+   existente en Azure Cognitive Search, devolviendo además la similitud coseno de cada
+   resultado. Con `VECTOR_BACKEND = "local"` se usa en su lugar un `LocalVectorStore` en
+   proceso (ver `modules.local_vector_store`), con la misma interfaz y sin acceso a la
+   red, con búsqueda exacta o aproximada (IVF) según `LOCAL_SEARCH_MODE`.
+
+Con el proveedor `"stub"` (`KOALA_PROVIDER=stub`) ambos componentes se sustituyen por
+sus equivalentes deterministas sin red de `modules.stubs`: `HashEmbeddings` y un
+`LocalVectorStore` en memoria con las secciones de `DOCS_PATH`.
+
+Ambos se construyen de forma diferida (`Lazy`) en su primer uso: importar este módulo no
+crea clientes ni carga LangChain ni los SDK de Azure (se importan dentro de cada
+constructor), y un proceso que solo necesita los embeddings (p. ej. `uploader.py`) no
+construye el vector store.
 
 Exporta:
+- `embeddings`: Modelo de embeddings (con caché, si está activa).
 - `vector_store`: Instancia lista para ser utilizada por el agente de recuperación (`RetrieverAgent`).
 """
 
-from langchain_openai import AzureOpenAIEmbeddings
-from langchain_community.vectorstores import AzureSearch
+from typing import Callable, List, Optional
 
 from config.config import (
+    ANN_NLIST,
+    ANN_NPROBE,
+    ANN_TRAIN_ITERATIONS,
+    API_VERSION_EMBEDDINGS,
     AZURE_OPENAI_EMBEDDINGS_API_KEY,
     AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT,
     AZURE_OPENAI_EMBEDDINGS_ENDPOINT,
     AZURE_SEARCH_ENDPOINT,
     AZURE_SEARCH_KEY,
+    EMBEDDING_CACHE_ENABLED,
+    EMBEDDING_CACHE_MAX_ENTRIES,
+    EMBEDDING_CACHE_PATH,
+    HTTP_MAX_RETRIES,
     INDEX_NAME,
-    API_VERSION_EMBEDDINGS,
+    LOCAL_INDEX_PATH,
+    LOCAL_SEARCH_MODE,
+    PROVIDER,
+    VECTOR_BACKEND,
 )
+from modules.instrumentation import record_call
+from modules.lazy import Lazy, LazyPerLoop
+
 
 # ---------- EMBEDDINGS ----------
-# Inicializa el modelo de embeddings usando Azure OpenAI.
-# Este modelo convierte las consultas y los documentos en vectores numéricos (embeddings),
-# que posteriormente se utilizan para realizar búsquedas semánticas en Azure Cognitive Search.
-# El despliegue del modelo debe haberse realizado previamente en Azure OpenAI y configurado en el sistema.
-embeddings = AzureOpenAIEmbeddings(
-    azure_deployment=AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT,
-    azure_endpoint=AZURE_OPENAI_EMBEDDINGS_ENDPOINT,
-    openai_api_key=AZURE_OPENAI_EMBEDDINGS_API_KEY,
-    openai_api_type="azure",
-    openai_api_version=API_VERSION_EMBEDDINGS,
-)
+class LoopAwareEmbeddings:
+    """
+    Modelo de embeddings con un cliente asíncrono por bucle de eventos.
 
+    Implementa la interfaz `Embeddings` de LangChain (`embed_*` y `aembed_*`).
 
-# ---------- VECTOR STORE ----------
-# Configura el almacén vectorial utilizando Azure Cognitive Search.
-# Este objeto permite realizar búsquedas por similitud utilizando los vectores generados por el modelo de embeddings.
-vector_store = AzureSearch(
-    azure_search_endpoint=AZURE_SEARCH_ENDPOINT,
-    azure_search_key=AZURE_SEARCH_KEY,
-    index_name=INDEX_NAME,
-    embedding_function=embeddings.embed_query,
-)
+    El cliente asíncrono de OpenAI queda ligado al bucle en el que abre sus conexiones,
+    así que las variantes asíncronas delegan en un modelo construido para el bucle en
+    curso (con su `httpx.AsyncClient`, ver `modules.clients`); las síncronas usan un
+    único modelo compartido.
+
+    Cada llamada se anota en la instrumentación del nodo en curso
+    (`record_call("embedding")`); detrás de `CachedEmbeddings` solo llegan los fallos
+    de caché.
+
+    Atributos:
+        build (Callable): Fábrica del modelo; recibe el cliente `httpx` asíncrono a usar
+            (`None` para el modelo síncrono).
+    """
+
+    def __init__(self, build: Callable[[Optional[object]], object]):
+        from modules.clients import get_async_http_client
+
+        self.build = build
+        self._model = build(None)
+        self._async_models = LazyPerLoop(lambda: build(get_async_http_client()))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        record_call("embedding")
+        return self._model.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        record_call("embedding")
+        return self._model.embed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        record_call("embedding")
+        return await self._async_models.resolve().aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        record_call("embedding")
+        return await self._async_models.resolve().aembed_query(text)
+
+
+def _build_embeddings():
+    """
+    Inicializa el modelo de embeddings usando Azure OpenAI.
+
+    Este modelo convierte las consultas y los documentos en vectores numéricos
+    (embeddings), que posteriormente se utilizan para realizar búsquedas semánticas en
+    Azure Cognitive Search. El despliegue del modelo debe haberse realizado previamente
+    en Azure OpenAI y configurado en el sistema.
+    """
+    if PROVIDER == "stub":
+        from modules.stubs import HashEmbeddings
+
+        return HashEmbeddings()
+    if PROVIDER != "azure":
+        raise ValueError(f"❌ PROVIDER desconocido: '{PROVIDER}'")
+
+    from langchain_openai import AzureOpenAIEmbeddings
+
+    from modules.clients import get_http_client, http_timeout
+    from modules.embedding_cache import CachedEmbeddings, EmbeddingCache
+
+    def build(http_async_client) -> AzureOpenAIEmbeddings:
+        return AzureOpenAIEmbeddings(
+            azure_deployment=AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT,
+            azure_endpoint=AZURE_OPENAI_EMBEDDINGS_ENDPOINT,
+            openai_api_key=AZURE_OPENAI_EMBEDDINGS_API_KEY,
+            openai_api_type="azure",
+            openai_api_version=API_VERSION_EMBEDDINGS,
+            http_client=get_http_client(),
+            http_async_client=http_async_client,
+            max_retries=HTTP_MAX_RETRIES,
+            timeout=http_timeout(),
+        )
+
+    model = LoopAwareEmbeddings(build)
+
+    # Caché persistente: las claves incluyen despliegue y versión de la API para
+    # no mezclar modelos
+    if EMBEDDING_CACHE_ENABLED:
+        model = CachedEmbeddings(
+            model,
+            EmbeddingCache(EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES),
+            namespace=f"{AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT}|{API_VERSION_EMBEDDINGS}",
+        )
+    return model
+
+
+# Se construye en el primer uso (ver `modules.lazy`)
+embeddings = Lazy(_build_embeddings)
+
+
+def _build_vector_store():
+    """
+    Configura el almacén vectorial según `VECTOR_BACKEND` (Azure Cognitive Search o
+    índice local).
+
+    Este objeto permite realizar búsquedas por similitud utilizando los vectores
+    generados por el modelo de embeddings. Con el proveedor "stub" se indexan en memoria
+    los .md de `DOCS_PATH`.
+    """
+    if PROVIDER == "stub":
+        from modules.stubs import build_stub_vector_store
+
+        return build_stub_vector_store(embeddings.resolve())
+    if VECTOR_BACKEND == "local":
+        from modules.local_vector_store import LocalVectorStore
+
+        return LocalVectorStore(
+            LOCAL_INDEX_PATH,
+            embedding_function=embeddings.embed_query,
+            async_embedding_function=embeddings.aembed_query,
+            search_mode=LOCAL_SEARCH_MODE,
+            nprobe=ANN_NPROBE,
+            nlist=ANN_NLIST,
+            train_iterations=ANN_TRAIN_ITERATIONS,
+        )
+    if VECTOR_BACKEND == "azure":
+        from modules.azure_vector_store import AzureVectorStore
+        from modules.clients import get_search_client, search_client_options
+
+        return AzureVectorStore(
+            azure_search_endpoint=AZURE_SEARCH_ENDPOINT,
+            azure_search_key=AZURE_SEARCH_KEY,
+            index_name=INDEX_NAME,
+            embedding_function=embeddings.embed_query,
+            async_embedding_function=embeddings.aembed_query,
+            search_client=get_search_client(),
+            additional_search_client_options=search_client_options(),
+        )
+    raise ValueError(f"❌ VECTOR_BACKEND desconocido: '{VECTOR_BACKEND}'")
+
+
+# Se construye en el primer uso (ver `modules.lazy`)
+vector_store = Lazy(_build_vector_store)
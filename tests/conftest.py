@@ -0,0 +1,14 @@
+"""
+Configuración común de las pruebas.
+
+Las pruebas se ejecutan sin red ni credenciales con el proveedor `"stub"`
+(ver `modules.stubs`) y desde la raíz del proyecto, ya que las rutas de `config`
+son relativas a ella.
+"""
+
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+os.environ["KOALA_PROVIDER"] = "stub"
+os.chdir(ROOT)
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from modules.ann_index import IVFIndex, perturbed_queries, recall_latency_report, top_k
+from modules.similarity import normalize_rows
+
+
+@pytest.fixture(scope="module")
+def vectors():
+    rng = np.random.default_rng(1)
+    return normalize_rows(rng.normal(size=(300, 64)))
+
+
+def exact(vectors, query, k, allowed=None):
+    rows = np.arange(vectors.shape[0])
+    if allowed is not None:
+        rows = rows[allowed]
+    return top_k(rows, vectors[rows] @ query, k)
+
+
+def test_probing_every_list_matches_exact_search(vectors):
+    index = IVFIndex.train(vectors, nlist=16, iterations=5)
+    allowed = np.arange(vectors.shape[0]) % 3 == 0
+
+    for query in perturbed_queries(vectors, 20, noise=0.5):
+        rows, similarities = index.search(vectors, query, 10, nprobe=index.nlist)
+        expected_rows, expected_similarities = exact(vectors, query, 10)
+        np.testing.assert_array_equal(rows, expected_rows)
+        np.testing.assert_allclose(similarities, expected_similarities, rtol=1e-5)
+
+        rows, _ = index.search(vectors, query, 10, index.nlist, allowed)
+        np.testing.assert_array_equal(rows, exact(vectors, query, 10, allowed)[0])
+
+
+def test_prefilter_probes_extra_lists_until_k_candidates(vectors):
+    index = IVFIndex.train(vectors, nlist=16, iterations=5)
+    allowed = np.zeros(vectors.shape[0], dtype=bool)
+    allowed[:5] = True
+
+    rows, _ = index.search(vectors, vectors[100], 5, nprobe=1, allowed=allowed)
+    assert sorted(rows.tolist()) == [0, 1, 2, 3, 4]
+
+
+def test_incremental_add_and_remove_keep_rows_aligned(vectors):
+    index = IVFIndex.train(vectors[:200], nlist=8, iterations=5)
+    index.add(vectors[200:])
+    keep = np.arange(vectors.shape[0]) % 2 == 0
+    index.remove(keep)
+
+    remaining = vectors[keep]
+    query = remaining[7]
+    rows, _ = index.search(remaining, query, 3, nprobe=index.nlist)
+    np.testing.assert_array_equal(rows, exact(remaining, query, 3)[0])
+
+
+def test_save_and_load_round_trip(vectors, tmp_path):
+    index = IVFIndex.train(vectors, nlist=8, iterations=2)
+    index.save(tmp_path / "ivf.npz")
+    loaded = IVFIndex.load(tmp_path / "ivf.npz")
+    np.testing.assert_array_equal(loaded.centroids, index.centroids)
+    np.testing.assert_array_equal(loaded.assignments, index.assignments)
+
+
+@pytest.mark.parametrize("dim", [16, 1536])
+def test_query_perturbation_does_not_depend_on_dimension(dim):
+    rng = np.random.default_rng(2)
+    base = normalize_rows(rng.normal(size=(50, dim)))
+    queries = perturbed_queries(base, 200, noise=0.3)
+
+    # Cada consulta sigue siendo muy similar a alguna fila del índice
+    nearest = (queries @ base.T).max(axis=1)
+    assert nearest.mean() == pytest.approx(1 / np.sqrt(1 + 0.3**2), abs=0.02)
+
+
+def test_recall_report_is_perfect_when_probing_every_list(vectors):
+    index = IVFIndex.train(vectors, nlist=8, iterations=5)
+    queries = perturbed_queries(vectors, 10, noise=0.3)
+    report = recall_latency_report(vectors, index, queries, 5, [1, index.nlist])
+
+    assert [row["nprobe"] for row in report] == ["exact", 1, index.nlist]
+    assert report[-1]["recall"] == 1.0
+    assert 0.0 < report[1]["recall"] <= 1.0
@@ -0,0 +1,62 @@
+from streamlit.testing.v1 import AppTest
+
+from modules.response_cache import response_cache
+
+
+def itinerary_runs(monkeypatch):
+    import webapp.runner
+
+    calls = []
+    original = webapp.runner.stream_prompt
+
+    def stream_prompt(user_query, query_embedding=None, refresh=False):
+        calls.append(refresh)
+        return original(user_query, query_embedding, refresh)
+
+    monkeypatch.setattr(webapp.runner, "stream_prompt", stream_prompt)
+    return calls
+
+
+def test_regenerate_bypasses_session_result_and_response_cache(monkeypatch):
+    calls = itinerary_runs(monkeypatch)
+    response_cache.clear()
+
+    app = AppTest.from_file("../webapp/app.py", default_timeout=60).run()
+    app.text_input[0].input("Quiero ver koalas en Brisbane").run()
+    assert len(app.button) == 1
+
+    app.button[0].click().run()
+    assert calls == [False]
+    assert not app.exception
+
+    # Con el itinerario guardado, "Generar" lo reutiliza y aparece "Regenerar"
+    app.button[0].click().run()
+    assert calls == [False]
+    assert len(app.button) == 2
+
+    app.button[1].click().run()
+    assert calls == [False, True]
+    assert not app.exception
+
+    # Al volver a pintar, el itinerario guardado se muestra con su HTML
+    app.run()
+    assert calls == [False, True]
+    assert app.markdown[-1].allow_html
+
+
+def test_budget_reserves_the_static_prompt_tokens(monkeypatch):
+    from config.config import MAX_PROMPT_TOKENS
+    from modules.prompt_utils import prompt_registry
+
+    calls = itinerary_runs(monkeypatch)
+    static_tokens = prompt_registry.static_token_count("prompt_base")
+    assert 0 < static_tokens < MAX_PROMPT_TOKENS
+
+    # Cabe en MAX_PROMPT_TOKENS, pero no en lo que dejan las instrucciones del sistema
+    message = "koala" + " koala" * (MAX_PROMPT_TOKENS - static_tokens)
+    app = AppTest.from_file("../webapp/app.py", default_timeout=60).run()
+    app.text_input[0].input(message).run()
+    app.button[0].click().run()
+
+    assert calls == []
+    assert "instrucciones del sistema" in app.error[0].value
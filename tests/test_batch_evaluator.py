@@ -0,0 +1,55 @@
+from webapp.evaluation.batch_evaluator import (
+    run_scenarios,
+    summarize,
+    summarize_sweep,
+    sweep_retrieval,
+)
+from webapp.evaluation.scenario_utils import load_scenarios
+
+SCENARIOS = load_scenarios()[:2]
+
+
+def test_run_scenarios_evaluates_each_scenario_and_shares_repeated_prompts():
+    repeated = {**SCENARIOS[0], "name": "Repetido"}
+    results = run_scenarios([*SCENARIOS, repeated], workers=2)
+
+    assert [r["name"] for r in results] == [s["name"] for s in SCENARIOS] + ["Repetido"]
+    assert all(r["error"] is None for r in results)
+    assert results[2]["retrieved_docs"] == results[0]["retrieved_docs"]
+    assert results[0]["timings_ms"]["total"] > 0
+    assert results[0]["tokens"]["completion"] > 0
+
+    summary = summarize(results, wall_time_s=1.0)
+    assert summary["scenarios"] == 3 and summary["failed"] == 0
+    assert (
+        summary["latency_ms"]["total"]["p95"] >= summary["latency_ms"]["total"]["p50"]
+    )
+    assert summary["tokens"]["completion"] == sum(
+        r["tokens"]["completion"] for r in results
+    )
+
+
+def test_sweep_applies_every_threshold_to_a_single_search_per_k():
+    results = sweep_retrieval(SCENARIOS, ks=(2, None), thresholds=(0.0, 0.5, 1.01))
+
+    assert len(results) == len(SCENARIOS) * 2 * 3
+    assert all(r["error"] is None for r in results)
+
+    by_combo = {(r["name"], r["k"], r["threshold"]): r for r in results}
+    for scenario in SCENARIOS:
+        for k in (2, "auto"):
+            low, mid, high = (
+                by_combo[(scenario["name"], k, threshold)]
+                for threshold in (0.0, 0.5, 1.01)
+            )
+            # Un umbral más alto solo descarta documentos de la misma búsqueda
+            assert set(mid["retrieved_docs"]) <= set(low["retrieved_docs"])
+            assert high["retrieved_docs"] == []
+            assert low["retrieval_ms"] == mid["retrieval_ms"]
+        assert len(by_combo[(scenario["name"], 2, 0.0)]["retrieved_docs"]) <= 2
+
+    summary = summarize_sweep(results)
+    assert [(row["k"], row["threshold"]) for row in summary] == [
+        (k, t) for k in (2, "auto") for t in (0.0, 0.5, 1.01)
+    ]
+    assert all(row["scenarios"] == len(SCENARIOS) for row in summary)
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from modules.categories import MAX_CATEGORIES, CategoryRegistry, category_registry
+
+
+@pytest.fixture
+def registry():
+    return CategoryRegistry(["Playas", "Naturaleza", " playas ", "Cultura", ""])
+
+
+def test_bits_follow_first_appearance_ignoring_case_and_blanks(registry):
+    assert registry.names == ["Playas", "Naturaleza", "Cultura"]
+    assert registry.canonical("CULTURA") == "Cultura"
+    assert registry.canonical("Ópera") == "Ópera"
+
+
+def test_masks_round_trip_and_skip_unknown_categories(registry):
+    mask = registry.mask(["cultura", "PLAYAS", "Ópera"])
+
+    assert mask == 0b101
+    assert registry.names_for(mask) == ["Playas", "Cultura"]
+    assert registry.mask(None) == 0
+
+    masks = registry.masks([["Naturaleza"], [], ["Playas", "Cultura"]])
+    assert masks.dtype == np.int64
+    assert masks.tolist() == [0b010, 0, 0b101]
+
+
+def test_more_categories_than_mask_bits_is_an_error():
+    CategoryRegistry(f"c{i}" for i in range(MAX_CATEGORIES))
+
+    with pytest.raises(ValueError):
+        CategoryRegistry(f"c{i}" for i in range(MAX_CATEGORIES + 1))
+
+
+def test_config_registry_covers_the_ui_interests():
+    assert category_registry.mask(["Playas"]) != 0
+    assert len(category_registry.names) <= MAX_CATEGORIES
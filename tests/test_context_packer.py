@@ -0,0 +1,94 @@
+from modules.context_packer import (
+    SECTION_SEPARATOR,
+    TRUNCATION_MARK,
+    format_section,
+    pack_context,
+)
+from modules.prompt_utils import encoding
+
+
+def section(name, similarity, content=None, mask=0):
+    return {
+        "title": "Sydney",
+        "section": name,
+        "content": content or f"Texto sobre {name}. " + " ".join([name] * 30),
+        "similarity": similarity,
+        "category_mask": mask,
+    }
+
+
+def tokens(text):
+    return len(encoding.encode(text))
+
+
+def test_sections_are_packed_by_similarity_within_the_budget():
+    sections = [section("museos", 0.5), section("playas", 0.9), section("parques", 0.7)]
+    budget = (
+        tokens(format_section(sections[1]))
+        + tokens(SECTION_SEPARATOR)
+        + tokens(format_section(sections[2]))
+    )
+
+    context, packed, used = pack_context(sections, budget, truncate=False)
+
+    assert [s["section"] for s in packed] == ["playas", "parques"]
+    assert context == SECTION_SEPARATOR.join(format_section(s) for s in packed)
+    assert used == tokens(context) <= budget
+
+
+def test_near_duplicates_keep_only_the_most_similar_copy():
+    content = " ".join(f"palabra{i}" for i in range(100))
+    sections = [
+        section("bondi-copia", 0.6, content + "Fin."),
+        section("bondi", 0.8, content),
+        section("museos", 0.5),
+    ]
+
+    _, packed, _ = pack_context(sections, 10_000)
+    assert [s["section"] for s in packed] == ["bondi", "museos"]
+
+    _, packed, _ = pack_context(sections, 10_000, dedupe_threshold=0)
+    assert len(packed) == 3
+
+
+def test_first_section_that_does_not_fit_is_truncated():
+    first = section("playas", 0.9)
+    second = section("parques", 0.8, " ".join(["parques"] * 200))
+    budget = tokens(format_section(first)) + 40
+
+    context, packed, used = pack_context(
+        [first, second], budget, min_truncated_tokens=10
+    )
+
+    assert [s["section"] for s in packed] == ["playas", "parques"]
+    assert context.endswith(TRUNCATION_MARK)
+    assert used <= budget
+
+    _, packed, _ = pack_context([first, second], budget, min_truncated_tokens=100)
+    assert [s["section"] for s in packed] == ["playas"]
+
+
+def test_interest_bonus_favours_sections_with_uncovered_interests():
+    beaches, beaches_again, nature = (
+        section("playas", 0.80, mask=0b01),
+        section("bondi", 0.79, mask=0b01),
+        section("parques", 0.75, mask=0b10),
+    )
+    budget = 2 * tokens(format_section(beaches)) + tokens(SECTION_SEPARATOR)
+
+    _, packed, _ = pack_context(
+        [beaches, beaches_again, nature], budget, truncate=False
+    )
+    assert [s["section"] for s in packed] == ["playas", "bondi"]
+
+    _, packed, _ = pack_context(
+        [beaches, beaches_again, nature], budget, interests_mask=0b11, truncate=False
+    )
+    assert [s["section"] for s in packed] == ["playas", "parques"]
+
+
+def test_precomputed_block_tokens_are_used_for_the_budget():
+    playas = {**section("playas", 0.9), "block_tokens": list(range(10_000))}
+
+    _, packed, _ = pack_context([playas, section("parques", 0.8)], 1000, truncate=False)
+    assert [s["section"] for s in packed] == ["parques"]
@@ -0,0 +1,72 @@
+import os
+import re
+
+from config.config import DOCS_PATH
+from deleter import build_filter, iter_document_ids
+
+IDS = [f"doc-{i:02d}" for i in range(10)]
+
+
+class FakeSearchClient:
+    """
+    Índice en memoria que atiende `id gt '<id>'`, `order_by=["id asc"]` y `top`.
+    """
+
+    def __init__(self, ids):
+        self.ids = set(ids)
+        self.filters = []
+
+    def search(self, search_text, select, filter, order_by, top):
+        assert order_by == ["id asc"] and select == ["id"]
+        self.filters.append(filter)
+        match = re.search(r"id gt '([^']*)'", filter or "")
+        ids = sorted(i for i in self.ids if not match or i > match.group(1))
+        return [{"id": i} for i in ids[:top]]
+
+
+def test_keyset_paging_reads_every_id_once():
+    client = FakeSearchClient(IDS)
+
+    pages = list(iter_document_ids(client, "title eq 'Sydney'", page_size=4))
+
+    assert pages == [IDS[0:4], IDS[4:8], IDS[8:10]]
+    assert client.filters == [
+        "(title eq 'Sydney')",
+        "(title eq 'Sydney') and (id gt 'doc-03')",
+        "(title eq 'Sydney') and (id gt 'doc-07')",
+    ]
+
+
+def test_deleting_read_pages_does_not_skip_documents():
+    client = FakeSearchClient(IDS)
+
+    seen = []
+    for page in iter_document_ids(client, page_size=3):
+        seen.extend(page)
+        client.ids.difference_update(page)
+
+    assert seen == IDS and not client.ids
+    assert client.filters[0] is None
+
+
+def test_exact_multiple_of_the_page_size_ends_with_an_empty_page():
+    client = FakeSearchClient(IDS[:6])
+
+    assert list(iter_document_ids(client, page_size=3)) == [IDS[0:3], IDS[3:6]]
+    assert len(client.filters) == 3
+
+
+def test_build_filter_combines_criteria():
+    assert build_filter() is None
+    assert build_filter(titles=["Sydney", "O'Connell"]) == (
+        "search.in(title, 'Sydney|O''Connell', '|')"
+    )
+
+    path = os.path.join(DOCS_PATH, "sydney.md")
+    assert build_filter(
+        titles=["Sydney"], sources=["sydney.md"], categories=["playas"]
+    ) == (
+        "search.in(title, 'Sydney', '|')"
+        f" and ((source ge '{path}#' and source lt '{path}$'))"
+        " and category/any(c: search.in(c, 'Playas', '|'))"
+    )
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+
+from modules.embedding_cache import CachedEmbeddings, EmbeddingCache
+from modules.instrumentation import NodeMetrics, _current
+from modules.stubs import HashEmbeddings
+
+
+class CountingEmbeddings(HashEmbeddings):
+    def __init__(self):
+        super().__init__(dim=16)
+        self.texts = []
+
+    def embed_documents(self, texts):
+        self.texts.extend(texts)
+        return super().embed_documents(texts)
+
+
+class ThreadRecordingCache(EmbeddingCache):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.threads = set()
+
+    def get_many(self, keys):
+        self.threads.add(threading.get_ident())
+        return super().get_many(keys)
+
+    def put_many(self, items):
+        self.threads.add(threading.get_ident())
+        super().put_many(items)
+
+
+def test_only_missing_texts_reach_the_model(tmp_path):
+    model = CountingEmbeddings()
+    cached = CachedEmbeddings(model, EmbeddingCache(str(tmp_path / "e.db"), 10), "ns")
+
+    first = cached.embed_documents(["Sídney", "Perth", "Sídney"])
+    second = cached.embed_documents(["  Sídney ", "Darwin"])
+
+    assert model.texts == ["Sídney", "Perth", "Darwin"]
+    assert second[0] == first[0]
+
+
+def test_cache_hits_are_not_recorded_as_embedding_calls(tmp_path):
+    cached = CachedEmbeddings(
+        HashEmbeddings(dim=16), EmbeddingCache(str(tmp_path / "e.db"), 10), "ns"
+    )
+    node = NodeMetrics(node="consulta")
+    token = _current.set(node)
+    try:
+        cached.embed_query("Uluru")
+        cached.embed_query("Uluru")
+        asyncio.run(cached.aembed_query(" Uluru "))
+    finally:
+        _current.reset(token)
+
+    assert node.calls == {"embedding": 1}
+
+
+def test_lru_eviction_keeps_max_entries(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "e.db"), 2)
+    cache.put_many({"a": [1.0], "b": [2.0]})
+    cache.get_many(["a"])
+    cache.put_many({"c": [3.0]})
+
+    assert set(cache.get_many(["a", "b", "c"])) == {"a", "c"}
+
+
+def test_async_paths_do_not_touch_sqlite_on_the_event_loop(tmp_path):
+    cache = ThreadRecordingCache(str(tmp_path / "e.db"), 10)
+    cached = CachedEmbeddings(CountingEmbeddings(), cache, "ns")
+
+    async def run():
+        loop_thread = threading.get_ident()
+        await cached.aembed_query("Cairns")
+        await cached.aembed_documents(["Cairns", "Hobart"])
+        return loop_thread
+
+    loop_thread = asyncio.run(run())
+
+    assert cache.threads and loop_thread not in cache.threads
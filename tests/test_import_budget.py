@@ -0,0 +1,11 @@
+import pytest
+
+from benchmarks.import_budget import ENTRY_POINTS, measure
+
+
+@pytest.mark.parametrize(
+    "module", ["modules.vector", "modules.categories", "webapp.runner", "deleter"]
+)
+def test_entry_point_does_not_load_forbidden_modules(module):
+    _, forbidden = ENTRY_POINTS[module]
+    assert not set(forbidden) & set(measure(module)["modules"])
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from modules.clients import get_async_http_client
+from modules.lazy import Lazy, LazyPerLoop
+from modules.vector import LoopAwareEmbeddings
+
+
+def test_lazy_builds_once_on_first_access():
+    calls = []
+    lazy = Lazy(lambda: calls.append(1) or "valor")
+
+    assert not lazy.is_built and not calls
+    assert lazy.upper() == "VALOR"
+    assert lazy.resolve() == "valor"
+    assert calls == [1]
+
+
+def test_lazy_per_loop_builds_one_object_per_event_loop():
+    lazy = LazyPerLoop(object)
+
+    async def resolve_twice():
+        return lazy.resolve(), lazy.resolve()
+
+    first, again = asyncio.run(resolve_twice())
+    second, _ = asyncio.run(resolve_twice())
+
+    assert first is again
+    assert second is not first
+
+
+def test_lazy_per_loop_requires_a_running_loop():
+    with pytest.raises(RuntimeError):
+        LazyPerLoop(object).resolve()
+
+
+def test_lazy_per_loop_drops_objects_of_closed_loops():
+    lazy = LazyPerLoop(object)
+
+    async def resolve():
+        return lazy.resolve()
+
+    loops = [asyncio.new_event_loop() for _ in range(3)]
+    for loop in loops:
+        loop.run_until_complete(resolve())
+    assert len(lazy._values) == 3
+
+    for loop in loops:
+        loop.close()
+
+    async def resolve_and_count():
+        lazy.resolve()
+        return len(lazy._values)
+
+    assert asyncio.run(resolve_and_count()) == 1
+
+
+def test_async_http_client_is_not_shared_between_loops():
+    async def client():
+        return get_async_http_client()
+
+    assert asyncio.run(client()) is not asyncio.run(client())
+
+
+class FakeEmbeddings:
+    def __init__(self, http_async_client):
+        self.http_async_client = http_async_client
+
+    def embed_query(self, text):
+        assert self.http_async_client is None
+        return [0.0]
+
+    async def aembed_query(self, text):
+        assert self.http_async_client is get_async_http_client()
+        return [1.0]
+
+
+def test_loop_aware_embeddings_use_the_client_of_the_running_loop():
+    model = LoopAwareEmbeddings(FakeEmbeddings)
+
+    assert model.embed_query("hola") == [0.0]
+    assert asyncio.run(model.aembed_query("hola")) == [1.0]
+    assert asyncio.run(model.aembed_query("hola")) == [1.0]
@@ -0,0 +1,37 @@
+import asyncio
+
+import pytest
+
+from modules import llm
+from modules.instrumentation import NodeMetrics, _current
+
+MESSAGES = [{"role": "user", "content": "¿Qué ver en Sídney?"}]
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    def no_estimate(*args):
+        raise AssertionError("el stream debería traer su propio `usage`")
+
+    monkeypatch.setattr(llm, "_estimate_usage", no_estimate)
+    node = NodeMetrics(node="llm")
+    token = _current.set(node)
+    yield node
+    _current.reset(token)
+
+
+def test_stream_records_the_usage_sent_by_the_service(metrics):
+    text = "".join(llm.stream_openai_chat(MESSAGES))
+
+    assert text
+    assert metrics.calls == {"llm": 1}
+    assert metrics.prompt_tokens > 0 and metrics.completion_tokens > 0
+
+
+def test_astream_records_the_usage_sent_by_the_service(metrics):
+    async def consume():
+        return [piece async for piece in llm.astream_openai_chat(MESSAGES)]
+
+    assert asyncio.run(consume())
+    assert metrics.calls == {"llm": 1}
+    assert metrics.prompt_tokens > 0 and metrics.completion_tokens > 0
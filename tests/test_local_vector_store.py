@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from modules.azure_vector_store import AzureVectorStore
+from modules.local_vector_store import LocalVectorStore, parse_category_filter
+
+# Sección → (vector, categorías)
+SECTIONS = {
+    "playas": ([1.0, 0.0, 0.0], ["Playas"]),
+    "parques": ([0.9, 0.1, 0.0], ["Naturaleza"]),
+    "museos": ([0.0, 1.0, 0.0], ["Cultura"]),
+    "mercados": ([0.0, 0.0, 1.0], ["Gastronomía", "Cultura"]),
+}
+
+
+def document(name, vector=None):
+    default_vector, categories = SECTIONS[name]
+    return {
+        "id": name,
+        "title": "Sydney",
+        "section": name,
+        "category": categories,
+        "content": f"Contenido de {name}",
+        "content_vector": vector or default_vector,
+        "source": f"data/sydney.md#{name}",
+    }
+
+
+@pytest.fixture(params=["exact", "ivf"])
+def store(request):
+    store = LocalVectorStore(
+        None, lambda text: [1.0, 0.0, 0.0], search_mode=request.param, nlist=2
+    )
+    store.upsert([document(name) for name in SECTIONS])
+    return store
+
+
+def ids(store, **kwargs):
+    docs, similarities = store.similarity_search_with_vectors(
+        "", [1.0, 0.0, 0.0], k=4, **kwargs
+    )
+    assert list(similarities) == sorted(similarities, reverse=True)
+    return [doc.metadata["id"] for doc in docs]
+
+
+def test_search_ranks_by_cosine_similarity(store):
+    assert ids(store)[:2] == ["playas", "parques"]
+
+
+def test_categories_and_odata_filter_restrict_results(store):
+    # Ambas secciones son ortogonales a la consulta: solo importa el conjunto
+    assert set(ids(store, categories=["cultura"])) == {"museos", "mercados"}
+
+    odata = AzureVectorStore.category_filter(["Naturaleza", "Gastronomía"])
+    assert ids(store, filters=odata) == ["parques", "mercados"]
+    assert ids(store, filters=odata, categories=["Cultura"]) == ["mercados"]
+
+
+def test_unsupported_filter_is_rejected(store):
+    with pytest.raises(ValueError):
+        ids(store, filters="title eq 'Sydney'")
+
+
+def test_upsert_replaces_and_delete_removes(store):
+    store.upsert([document("museos", [1.0, 0.0, 0.0])])
+    assert len(store.metadata) == len(SECTIONS)
+    assert ids(store)[0] in ("playas", "museos")
+
+    assert store.delete(["playas", "desconocido"]) == ["playas"]
+    assert "playas" not in ids(store)
+    assert store.delete(["playas"]) == []
+
+
+def test_parse_category_filter_round_trip():
+    odata = AzureVectorStore.category_filter(["Viaje económico", "D'Entrecasteaux"])
+    assert parse_category_filter(odata) == ["Viaje económico", "D'Entrecasteaux"]
+
+
+def test_in_memory_store_cannot_be_saved():
+    with pytest.raises(ValueError):
+        LocalVectorStore(None, lambda text: [0.0]).save()
+
+
+def test_similarities_are_cosine(store):
+    docs, similarities = store.similarity_search_with_vectors("", [2.0, 0.0, 0.0], k=1)
+    np.testing.assert_allclose(similarities, [1.0], atol=1e-6)
@@ -0,0 +1,68 @@
+import pytest
+
+import modules.markdown_sections as markdown_sections
+from modules.manifest import IngestManifest, source_file
+
+GUIDE = """# Sydney
+
+## Descripción General
+Ciudad costera.
+
+## Playas
+Bondi y Manly.
+
+## Gastronomía
+Marisco en el puerto.
+"""
+
+
+@pytest.fixture
+def docs_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(markdown_sections, "DOCS_PATH", str(tmp_path))
+    return tmp_path
+
+
+def build(docs_path, text):
+    (docs_path / "sydney.md").write_text(text, encoding="utf-8")
+    return markdown_sections.build_section_documents("sydney.md")[1]
+
+
+def test_inserting_a_section_only_uploads_that_section(docs_path, tmp_path):
+    manifest = IngestManifest(str(tmp_path / "manifest.json"))
+    manifest.record(build(docs_path, GUIDE))
+
+    edited = GUIDE.replace("## Playas", "## Clima\nTemplado.\n\n## Playas")
+    changed, removed = manifest.diff(build(docs_path, edited))
+
+    assert [doc["section"] for doc in changed] == ["Clima"]
+    assert removed == []
+
+
+def test_deleting_a_section_only_removes_that_section(docs_path, tmp_path):
+    manifest = IngestManifest(str(tmp_path / "manifest.json"))
+    original = build(docs_path, GUIDE)
+    manifest.record(original)
+
+    edited = GUIDE.replace("## Playas\nBondi y Manly.\n\n", "")
+    changed, removed = manifest.diff(build(docs_path, edited))
+
+    assert changed == []
+    assert removed == [doc["id"] for doc in original if doc["section"] == "Playas"]
+
+
+def test_edited_section_is_changed_and_unreadable_files_are_kept(docs_path, tmp_path):
+    manifest = IngestManifest(str(tmp_path / "manifest.json"))
+    manifest.record(build(docs_path, GUIDE))
+
+    changed, _ = manifest.diff(build(docs_path, GUIDE.replace("Manly", "Coogee")))
+    assert [doc["section"] for doc in changed] == ["Playas"]
+
+    _, removed = manifest.diff([], unreadable=["sydney.md"])
+    assert removed == []
+
+
+def test_repeated_section_titles_get_distinct_ids(docs_path):
+    docs = build(docs_path, GUIDE + "\n## Playas\nMás playas.\n")
+
+    assert len({doc["id"] for doc in docs}) == len(docs)
+    assert {source_file(doc) for doc in docs} == {"sydney.md"}
@@ -0,0 +1,17 @@
+import os
+
+from modules.prompt_utils import PromptRegistry, encoding
+
+
+def test_static_token_count_skips_fields_and_resets_on_reload(tmp_path):
+    path = tmp_path / "prompts.yaml"
+    path.write_text("saludo: 'Hola {name}, bienvenido a {city}.'\n", encoding="utf-8")
+    registry = PromptRegistry(str(path))
+
+    expected = len(encoding.encode("Hola , bienvenido a ."))
+    assert registry.static_token_count("saludo") == expected
+    assert registry.format("saludo", name="Ana", city="Perth").startswith("Hola Ana")
+
+    path.write_text("saludo: 'Hola {name}.'\n", encoding="utf-8")
+    os.utime(path, ns=(0, 10**9))
+    assert registry.static_token_count("saludo") == len(encoding.encode("Hola ."))
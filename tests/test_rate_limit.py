@@ -0,0 +1,128 @@
+from types import SimpleNamespace
+
+import pytest
+
+import modules.rate_limit as rate_limit
+from modules.rate_limit import (
+    RateLimiter,
+    TokenBucket,
+    call_with_backoff,
+    retry_after_seconds,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(rate_limit.time, "sleep", clock.sleep)
+    monkeypatch.setattr(rate_limit.random, "uniform", lambda a, b: 0.0)
+    return clock
+
+
+def throttled(headers=None, status_code=429):
+    error = Exception("429 Too Many Requests")
+    error.response = SimpleNamespace(status_code=status_code, headers=headers or {})
+    return error
+
+
+def test_bucket_waits_for_refill_once_empty(clock):
+    bucket = TokenBucket(capacity=10, refill_rate=5)
+
+    bucket.acquire(10)
+    assert clock.sleeps == []
+
+    bucket.acquire(5)
+    assert clock.sleeps == [pytest.approx(1.0)]
+
+
+def test_bucket_lets_oversized_requests_through_and_carries_the_debt(clock):
+    bucket = TokenBucket(capacity=10, refill_rate=10)
+
+    bucket.acquire(25)
+    assert clock.sleeps == []
+
+    # Saldo -15: hacen falta 2 s para volver a tener 5 tokens
+    bucket.acquire(5)
+    assert sum(clock.sleeps) == pytest.approx(2.0)
+
+
+def test_rate_limiter_applies_the_stricter_quota(clock):
+    limiter = RateLimiter(tokens_per_minute=6000, requests_per_minute=2)
+
+    limiter.acquire(10)
+    limiter.acquire(10)
+    assert clock.sleeps == []
+
+    limiter.acquire(10)
+    assert sum(clock.sleeps) == pytest.approx(30.0)
+
+
+@pytest.mark.parametrize(
+    "headers, expected",
+    [
+        ({"retry-after-ms": "1500"}, 1.5),
+        ({"retry-after": "3"}, 3.0),
+        ({"retry-after-ms": "250", "retry-after": "1"}, 0.25),
+        ({}, 0.0),
+        ({"retry-after": "Wed, 21 Oct 2026 07:28:00 GMT"}, 0.0),
+    ],
+)
+def test_retry_after_seconds_reads_the_headers_of_a_429(headers, expected):
+    assert retry_after_seconds(throttled(headers)) == expected
+
+
+def test_retry_after_seconds_ignores_other_errors():
+    assert retry_after_seconds(ValueError("sin respuesta")) is None
+    assert retry_after_seconds(throttled(status_code=500)) is None
+
+    error = Exception("429")
+    error.status_code = 429
+    assert retry_after_seconds(error) == 0.0
+
+
+def test_call_with_backoff_honours_retry_after_then_backs_off_exponentially(clock):
+    errors = [throttled({"retry-after": "7"}), throttled(), throttled()]
+
+    def flaky(value):
+        if errors:
+            raise errors.pop(0)
+        return value
+
+    assert call_with_backoff(flaky, "ok", base_delay=1.0) == "ok"
+    assert clock.sleeps == [7.0, 2.0, 4.0]
+
+
+def test_call_with_backoff_gives_up_after_max_retries(clock):
+    calls = []
+
+    def always_throttled():
+        calls.append(1)
+        raise throttled()
+
+    with pytest.raises(Exception, match="429"):
+        call_with_backoff(always_throttled, max_retries=2, base_delay=1.0)
+    assert len(calls) == 3
+    assert clock.sleeps == [1.0, 2.0]
+
+
+def test_call_with_backoff_propagates_other_errors_immediately(clock):
+    def broken():
+        raise ValueError("error de validación")
+
+    with pytest.raises(ValueError):
+        call_with_backoff(broken)
+    assert clock.sleeps == []
@@ -0,0 +1,80 @@
+from types import SimpleNamespace
+
+import pytest
+
+import modules.response_cache as response_cache
+from modules.agents.cache_agent import CacheAgent
+from modules.prompt_utils import load_formatted_prompt
+from modules.response_cache import ResponseCache
+from modules.stubs import HashEmbeddings
+
+BASE = load_formatted_prompt(
+    "prompt_base",
+    days=3,
+    budget="medio",
+    travel_type="en pareja",
+    interests="Playas, Naturaleza",
+)
+
+
+@pytest.fixture
+def agent():
+    embeddings = HashEmbeddings()
+    store = SimpleNamespace(embedding_function=embeddings.embed_query)
+    return CacheAgent(ResponseCache(3600, 16, semantic_distance=0.05), store)
+
+
+def generate(agent, prompt, response):
+    state = {"input": prompt, **agent.lookup({"input": prompt})}
+    assert not state["cache_hit"]
+    agent.store({**state, "response": response, "retrieved_docs": []})
+
+
+def test_prompts_differing_only_in_destination_do_not_share_entries(agent):
+    generate(agent, BASE + "Quiero visitar Sídney y sus playas.", "Itinerario Sídney")
+
+    assert not agent.lookup({"input": BASE + "Quiero visitar Perth y sus playas."})[
+        "cache_hit"
+    ]
+
+
+def test_rewording_of_the_same_request_is_a_semantic_hit(agent):
+    generate(agent, BASE + "Quiero visitar Sídney y sus playas.", "Itinerario Sídney")
+
+    hit = agent.lookup({"input": BASE + "quiero visitar sídney, y sus playas"})
+    assert hit["cache_hit"] and hit["response"] == "Itinerario Sídney"
+
+
+def test_same_text_with_different_options_is_a_miss(agent):
+    generate(agent, BASE + "Quiero visitar Sídney.", "Itinerario Sídney")
+    other = BASE.replace("3 días", "5 días")
+
+    assert not agent.lookup({"input": other + "Quiero visitar Sídney."})["cache_hit"]
+
+
+def test_refresh_skips_both_tiers_and_replaces_the_entry(agent):
+    prompt = BASE + "Quiero visitar Sídney y sus playas."
+    generate(agent, prompt, "Itinerario Sídney")
+
+    for query in (prompt, BASE + "quiero visitar sídney, y sus playas"):
+        state = agent.lookup({"input": query, "cache_refresh": True})
+        assert not state["cache_hit"]
+
+    refreshed = {"input": prompt, "cache_refresh": True}
+    agent.store({**refreshed, **agent.lookup(refreshed), "response": "Otro itinerario"})
+    assert agent.lookup({"input": prompt})["response"] == "Otro itinerario"
+
+
+def test_ttl_and_lru_expire_entries(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(response_cache.time, "monotonic", lambda: now[0])
+    cache = ResponseCache(ttl_seconds=10, max_entries=2, semantic_distance=0)
+
+    cache.put("a", {"response": "A"})
+    cache.put("b", {"response": "B"})
+    assert cache.get("a") is not None
+    cache.put("c", {"response": "C"})
+    assert cache.get("b") is None
+
+    now[0] = 11
+    assert cache.get("a") is None
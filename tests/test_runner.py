@@ -0,0 +1,23 @@
+from typing import get_type_hints
+
+from webapp.runner import PromptResult, run_prompt, run_prompt_batch
+
+QUERY = "Quiero ver koalas en Brisbane"
+
+
+def test_run_prompt_returns_a_prompt_result():
+    assert get_type_hints(run_prompt)["return"] is PromptResult
+
+    result = run_prompt(QUERY)
+    assert set(result) == set(PromptResult.__annotations__)
+    assert result["generated_response"]
+    assert result["metrics"]["nodes"]
+
+
+def test_run_prompt_batch_keeps_order_and_shares_repeated_queries():
+    queries = [QUERY, "Playas en Perth", QUERY]
+    results = run_prompt_batch(queries, search_workers=2, llm_workers=2)
+
+    assert len(results) == 3
+    assert all(result["error"] is None for result in results)
+    assert results[0] == results[2] and results[0] is not results[2]
@@ -0,0 +1,19 @@
+from modules.prompt_utils import encoding
+from modules.stub_encoding import StubEncoding
+
+
+def test_stub_provider_does_not_need_tiktoken():
+    assert isinstance(encoding.resolve(), StubEncoding)
+
+
+def test_stub_encoding_round_trip():
+    enc = StubEncoding()
+    text = "## Sídney > Playas\n\nBondi, Manly y Coogee: ¡3 días!"
+    tokens = enc.encode(text)
+
+    assert enc.decode(tokens) == text
+    assert enc.decode(tokens[:2]) == "## Sídney"
+    assert enc.encode("Bondi Bondi") == [
+        enc.encode("Bondi")[0],
+        enc.encode(" Bondi")[0],
+    ]
@@ -0,0 +1,19 @@
+import numpy as np
+import pytest
+
+from modules.azure_vector_store import AzureVectorStore
+
+
+def test_score_to_cosine_inverts_vector_score():
+    cosine = np.array([1.0, 0.5, 0.0, -1.0], dtype=np.float32)
+    score = 1.0 / (1.0 + (1.0 - cosine))
+
+    np.testing.assert_allclose(
+        AzureVectorStore.score_to_cosine(score), cosine, atol=1e-6
+    )
+
+
+def test_score_to_cosine_rejects_non_cosine_scores():
+    # Puntuaciones RRF de una búsqueda híbrida (≈ 0.03)
+    with pytest.raises(ValueError):
+        AzureVectorStore.score_to_cosine(np.array([0.033, 0.016]))
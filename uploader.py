@@ -2,134 +2,487 @@
 Módulo para cargar documentos .md en Azure Cognitive Search con embeddings.
 
 Este módulo:
-- Lee el contenido de un archivo .txt especificado por el usuario.
-- Genera su vector de embedding utilizando el vector_store existente.
-- Envía el documento al índice vectorial en Azure Search.
+- Lee el contenido de uno o varios archivos .md de `DOCS_PATH` y los divide por
+  secciones (##).
+- Genera los embeddings de las secciones en lotes (`embed_documents`) dimensionados por
+  un presupuesto de tokens medido con `tiktoken`, agrupando secciones de distintos
+  archivos.
+- Envía los documentos al índice vectorial en Azure Search en lotes de
+  `upload_documents`, con el `SearchClient` compartido de `modules.clients` (una sola
+  sesión HTTP por proceso).
+
+Los IDs de las secciones son deterministas por (archivo, sección) y cada subida se
+registra en un manifiesto local con el hash de su contenido. Con `--sync` solo se
+embeben y suben las secciones nuevas o modificadas, y se eliminan del índice las que han
+desaparecido de su .md.
+
+Con `--workers N`, la carga completa se ejecuta como un pipeline productor/consumidor
+con colas acotadas (lectura → embeddings en N hilos → subida), limitado por la cuota
+TPM/RPM del despliegue y con reintentos ante respuestas 429.
+
+Con `--export-local` se genera además un índice local (matriz `float32` + sidecar de
+metadatos en `LOCAL_INDEX_PATH`) para el backend `VECTOR_BACKEND = "local"`, sin subir
+nada a Azure. Con ese backend, `--sync` actualiza el índice local de forma incremental
+(altas, cambios y bajas), sin re-entrenar el índice aproximado IVF si
+`LOCAL_SEARCH_MODE = "ivf"`.
 
 Uso:
     python uploader.py --file info.md
     python uploader.py --all
+    python uploader.py --all --workers 4
+    python uploader.py --sync
+    python uploader.py --export-local
 """
 
 import argparse
-import os
-import re
-import uuid
-from typing import List, Optional, Tuple
-
-from azure.core.credentials import AzureKeyCredential
-from azure.search.documents import SearchClient
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, List, Tuple
 
 from config.config import (
-    AZURE_SEARCH_ENDPOINT,
-    AZURE_SEARCH_KEY,
-    DOCS_PATH,
-    INDEX_NAME,
-    SECTION_TO_CATEGORIES,
+    ANN_NLIST,
+    ANN_TRAIN_ITERATIONS,
+    EMBEDDING_BATCH_MAX_ITEMS,
+    EMBEDDING_BATCH_MAX_TOKENS,
+    EMBEDDING_RPM,
+    EMBEDDING_TPM,
+    INGEST_MANIFEST_PATH,
+    INGEST_MAX_RETRIES,
+    INGEST_QUEUE_SIZE,
+    LOCAL_INDEX_PATH,
+    LOCAL_SEARCH_MODE,
+    UPLOAD_BATCH_SIZE,
+    VECTOR_BACKEND,
+)
+from modules.ann_index import default_nlist
+from modules.clients import get_search_client
+from modules.local_vector_store import LocalVectorStore, save_local_index
+from modules.manifest import (
+    IngestManifest,
+    section_hash,
+    source_file,
 )
-from modules.vector import vector_store
+from modules.markdown_sections import build_section_documents, list_md_files
+from modules.prompt_utils import encoding
+from modules.rate_limit import RateLimiter, call_with_backoff
+from modules.vector import embeddings
 
 
-def split_markdown_sections(text: str) -> Tuple[Optional[str], List[Tuple[str, str]]]:
+def iter_embedding_batches(
+    documents: Iterable[dict],
+    max_tokens: int = EMBEDDING_BATCH_MAX_TOKENS,
+    max_items: int = EMBEDDING_BATCH_MAX_ITEMS,
+) -> Iterator[Tuple[List[dict], int]]:
     """
-    Extrae el título principal y divide un documento Markdown en secciones por encabezados de nivel 2 (##).
+    Agrupa documentos en lotes cuyo tamaño total en tokens no supera `max_tokens`.
+
+    Los tokens se miden con la misma codificación `tiktoken` usada para los prompts. Una
+    sección que por sí sola supere el presupuesto se envía en un lote propio.
 
     Args:
-        text (str): Contenido completo del archivo Markdown.
+        documents (Iterable[dict]): Documentos con el texto a embeber en `"content"`.
+        max_tokens (int): Presupuesto máximo de tokens por lote.
+        max_items (int): Número máximo de documentos por lote.
+
+    Yields:
+        tuple[list[dict], int]: Lote de documentos a embeber en una única llamada y sus
+        tokens.
+    """
+    batch, batch_tokens = [], 0
+    for doc in documents:
+        tokens = len(encoding.encode(doc["content"]))
+        if batch and (batch_tokens + tokens > max_tokens or len(batch) >= max_items):
+            yield batch, batch_tokens
+            batch, batch_tokens = [], 0
+
+        batch.append(doc)
+        batch_tokens += tokens
+
+    if batch:
+        yield batch, batch_tokens
+
+
+def embed_documents_in_batches(documents: List[dict]) -> List[dict]:
+    """
+    Calcula el embedding de cada documento mediante llamadas agrupadas a
+    `embed_documents`.
+
+    Args:
+        documents (list[dict]): Documentos con el texto a embeber en `"content"`.
 
     Returns:
-        Tuple[str | None, list[tuple[str, str]]]:
-            - Título principal (extraído del primer encabezado de nivel 1).
-            - Lista de tuplas con secciones (titulo, contenido).
+        list[dict]: Los mismos documentos con el campo `"content_vector"` completado.
     """
-    # Extraer título principal (primer encabezado de nivel 1)
-    title_match = re.search(r"^\s*#\s+(.*)", text, re.MULTILINE)
-    title = title_match.group(1).strip() if title_match else None
+    for batch, _ in iter_embedding_batches(documents):
+        vectors = embeddings.embed_documents([doc["content"] for doc in batch])
+        for doc, vector in zip(batch, vectors):
+            doc["content_vector"] = vector
 
-    # Dividir por encabezados de nivel 2
-    pattern = r"(?:^|\n)(## .+?)(?=\n## |\Z)"  # captura cada sección ## ... hasta el siguiente ## o fin de texto
-    matches = re.findall(pattern, text, flags=re.DOTALL)
+    return documents
+
+
+def upload_documents_in_batches(documents: List[dict]) -> List[dict]:
+    """
+    Envía (o reemplaza) los documentos en el índice de Azure Search en lotes de
+    `UPLOAD_BATCH_SIZE`.
 
-    sections = []
-    for match in matches:
-        lines = match.strip().splitlines()
-        section_title = lines[0].lstrip("#").strip()
-        section_body = "\n".join(lines[1:]).strip()
-        sections.append((section_title, section_body))
+    Args:
+        documents (list[dict]): Documentos completos (con `"content_vector"`).
+
+    Returns:
+        list[dict]: Documentos indexados correctamente.
+    """
+    search_client = get_search_client()
+
+    succeeded = []
+    for i in range(0, len(documents), UPLOAD_BATCH_SIZE):
+        batch = documents[i : i + UPLOAD_BATCH_SIZE]
+        results = search_client.upload_documents(documents=batch)
+        ok_ids = {r.key for r in results if r.succeeded}
+        succeeded.extend(doc for doc in batch if doc["id"] in ok_ids)
+
+    return succeeded
+
+
+def delete_documents_in_batches(document_ids: List[str]) -> List[str]:
+    """
+    Elimina documentos del índice por ID en lotes de `UPLOAD_BATCH_SIZE`.
+
+    Args:
+        document_ids (list[str]): IDs a eliminar.
+
+    Returns:
+        list[str]: IDs eliminados correctamente.
+    """
+    search_client = get_search_client()
 
-    return title, sections
+    deleted = []
+    for i in range(0, len(document_ids), UPLOAD_BATCH_SIZE):
+        batch = [{"id": doc_id} for doc_id in document_ids[i : i + UPLOAD_BATCH_SIZE]]
+        results = search_client.delete_documents(documents=batch)
+        deleted.extend(r.key for r in results if r.succeeded)
+
+    return deleted
 
 
 def upload_md_document(file_name: str):
     """
     Carga un archivo .md al índice de Azure Search con sus secciones vectorizadas.
 
-    El título del documento se extrae automáticamente del primer encabezado de nivel 1 (# Ciudad).
-
     Args:
         file_name (str): Nombre del archivo Markdown en DOCS_PATH.
     """
-    file_path = os.path.join(DOCS_PATH, file_name)
-    if not os.path.isfile(file_path):
-        raise FileNotFoundError(f"❌ Archivo no encontrado: {file_path}")
+    title, documents = build_section_documents(file_name)
 
-    with open(file_path, "r", encoding="utf-8") as f:
-        content = f.read()
+    embed_documents_in_batches(documents)
+    uploaded = upload_documents_in_batches(documents)
 
-    # Obtener título y secciones desde el Markdown
-    title, section_chunks = split_markdown_sections(content)
+    manifest = IngestManifest.load(INGEST_MANIFEST_PATH)
+    manifest.record(uploaded)
+    manifest.save()
 
-    search_client = SearchClient(
-        endpoint=AZURE_SEARCH_ENDPOINT,
-        index_name=INDEX_NAME,
-        credential=AzureKeyCredential(AZURE_SEARCH_KEY),
-    )
-
-    documents = []
-    for i, (section_title, section_text) in enumerate(section_chunks, start=1):
-        embedding = vector_store.embedding_function(section_text)
-        categories = SECTION_TO_CATEGORIES.get(section_title.strip(), [])
-
-        documents.append(
-            {
-                "id": str(uuid.uuid4()),
-                "title": title,
-                "section": section_title,
-                "category": categories,
-                "content": section_text,
-                "content_vector": embedding,
-                "source": f"{file_path}#section-{i}",
-            }
-        )
-
-    result = search_client.upload_documents(documents=documents)
-    print(f"✅ Subidas {len(documents)} secciones de '{title}'")
-    return result
+    print(f"✅ Subidas {len(uploaded)} secciones de '{title}'")
+    return uploaded
 
 
 def upload_all_md_documents():
     """
     Sube todos los archivos .md encontrados en DOCS_PATH al índice de Azure Search.
 
-    Itera sobre todos los ficheros .md en la carpeta especificada,
-    ejecutando `upload_md_document()` sobre cada uno de ellos.
+    Las secciones de todos los archivos se agrupan en lotes de embeddings limitados por
+    tokens y se suben en lotes grandes, en lugar de procesar cada archivo por separado.
     """
-    md_files = [
-        f
-        for f in os.listdir(DOCS_PATH)
-        if f.endswith(".md") and f.lower() != "template.md"
-    ]
+    md_files = list_md_files()
+
+    if not md_files:
+        print("⚠️ No se encontraron archivos .md en la carpeta DOCS_PATH.")
+        return
+
+    documents = []
+    for file_name in md_files:
+        try:
+            print(f"📄 Leyendo '{file_name}'...")
+            documents.extend(build_section_documents(file_name)[1])
+        except Exception as e:
+            print(f"❌ Error al leer '{file_name}': {e}")
+
+    if not documents:
+        return
+
+    print(f"🧮 Generando embeddings de {len(documents)} secciones...")
+    embed_documents_in_batches(documents)
+
+    print(f"⬆️ Subiendo {len(documents)} secciones...")
+    uploaded = upload_documents_in_batches(documents)
+
+    manifest = IngestManifest.load(INGEST_MANIFEST_PATH)
+    manifest.record(uploaded)
+    manifest.save()
+
+    print(f"✅ Subidas {len(uploaded)} secciones de {len(md_files)} archivo(s)")
+
+
+def export_local_index():
+    """
+    Genera el índice local (`LOCAL_INDEX_PATH`) con todas las secciones de los .md de
+    DOCS_PATH.
+
+    Los embeddings se calculan en lotes como en la subida a Azure (reutilizando la caché
+    de embeddings), pero el resultado se escribe en disco en lugar de enviarse al índice
+    remoto.
+    """
+    md_files = list_md_files()
 
     if not md_files:
         print("⚠️ No se encontraron archivos .md en la carpeta DOCS_PATH.")
         return
 
+    documents = []
     for file_name in md_files:
         try:
-            print(f"⬆️ Subiendo '{file_name}'...")
-            upload_md_document(file_name)
+            print(f"📄 Leyendo '{file_name}'...")
+            documents.extend(build_section_documents(file_name)[1])
         except Exception as e:
-            print(f"❌ Error al subir '{file_name}': {e}")
+            print(f"❌ Error al leer '{file_name}': {e}")
+
+    if not documents:
+        return
+
+    print(f"🧮 Generando embeddings de {len(documents)} secciones...")
+    embed_documents_in_batches(documents)
+
+    # En modo "ivf" se entrena también el índice aproximado sobre todas las secciones
+    nlist = 0
+    if LOCAL_SEARCH_MODE == "ivf":
+        nlist = ANN_NLIST or default_nlist(len(documents))
+
+    save_local_index(LOCAL_INDEX_PATH, documents, nlist, ANN_TRAIN_ITERATIONS)
+    print(
+        f"✅ Índice local con {len(documents)} secciones guardado en "
+        f"'{LOCAL_INDEX_PATH}'"
+    )
+
+
+def upload_all_md_documents_concurrently(workers: int):
+    """
+    Sube todos los archivos .md de DOCS_PATH mediante un pipeline concurrente por
+    etapas.
+
+    Etapas, conectadas por colas acotadas (`INGEST_QUEUE_SIZE`):
+    1. Lectura: un hilo productor divide los archivos en secciones y forma lotes por
+       tokens.
+    2. Embeddings: `workers` hilos calculan los vectores de cada lote, reservando antes
+       la cuota TPM/RPM del despliegue y reintentando ante respuestas 429
+       (`Retry-After`).
+    3. Subida: un hilo agrupa los documentos ya vectorizados y los envía en lotes al
+       índice.
+
+    Un lote lento solo ocupa a su hilo, sin detener la lectura ni la subida del resto.
+
+    Args:
+        workers (int): Número de hilos de embeddings concurrentes.
+    """
+    md_files = list_md_files()
+    if not md_files:
+        print("⚠️ No se encontraron archivos .md en la carpeta DOCS_PATH.")
+        return
+
+    done = object()  # Marca de fin de cola
+    embed_queue = queue.Queue(maxsize=INGEST_QUEUE_SIZE)
+    upload_queue = queue.Queue(maxsize=INGEST_QUEUE_SIZE)
+    limiter = RateLimiter(EMBEDDING_TPM, EMBEDDING_RPM)
+    manifest = IngestManifest.load(INGEST_MANIFEST_PATH)
+    stats = {"read": 0, "embedded": 0, "uploaded": 0, "failed": 0}
+    stats_lock = threading.Lock()
+    start = time.perf_counter()
+
+    def iter_documents() -> Iterator[dict]:
+        for file_name in md_files:
+            try:
+                documents = build_section_documents(file_name)[1]
+            except Exception as e:
+                print(f"❌ Error al leer '{file_name}': {e}")
+                continue
+            with stats_lock:
+                stats["read"] += len(documents)
+            yield from documents
+
+    def produce():
+        try:
+            for batch in iter_embedding_batches(iter_documents()):
+                embed_queue.put(batch)
+        finally:
+            for _ in range(workers):
+                embed_queue.put(done)
+
+    def embed():
+        while (item := embed_queue.get()) is not done:
+            batch, batch_tokens = item
+            try:
+                limiter.acquire(batch_tokens)
+                vectors = call_with_backoff(
+                    embeddings.embed_documents,
+                    [doc["content"] for doc in batch],
+                    max_retries=INGEST_MAX_RETRIES,
+                )
+                for doc, vector in zip(batch, vectors):
+                    doc["content_vector"] = vector
+                upload_queue.put(batch)
+                with stats_lock:
+                    stats["embedded"] += len(batch)
+            except Exception as e:
+                print(f"❌ Error generando embeddings de {len(batch)} secciones: {e}")
+                with stats_lock:
+                    stats["failed"] += len(batch)
+
+    def upload():
+        pending = []
+        while (batch := upload_queue.get()) is not done:
+            pending.extend(batch)
+            while len(pending) >= UPLOAD_BATCH_SIZE:
+                flush(pending[:UPLOAD_BATCH_SIZE])
+                pending = pending[UPLOAD_BATCH_SIZE:]
+        if pending:
+            flush(pending)
+
+    def flush(documents: List[dict]):
+        try:
+            uploaded = upload_documents_in_batches(documents)
+            with stats_lock:
+                manifest.record(uploaded)
+                stats["uploaded"] += len(uploaded)
+                stats["failed"] += len(documents) - len(uploaded)
+        except Exception as e:
+            print(f"❌ Error al subir {len(documents)} secciones: {e}")
+            with stats_lock:
+                stats["failed"] += len(documents)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    uploader = threading.Thread(target=upload, daemon=True)
+    producer.start()
+    uploader.start()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for _ in range(workers):
+            pool.submit(embed)
+
+    upload_queue.put(done)
+    producer.join()
+    uploader.join()
+    manifest.save()
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"✅ Subidas {stats['uploaded']}/{stats['read']} secciones de {len(md_files)} "
+        f"archivo(s) en {elapsed:.1f}s con {workers} hilo(s) "
+        f"({stats['failed']} fallidas)"
+    )
+
+
+def sync_md_documents():
+    """
+    Sincroniza de forma incremental e idempotente el índice con los archivos .md de
+    DOCS_PATH.
+
+    Compara el hash de cada sección con el manifiesto local (`INGEST_MANIFEST_PATH`):
+    - Las secciones nuevas o modificadas se embeben y se suben (reemplazo por ID
+      determinista).
+    - Las secciones que ya no existen en su .md se eliminan del índice.
+    - Las secciones sin cambios no generan ninguna llamada.
+
+    Las altas y modificaciones se aplican antes que las bajas, de modo que el índice
+    nunca queda vacío a mitad de la sincronización. Si un archivo no puede leerse, sus
+    secciones se conservan.
+    """
+    manifest = IngestManifest.load(INGEST_MANIFEST_PATH)
+
+    documents, unreadable = [], []
+    for file_name in list_md_files():
+        try:
+            documents.extend(build_section_documents(file_name)[1])
+        except Exception as e:
+            print(f"❌ Error al leer '{file_name}': {e}")
+            unreadable.append(file_name)
+
+    changed, removed = manifest.diff(documents, unreadable)
+
+    print(
+        f"🔄 {len(changed)} sección(es) nuevas o modificadas, "
+        f"{len(removed)} eliminada(s), {len(documents) - len(changed)} sin cambios"
+    )
+
+    if changed:
+        embed_documents_in_batches(changed)
+        uploaded = upload_documents_in_batches(changed)
+        manifest.record(uploaded)
+        manifest.save()
+        print(f"⬆️ Actualizadas {len(uploaded)}/{len(changed)} secciones")
+
+    if removed:
+        deleted = delete_documents_in_batches(removed)
+        manifest.forget(deleted)
+        manifest.save()
+        print(f"🗑️ Eliminadas {len(deleted)}/{len(removed)} secciones")
+
+    print("✅ Sincronización completada")
+
+
+def sync_local_index():
+    """
+    Sincroniza de forma incremental el índice local (`LOCAL_INDEX_PATH`) con los .md de
+    DOCS_PATH.
+
+    El sidecar del índice local hace de manifiesto: el hash de cada entrada se compara
+    con el de la sección actual, de modo que solo se embeben las secciones nuevas o
+    modificadas. Las altas se asignan a las listas existentes del índice IVF y las bajas
+    se descartan, sin re-entrenar.
+    """
+    store = LocalVectorStore(
+        LOCAL_INDEX_PATH,
+        embeddings.embed_query,
+        search_mode=LOCAL_SEARCH_MODE,
+        nlist=ANN_NLIST,
+        train_iterations=ANN_TRAIN_ITERATIONS,
+    )
+    indexed = {entry["id"]: entry for entry in store.metadata}
+
+    documents, unreadable = [], set()
+    for file_name in list_md_files():
+        try:
+            documents.extend(build_section_documents(file_name)[1])
+        except Exception as e:
+            print(f"❌ Error al leer '{file_name}': {e}")
+            unreadable.add(file_name)
+
+    current_ids = {doc["id"] for doc in documents}
+    changed = [
+        doc
+        for doc in documents
+        if doc["id"] not in indexed
+        or section_hash(indexed[doc["id"]]) != section_hash(doc)
+    ]
+    removed = [
+        doc_id
+        for doc_id, entry in indexed.items()
+        if doc_id not in current_ids and source_file(entry) not in unreadable
+    ]
+
+    print(
+        f"🔄 {len(changed)} sección(es) nuevas o modificadas, "
+        f"{len(removed)} eliminada(s), {len(documents) - len(changed)} sin cambios"
+    )
+
+    if changed:
+        embed_documents_in_batches(changed)
+        store.upsert(changed)
+    if removed:
+        store.delete(removed)
+    if changed or removed:
+        store.save()
+
+    print(f"✅ Índice local sincronizado ({len(store.metadata)} secciones)")
 
 
 def main():
@@ -149,12 +502,42 @@ def main():
         action="store_true",
         help="Sube todos los archivos .md dentro de la carpeta data/",
     )
+    group.add_argument(
+        "--sync",
+        action="store_true",
+        help="Sube solo las secciones nuevas o modificadas y elimina las que ya no "
+        "existen (en el índice local si VECTOR_BACKEND = 'local')",
+    )
+    group.add_argument(
+        "--export-local",
+        action="store_true",
+        help="Genera el índice local (VECTOR_BACKEND = 'local') con todos los .md "
+        "de data/",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Con --all, hilos de embeddings del pipeline concurrente (ej: 4)",
+    )
 
     args = parser.parse_args()
+    if args.workers is not None and not args.all:
+        parser.error("❌ --workers solo se puede usar junto con --all")
+    if args.workers is not None and args.workers < 1:
+        parser.error("❌ --workers debe ser un entero mayor que 0")
 
     try:
-        if args.all:
+        if args.workers:
+            upload_all_md_documents_concurrently(args.workers)
+        elif args.all:
             upload_all_md_documents()
+        elif args.sync and VECTOR_BACKEND == "local":
+            sync_local_index()
+        elif args.sync:
+            sync_md_documents()
+        elif args.export_local:
+            export_local_index()
         else:
             upload_md_document(args.file)
     except Exception as e:
@@ -9,22 +9,35 @@ Características:
 - Entrada de texto libre para deseos del viaje.
 - Selección de duración, presupuesto, tipo de viaje e intereses.
 - Visualización del uso de tokens antes de enviar.
-- Generación del itinerario mediante `run_prompt` (flujo LLM + RAG).
+- Generación del itinerario mediante `stream_prompt` (flujo LLM + RAG), mostrando la
+  respuesta a medida que el modelo la genera.
+- Los recursos costosos (grafo, codificador, opciones de UI) se cargan una vez por
+  proceso y el último itinerario de cada prompt se guarda en la sesión (ver
+  `webapp.ui_cache`): cambiar un control vuelve a pintar la página sin volver a ejecutar
+  el grafo.
+- "Regenerar itinerario" descarta el itinerario guardado y lo vuelve a generar, sin
+  reutilizar la caché de respuestas.
 
 Uso:
 Ejecutar `streamlit run webapp/app.py` desde la raíz del proyecto.
 """
 
 import streamlit as st
-import yaml
-from webapp.runner import run_prompt
 
-from config.config import MAX_PROMPT_TOKENS, UI_OPTIONS_PATH
-from modules.prompt_utils import encoding, load_formatted_prompt
+from config.config import MAX_PROMPT_TOKENS
+from webapp.runner import stream_prompt
+from webapp.ui_cache import (
+    clear_session_result,
+    count_tokens,
+    get_dialogue_manager,
+    get_prompt_registry,
+    get_session_result,
+    load_ui_options,
+    save_session_result,
+)
 
 # ---------- CARGA DE OPCIONES DE UI DESDE YAML ----------
-with open(UI_OPTIONS_PATH, "r", encoding="utf-8") as f:
-    ui_options = yaml.safe_load(f)
+ui_options = load_ui_options()
 
 # ---------- CONFIGURACIÓN GENERAL DE LA PÁGINA ----------
 st.set_page_config(page_title="KoalaRoute", page_icon="🐨", layout="centered")
@@ -55,8 +68,10 @@ with col4:
     )
 
 # ---------- CÁLCULO Y VISUALIZACIÓN DE TOKENS ----------
-user_token_count = len(encoding.encode(user_query))
-tokens_remaining = max(MAX_PROMPT_TOKENS, 0)
+user_token_count = count_tokens(user_query)
+# La parte fija de `prompt_base` (instrucciones del sistema) se descuenta del máximo
+static_token_count = get_prompt_registry().static_token_count("prompt_base")
+tokens_remaining = max(MAX_PROMPT_TOKENS - static_token_count, 0)
 progress_ratio = (
     min(user_token_count / tokens_remaining, 1.0) if tokens_remaining > 0 else 1.0
 )
@@ -72,7 +87,7 @@ interest_str = ", ".join(interests) if interests else "cualquier tipo de activid
 
 # Prompt completo con sistema + entrada del usuario
 full_prompt = (
-    load_formatted_prompt(
+    get_prompt_registry().format(
         "prompt_base",
         days=days,
         budget=budget.lower(),
@@ -83,7 +98,18 @@ full_prompt = (
 )
 
 # ---------- BOTÓN Y LÓGICA DE GENERACIÓN ----------
-if st.button("🦘 Generar itinerario"):
+# Itinerario ya generado en esta sesión para el mismo prompt (p. ej. tras tocar
+# otro control): se vuelve a mostrar sin ejecutar el grafo
+previous_result = get_session_result(full_prompt)
+generate = st.button("🦘 Generar itinerario")
+
+# "Regenerar" descarta el itinerario guardado (en la sesión y en la caché de respuestas)
+refresh = previous_result is not None and st.button("🔄 Regenerar itinerario")
+if refresh:
+    clear_session_result(full_prompt)
+    previous_result = None
+
+if (generate or refresh) and previous_result is None:
     if not user_query.strip():
         st.warning("Por favor, describe tu viaje.")
     elif not isinstance(days, int) or not 1 <= days <= 30:
@@ -94,10 +120,17 @@ if st.button("🦘 Generar itinerario"):
             "tokens debido al espacio reservado para instrucciones del sistema. Reduce la longitud o complejidad del mensaje."
         )
     else:
+        # El grafo se compila una vez por proceso, en la primera generación
+        get_dialogue_manager()
         with st.spinner("⛺ Trazando tu ruta ideal..."):
             try:
-                response = run_prompt(full_prompt)["generated_response"]
                 st.success("🗺️ Tu itinerario personalizado:")
-                st.markdown(response, unsafe_allow_html=True)
+                # Los fragmentos se pintan según llegan y la respuesta final queda
+                stream = stream_prompt(full_prompt, refresh=refresh)
+                st.write_stream(stream)
+                save_session_result(full_prompt, stream.result)
             except Exception as e:
                 st.error(f"⚠️ Error: {e}")
+elif previous_result is not None:
+    st.success("🗺️ Tu itinerario personalizado:")
+    st.markdown(previous_result["generated_response"], unsafe_allow_html=True)
@@ -15,79 +15,92 @@ El flujo de evaluación consiste en:
    - Documentos recuperados durante el proceso.
 
 Componentes principales:
-- `load_formatted_prompt`: Construye el prompt estructurado a partir de los datos del escenario.
+- `build_scenario_prompt`: Construye el prompt estructurado a partir de los datos del
+  escenario.
 - `run_prompt`: Ejecuta el grafo de LangGraph y devuelve la respuesta generada y los documentos utilizados.
 - `Evaluator`: Calcula métricas como `Recall adaptativo` y `Coherencia Semántica`.
 
-Requiere archivos de escenario YAML ubicados en el directorio correspondiente, accesibles mediante `get_available_scenarios`.
+Requiere archivos de escenario YAML ubicados en el directorio correspondiente,
+accesibles mediante `load_scenario_index`.
+
+El archivo de escenarios, el evaluador y el grafo se cargan una vez por proceso, y la
+evaluación de cada escenario se guarda en la sesión (ver `webapp.ui_cache`): volver a
+seleccionar un escenario ya evaluado muestra su resultado sin ejecutar de nuevo el
+sistema.
 
 Uso:
-Ejecutar `streamlit run webapp/app_test.py` desde la raíz del proyecto.
+Ejecutar `streamlit run webapp/app_test.py` desde la raíz del proyecto. Para evaluar
+todos los escenarios sin interfaz, ver `webapp/evaluation/batch_evaluator.py`.
 """
 
 import streamlit as st
 
-from modules.prompt_utils import load_formatted_prompt
-from webapp.evaluation.evaluator import Evaluator
-from webapp.evaluation.scenario_utils import (
-    get_available_scenarios,
-    load_scenario_by_name,
-)
+from webapp.evaluation.scenario_utils import build_scenario_prompt
 from webapp.runner import run_prompt
+from webapp.ui_cache import (
+    clear_session_result,
+    get_dialogue_manager,
+    get_evaluator,
+    get_session_result,
+    load_scenario_index,
+    save_session_result,
+)
 
 st.set_page_config(page_title="KoalaTest", page_icon="🐨🛠️", layout="centered")
 st.title("Evaluador de escenarios de prueba")
 
-available_scenarios = get_available_scenarios()
+try:
+    scenario_index = load_scenario_index()
+except Exception as e:
+    st.error(f"Error cargando los escenarios: {e}")
+    scenario_index = {}
 
-if not available_scenarios:
+if not scenario_index:
     st.warning("No se encontraron archivos de escenario.")
 else:
-    selected_scenario = st.selectbox("Selecciona un escenario:", available_scenarios)
+    selected_scenario = st.selectbox("Selecciona un escenario:", list(scenario_index))
 
-    if st.button("Ejecutar evaluación"):
-        with st.spinner("Procesando escenario..."):
-            # Cargar datos del escenario
-            scenario_data = load_scenario_by_name(selected_scenario)
-
-            # Construir prompt completo
-            interest_str = (
-                ", ".join(scenario_data["interests"])
-                if scenario_data.get("interests")
-                else "cualquier tipo de actividad"
-            )
-            full_prompt = (
-                load_formatted_prompt(
-                    "prompt_base",
-                    days=scenario_data["duration_days"],
-                    budget=scenario_data["budget"].lower(),
-                    travel_type=scenario_data["travel_type"].lower(),
-                    interests=interest_str,
-                )
-                + scenario_data["user_input"]
-            )
+    # Cargar datos del escenario y construir prompt completo
+    scenario_data = scenario_index[selected_scenario]
+    full_prompt = build_scenario_prompt(scenario_data)
+
+    # Evaluación ya realizada en esta sesión para este escenario y prompt
+    evaluation = get_session_result(full_prompt)
+    run = st.button("Ejecutar evaluación")
 
+    # "Repetir evaluación" descarta el resultado guardado y regenera la respuesta
+    refresh = evaluation is not None and st.button("🔄 Repetir evaluación")
+    if refresh:
+        clear_session_result(full_prompt)
+        evaluation = None
+
+    if (run or refresh) and evaluation is None:
+        get_dialogue_manager()
+        with st.spinner("Procesando escenario..."):
             # Ejecutar el sistema
-            generated_output = run_prompt(full_prompt)
+            generated_output = run_prompt(full_prompt, refresh=refresh)
 
             # Añadir resultados al escenario para evaluación
-            generated_response = generated_output.get("generated_response", "")
-            retrieved_docs = generated_output.get("retrieved_docs", [])
-
-            scenario_data["retrieved_docs"] = retrieved_docs
+            scenario_data["retrieved_docs"] = generated_output.get("retrieved_docs", [])
 
             # Evaluar
-            evaluator = Evaluator()
-            result = evaluator.evaluate_scenario(scenario_data)
+            evaluation = {
+                "result": get_evaluator().evaluate_scenario(scenario_data),
+                "generated_response": generated_output.get("generated_response", ""),
+                "retrieved_docs": scenario_data["retrieved_docs"],
+            }
+            save_session_result(full_prompt, evaluation)
 
         st.success("✅ Evaluación completada.")
+
+    if evaluation is not None:
         st.subheader("📊 Resultado de la evaluación")
-        st.json(result)
+        st.json(evaluation["result"])
 
         st.subheader("📝 Respuesta generada (itinerario)")
-        st.markdown(generated_response)
+        st.markdown(evaluation["generated_response"])
 
-        if retrieved_docs:
+        if evaluation["retrieved_docs"]:
             st.subheader("📚 Documentos recuperados")
-            for doc in retrieved_docs:
+            for doc in evaluation["retrieved_docs"]:
                 st.markdown(f"- `{doc.get('id')}`")
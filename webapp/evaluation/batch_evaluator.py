@@ -0,0 +1,466 @@
+"""
+Evaluador por lotes (sin interfaz) de los escenarios de prueba definidos en
+`SCENARIOS_PATH`.
+
+Equivale a pulsar "Ejecutar evaluación" en `app_test.py` para todos los escenarios,
+pero:
+- Ejecuta los escenarios en paralelo con un número configurable de hilos
+  (`EVAL_WORKERS`).
+- Calcula los embeddings de todas las consultas en una única llamada a
+  `embed_documents`.
+- Ejecuta una sola vez los escenarios que comparten consulta (mismo prompt completo) y
+  reutiliza su resultado (recuperación y respuesta) para evaluar todos ellos.
+- Guarda por escenario las métricas del `Evaluator`, la latencia por nodo del grafo, las
+  llamadas externas y los tokens (entrada, contexto, prompt y respuesta del LLM) en
+  `results.json` y `results.csv`, junto con un resumen agregado en `summary.json`.
+
+Modo solo recuperación (`--retrieval-only`): las métricas del `Evaluator` solo dependen
+de los documentos recuperados, así que se ejecuta únicamente el `RetrieverAgent` (nodo
+`consulta`), sin generar el itinerario ni consumir tokens de completado. Permite barrer
+varios valores de K (`--k`) y de umbral de similitud (`--threshold`) en un mismo
+proceso: se hace una búsqueda por escenario y K, y los umbrales se aplican sobre sus
+resultados sin volver a buscar. Los resultados se guardan en
+`sweep_results.json`/`sweep_results.csv` y el resumen por combinación en
+`sweep_summary.json`.
+
+Uso:
+    python -m webapp.evaluation.batch_evaluator
+    python -m webapp.evaluation.batch_evaluator --workers 8 --output reports/evaluation
+    python -m webapp.evaluation.batch_evaluator --scenario "Escenario 1 - ..."
+    python -m webapp.evaluation.batch_evaluator --retrieval-only \\
+        --k 5 10 15 --threshold 0.3 0.4 0.5
+"""
+
+import argparse
+import csv
+import json
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence
+
+from config.config import EVAL_REPORT_DIR, EVAL_WORKERS, SIMILARITY_THRESHOLD
+from modules.agents.retriever_agent import RetrieverAgent
+from modules.prompt_utils import encoding
+from modules.vector import embeddings, vector_store
+from webapp.evaluation.evaluator import Evaluator
+from webapp.evaluation.scenario_utils import build_scenario_prompt, load_scenarios
+from webapp.runner import run_prompt
+
+
+def run_scenarios(scenarios: List[dict], workers: int = EVAL_WORKERS) -> List[dict]:
+    """
+    Ejecuta y evalúa una lista de escenarios en paralelo.
+
+    Args:
+        scenarios (List[dict]): Escenarios tal y como se definen en el archivo YAML.
+        workers (int): Número de ejecuciones simultáneas del grafo.
+
+    Returns:
+        List[dict]: Un resultado por escenario, en el mismo orden (ver
+        `_scenario_result`).
+    """
+    prompts = [build_scenario_prompt(s) for s in scenarios]
+    unique_prompts = list(dict.fromkeys(prompts))
+    query_embeddings = _embed_queries(unique_prompts)
+
+    def run(prompt: str, query_embedding: Optional[List[float]]) -> dict:
+        try:
+            return run_prompt(prompt, query_embedding)
+        except Exception as e:
+            return {"error": str(e.__cause__ or e)}
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        outputs = dict(
+            zip(
+                unique_prompts,
+                executor.map(run, unique_prompts, query_embeddings),
+            )
+        )
+
+    evaluator = Evaluator()
+    return [
+        _scenario_result(evaluator, scenario, prompt, outputs[prompt])
+        for scenario, prompt in zip(scenarios, prompts)
+    ]
+
+
+def sweep_retrieval(
+    scenarios: List[dict],
+    ks: Sequence[Optional[int]] = (None,),
+    thresholds: Sequence[float] = (SIMILARITY_THRESHOLD,),
+    workers: int = EVAL_WORKERS,
+) -> List[dict]:
+    """
+    Evalúa solo la recuperación de los escenarios para cada combinación de K y umbral.
+
+    Se ejecuta el `RetrieverAgent` una vez por consulta y K (con el menor de los
+    umbrales) y cada umbral se aplica después sobre la similitud de las secciones
+    devueltas, sin nuevas búsquedas.
+
+    Args:
+        scenarios (List[dict]): Escenarios tal y como se definen en el archivo YAML.
+        ks (Sequence[int | None]): Valores de K; `None` usa el K adaptativo de la
+            configuración.
+        thresholds (Sequence[float]): Umbrales de similitud.
+        workers (int): Número de búsquedas simultáneas.
+
+    Returns:
+        List[dict]: Un resultado por (escenario, K, umbral) con `"name"`, `"k"`,
+        `"threshold"`, `"metrics"`, `"retrieval_ms"`, `"retrieved_docs"` y `"error"`.
+    """
+    prompts = [build_scenario_prompt(s) for s in scenarios]
+    unique_prompts = list(dict.fromkeys(prompts))
+    query_embeddings = _embed_queries(unique_prompts)
+
+    retriever = RetrieverAgent(vector_store)
+    floor = min(thresholds)
+
+    def retrieve(job: tuple) -> dict:
+        prompt, query_embedding, k = job
+        state = {"input": prompt, "retriever_k": k, "similarity_threshold": floor}
+        if query_embedding is not None:
+            state["query_embedding"] = query_embedding
+        try:
+            start = time.perf_counter()
+            result = retriever.get_context(state)
+            result["retrieval_ms"] = (time.perf_counter() - start) * 1000
+            return result
+        except Exception as e:
+            return {"error": str(e)}
+
+    jobs = [
+        (prompt, query_embedding, k)
+        for prompt, query_embedding in zip(unique_prompts, query_embeddings)
+        for k in ks
+    ]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        outputs = dict(
+            zip([(prompt, k) for prompt, _, k in jobs], executor.map(retrieve, jobs))
+        )
+
+    evaluator = Evaluator()
+    results = []
+    for scenario, prompt in zip(scenarios, prompts):
+        for k in ks:
+            output = outputs[(prompt, k)]
+            for threshold in thresholds:
+                result = {
+                    "name": scenario["name"],
+                    "k": k or "auto",
+                    "threshold": threshold,
+                    "error": output.get("error"),
+                }
+                if not result["error"]:
+                    # Secciones y documentos recuperados están alineados uno a uno
+                    docs = [
+                        doc
+                        for doc, section in zip(
+                            output["retrieved_docs"], output["context_sections"]
+                        )
+                        if section["similarity"] >= threshold
+                    ]
+                    metrics = evaluator.evaluate_scenario(
+                        {**scenario, "retrieved_docs": docs}
+                    )
+                    metrics.pop("Escenario", None)
+                    result.update(
+                        {
+                            "metrics": metrics,
+                            "retrieval_ms": round(output["retrieval_ms"], 1),
+                            "retrieved_docs": [doc["id"] for doc in docs],
+                        }
+                    )
+                results.append(result)
+
+    return results
+
+
+def _embed_queries(prompts: List[str]) -> List[Optional[List[float]]]:
+    """
+    Calcula los embeddings de todas las consultas en una sola llamada a
+    `embed_documents`.
+
+    Si la llamada falla, devuelve `None` para cada consulta y cada ejecución lo calcula.
+    """
+    try:
+        return embeddings.embed_documents(prompts)
+    except Exception as e:
+        print(f"⚠️ No se pudieron calcular los embeddings por lotes: {e}")
+        return [None] * len(prompts)
+
+
+def _scenario_result(
+    evaluator: Evaluator, scenario: dict, prompt: str, output: dict
+) -> dict:
+    """
+    Evalúa la salida del grafo para un escenario y reúne métricas, latencias y tokens.
+
+    Returns:
+        dict: `"name"`, `"metrics"`, `"timings_ms"`, `"tokens"` (los de `"prompt"` y
+        `"completion"` según `usage` del LLM), `"calls"` (llamadas externas),
+        `"retrieved_docs"` (IDs) y `"error"` (`None` si la ejecución terminó
+        correctamente).
+    """
+    result = {"name": scenario["name"], "error": output.get("error")}
+    if result["error"]:
+        return result
+
+    metrics = evaluator.evaluate_scenario(
+        {**scenario, "retrieved_docs": output["retrieved_docs"]}
+    )
+    metrics.pop("Escenario", None)
+
+    result.update(
+        {
+            "metrics": metrics,
+            "timings_ms": _timings_ms(output["metrics"]),
+            "tokens": {
+                "input": len(encoding.encode(prompt)),
+                "context": output.get("context_tokens") or 0,
+                "prompt": output["metrics"]["prompt_tokens"],
+                "completion": output["metrics"]["completion_tokens"],
+            },
+            "calls": output["metrics"]["calls"],
+            "retrieved_docs": [doc["id"] for doc in output["retrieved_docs"]],
+        }
+    )
+    return result
+
+
+def _timings_ms(metrics: dict) -> dict:
+    """
+    Milisegundos por nodo del grafo y total (`"total"`) a partir de las métricas de
+    `run_prompt`.
+    """
+    timings = {node: round(m["ms"], 1) for node, m in metrics["nodes"].items()}
+    timings["total"] = round(metrics["total_ms"], 1)
+    return timings
+
+
+def summarize(results: List[dict], wall_time_s: float) -> dict:
+    """
+    Calcula el resumen agregado de una ejecución por lotes.
+
+    Args:
+        results (List[dict]): Resultados por escenario de `run_scenarios`.
+        wall_time_s (float): Duración total de la ejecución en segundos.
+
+    Returns:
+        dict: Número de escenarios y fallos, media de cada métrica, percentiles de
+        latencia (p50/p95 por nodo y total) y tokens totales.
+    """
+    ok = [r for r in results if not r["error"]]
+    summary = {
+        "scenarios": len(results),
+        "failed": len(results) - len(ok),
+        "wall_time_s": round(wall_time_s, 2),
+        "metrics": {},
+        "latency_ms": {},
+        "tokens": {},
+    }
+
+    for section in ("metrics", "tokens"):
+        keys = dict.fromkeys(k for r in ok for k in r[section])
+        for key in keys:
+            values = [r[section][key] for r in ok if key in r[section]]
+            if section == "metrics":
+                summary[section][key] = round(statistics.mean(values), 3)
+            else:
+                summary[section][key] = sum(values)
+
+    nodes = dict.fromkeys(k for r in ok for k in r["timings_ms"])
+    for node in nodes:
+        values = sorted(r["timings_ms"][node] for r in ok if node in r["timings_ms"])
+        summary["latency_ms"][node] = {
+            "p50": round(_percentile(values, 50), 1),
+            "p95": round(_percentile(values, 95), 1),
+        }
+
+    return summary
+
+
+def summarize_sweep(results: List[dict]) -> List[dict]:
+    """
+    Resume un barrido de recuperación por combinación de K y umbral.
+
+    Args:
+        results (List[dict]): Resultados de `sweep_retrieval`.
+
+    Returns:
+        List[dict]: Una fila por (K, umbral) con la media de cada métrica, la latencia
+        p50/p95 de la recuperación y el número de escenarios y fallos, en el orden del
+        barrido.
+    """
+    groups = {}
+    for r in results:
+        groups.setdefault((r["k"], r["threshold"]), []).append(r)
+
+    summary = []
+    for (k, threshold), group in groups.items():
+        ok = [r for r in group if not r["error"]]
+        keys = dict.fromkeys(key for r in ok for key in r["metrics"])
+        latencies = sorted(r["retrieval_ms"] for r in ok)
+        summary.append(
+            {
+                "k": k,
+                "threshold": threshold,
+                "scenarios": len(group),
+                "failed": len(group) - len(ok),
+                "metrics": {
+                    key: round(
+                        statistics.mean(
+                            r["metrics"][key] for r in ok if key in r["metrics"]
+                        ),
+                        3,
+                    )
+                    for key in keys
+                },
+                "retrieval_ms": {
+                    "p50": round(_percentile(latencies, 50), 1),
+                    "p95": round(_percentile(latencies, 95), 1),
+                },
+            }
+        )
+
+    return summary
+
+
+def _percentile(sorted_values: List[float], percentile: float) -> float:
+    """
+    Percentil por interpolación lineal de una lista ya ordenada.
+    """
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * percentile / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (
+        position - lower
+    )
+
+
+def write_report(
+    results: List[dict], summary: dict | List[dict], output_dir: str, prefix: str = ""
+) -> None:
+    """
+    Guarda los resultados por escenario (JSON y CSV) y el resumen agregado (JSON).
+
+    Args:
+        results (List[dict]): Resultados por escenario.
+        summary (dict | List[dict]): Resumen de `summarize` o `summarize_sweep`.
+        output_dir (str): Carpeta de destino (se crea si no existe).
+        prefix (str): Prefijo de los ficheros (`results.json`, `results.csv`,
+            `summary.json`).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    with open(
+        os.path.join(output_dir, f"{prefix}results.json"), "w", encoding="utf-8"
+    ) as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+    with open(
+        os.path.join(output_dir, f"{prefix}summary.json"), "w", encoding="utf-8"
+    ) as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    # CSV: una fila por resultado, con los diccionarios anidados aplanados
+    # como "sección.clave"
+    rows = []
+    for r in results:
+        row = {}
+        for key, value in r.items():
+            if isinstance(value, dict):
+                row.update({f"{key}.{k}": v for k, v in value.items()})
+            elif not isinstance(value, list):
+                row[key] = "" if value is None else value
+        rows.append(row)
+
+    fieldnames = list(dict.fromkeys(k for row in rows for k in row))
+    with open(
+        os.path.join(output_dir, f"{prefix}results.csv"),
+        "w",
+        encoding="utf-8",
+        newline="",
+    ) as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    """
+    Ejecuta la evaluación por lotes desde CLI e imprime el resumen.
+    """
+    parser = argparse.ArgumentParser(
+        description="Evalúa en paralelo los escenarios de prueba y guarda un informe."
+    )
+    parser.add_argument(
+        "--workers", type=int, default=EVAL_WORKERS, help="Escenarios en paralelo"
+    )
+    parser.add_argument(
+        "--output", default=EVAL_REPORT_DIR, help="Carpeta de los informes"
+    )
+    parser.add_argument(
+        "--scenario", nargs="+", help="Evalúa solo los escenarios con estos nombres"
+    )
+    parser.add_argument(
+        "--retrieval-only",
+        action="store_true",
+        help="Evalúa solo la recuperación (sin generar respuestas)",
+    )
+    parser.add_argument(
+        "--k",
+        nargs="+",
+        type=int,
+        help="Valores de K a barrer con --retrieval-only (por defecto, K adaptativo)",
+    )
+    parser.add_argument(
+        "--threshold",
+        nargs="+",
+        type=float,
+        default=[SIMILARITY_THRESHOLD],
+        help="Umbrales de similitud a barrer con --retrieval-only",
+    )
+    args = parser.parse_args()
+
+    scenarios = load_scenarios()
+    if args.scenario:
+        scenarios = [s for s in scenarios if s["name"] in args.scenario]
+    if not scenarios:
+        print("ℹ️ No hay escenarios que evaluar.")
+        return
+
+    print(f"🧪 Evaluando {len(scenarios)} escenario(s) con {args.workers} hilo(s)...")
+    if args.retrieval_only:
+        results = sweep_retrieval(
+            scenarios, args.k or [None], args.threshold, args.workers
+        )
+        summary = summarize_sweep(results)
+        write_report(results, summary, args.output, prefix="sweep_")
+
+        for row in summary:
+            print(
+                f"- k={row['k']} umbral={row['threshold']}: "
+                f"{json.dumps(row['metrics'], ensure_ascii=False)} "
+                f"(p50 {row['retrieval_ms']['p50']} ms, {row['failed']} fallos)"
+            )
+        print(f"✅ Informe guardado en {args.output}")
+        return
+
+    start = time.perf_counter()
+    results = run_scenarios(scenarios, args.workers)
+    summary = summarize(results, time.perf_counter() - start)
+    write_report(results, summary, args.output)
+
+    for r in results:
+        status = f"❌ {r['error']}" if r["error"] else json.dumps(r["metrics"])
+        print(f"- {r['name']}: {status}")
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    print(f"✅ Informe guardado en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,12 +15,15 @@ Funcionalidades:
 Dependencias:
 - `embeddings`: Objeto de embeddings compartido, inicializado desde `modules.vector`.
 - `K_EVAL_THRESHOLD`: Proporción configurable de documentos usados como top-K en el cálculo de recall.
+- `category_registry`: Registro de categorías para la cobertura temática con máscaras de
+  bits.
 """
 
 from math import ceil
 from typing import Dict, List, Set
 
 from config.config import K_EVAL_THRESHOLD
+from modules.categories import category_registry
 from modules.vector import embeddings
 
 
@@ -58,16 +61,19 @@ class Evaluator:
         """
         Calcula la cobertura temática de los documentos recuperados respecto a los intereses del usuario.
 
-        Esta métrica evalúa qué proporción de los intereses proporcionados por el usuario
-        están presentes en las categorías de los documentos recuperados. Se normaliza todo el texto
-        a minúsculas para una comparación robusta.
+        Esta métrica evalúa qué proporción de los intereses proporcionados por el
+        usuario están presentes en las categorías de los documentos recuperados.
+        Intereses y categorías se representan como máscaras de bits del registro de
+        categorías (sin distinguir mayúsculas), de modo que la cobertura se obtiene con
+        OR/AND y recuento de bits.
 
         Si no se especifican intereses, se asume cobertura total (1.0).
 
         Args:
             interests (List[str]): Lista de intereses definidos por el usuario.
-            retrieved_docs (List[Dict]): Lista de documentos recuperados, cada uno con una clave "category"
-                                        que contiene una lista de etiquetas temáticas.
+            retrieved_docs (List[Dict]): Lista de documentos recuperados, cada uno con
+                                        una clave "category_mask" o, en su defecto,
+                                        "category" con sus etiquetas.
 
         Returns:
             float: Porcentaje de intereses cubiertos por las categorías de los documentos (entre 0.0 y 1.0).
@@ -75,15 +81,18 @@ class Evaluator:
         if not interests:
             return 1.0
 
-        # Normalizar intereses y categorías
+        # Los intereses fuera del registro cuentan en el total, pero no se cubren
         interests_normalized = {i.strip().lower() for i in interests}
-        retrieved_categories = set()
+        interests_mask = category_registry.mask(interests_normalized)
 
+        retrieved_mask = 0
         for doc in retrieved_docs:
-            for cat in doc.get("category", []):
-                retrieved_categories.add(cat.strip().lower())
+            doc_mask = doc.get("category_mask")
+            if doc_mask is None:
+                doc_mask = category_registry.mask(doc.get("category", []))
+            retrieved_mask |= doc_mask
 
-        matches = sum(1 for i in interests_normalized if i in retrieved_categories)
+        matches = (interests_mask & retrieved_mask).bit_count()
         return matches / len(interests_normalized) if interests_normalized else 0.0
 
     def semantic_similarity(self, retrieved_docs: List[Dict]) -> float:
@@ -7,25 +7,53 @@ potencial para el sistema RAG (Recuperación Aumentada con Generación), incluye
 nombre, duración, intereses, entrada del usuario, documentos esperados y respuesta de referencia.
 
 Funciones disponibles:
+- `load_scenarios()`: Carga todos los escenarios definidos en el archivo.
 - `get_available_scenarios()`: Devuelve una lista con los nombres de todos los escenarios definidos.
 - `load_scenario_by_name(name)`: Carga y devuelve un escenario específico a partir de su nombre.
+- `build_scenario_prompt(scenario)`: Construye el prompt completo de un escenario.
 
-El archivo YAML utilizado está ubicado en la ruta definida por `SCENARIOS_PATH`, y es compartido
-por la interfaz de Streamlit para evaluar casos de prueba.
+El archivo YAML utilizado está ubicado en la ruta definida por `SCENARIOS_PATH`, y es
+compartido por la interfaz de Streamlit y por el evaluador por lotes
+(`batch_evaluator.py`). Las funciones no dependen de Streamlit: los errores se propagan
+como excepciones para que cada interfaz los muestre a su manera.
 
 Dependencias:
 - PyYAML para parseo del archivo YAML.
-- Streamlit para mostrar errores y advertencias al usuario en la interfaz gráfica.
 """
 
-
 import os
 from typing import List
 
-import streamlit as st
 import yaml
 
 from config.config import SCENARIOS_PATH
+from modules.prompt_utils import load_formatted_prompt
+
+
+def load_scenarios(path: str = SCENARIOS_PATH) -> List[dict]:
+    """
+    Carga todos los escenarios definidos en el archivo YAML.
+
+    Args:
+        path (str): Ruta del archivo de escenarios.
+
+    Returns:
+        List[dict]: Escenarios con nombre, en el orden del archivo.
+
+    Raises:
+        FileNotFoundError: Si no existe el archivo de escenarios.
+        ValueError: Si el archivo no contiene una lista de escenarios.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No se encontró el archivo de escenarios: {path}")
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f)
+
+    if not isinstance(data, list):
+        raise ValueError("El archivo de escenarios no tiene el formato esperado.")
+
+    return [s for s in data if "name" in s]
 
 
 def get_available_scenarios() -> List[str]:
@@ -36,21 +64,7 @@ def get_available_scenarios() -> List[str]:
     Returns:
         List[str]: Lista de nombres de escenarios.
     """
-    if not os.path.exists(SCENARIOS_PATH):
-        st.warning("No se encontró el archivo de escenarios.")
-        return []
-
-    try:
-        with open(SCENARIOS_PATH, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f)
-            if isinstance(data, list):
-                return [s["name"] for s in data if "name" in s]
-            else:
-                st.error("El archivo de escenarios no tiene el formato esperado.")
-                return []
-    except Exception as e:
-        st.error(f"Error cargando los escenarios: {e}")
-        return []
+    return [s["name"] for s in load_scenarios()]
 
 
 def load_scenario_by_name(scenario_name: str) -> dict:
@@ -63,15 +77,36 @@ def load_scenario_by_name(scenario_name: str) -> dict:
     Returns:
         dict: Escenario encontrado, o {} si no existe.
     """
+    for s in load_scenarios():
+        if s.get("name") == scenario_name:
+            return s
+    return {}
+
+
+def build_scenario_prompt(scenario: dict) -> str:
+    """
+    Construye el prompt completo de un escenario: plantilla `prompt_base` con sus
+    parámetros seguida de la entrada del usuario.
+
+    Args:
+        scenario (dict): Escenario con `duration_days`, `budget`, `travel_type`,
+                         `interests` y `user_input`.
 
-    try:
-        with open(SCENARIOS_PATH, "r", encoding="utf-8") as f:
-            scenarios = yaml.safe_load(f)
-            for s in scenarios:
-                if s.get("name") == scenario_name:
-                    return s
-        st.warning(f"No se encontró el escenario: {scenario_name}")
-        return {}
-    except Exception as e:
-        st.error(f"Error cargando el escenario: {e}")
-        return {}
+    Returns:
+        str: Prompt listo para `run_prompt`.
+    """
+    interest_str = (
+        ", ".join(scenario["interests"])
+        if scenario.get("interests")
+        else "cualquier tipo de actividad"
+    )
+    return (
+        load_formatted_prompt(
+            "prompt_base",
+            days=scenario["duration_days"],
+            budget=scenario["budget"].lower(),
+            travel_type=scenario["travel_type"].lower(),
+            interests=interest_str,
+        )
+        + scenario["user_input"]
+    )
@@ -7,25 +7,87 @@ recibiendo una entrada del usuario y devolviendo tanto la respuesta generada com
 documentos relevantes recuperados.
 
 Responsabilidades:
-- Instancia el grafo mediante `build_langgraph_controller_flow`.
-- Expone la función `run_prompt`, que toma una consulta del usuario y devuelve un diccionario
-  con la respuesta final generada por el modelo y la lista de documentos utilizados.
+- Instancia el grafo mediante `build_langgraph_controller_flow`, de forma diferida en la
+  primera interacción: importar el runner (p. ej. al arrancar Streamlit) no carga
+  LangGraph ni los clientes.
+- Expone la función `run_prompt`, que toma una consulta del usuario y devuelve un
+  diccionario (`PromptResult`) con la respuesta final generada por el modelo y la lista
+  de documentos utilizados.
+- Expone la corrutina `arun_prompt`, equivalente asíncrona basada en `ainvoke`, que
+  permite atender muchas peticiones concurrentes en un mismo proceso mientras se espera
+  a la E/S.
+- Expone `stream_prompt`, que devuelve un `PromptStream`: un iterable con los fragmentos
+  de la respuesta a medida que el LLM los genera, y cuyo atributo `result` contiene, al
+  agotarse, el mismo diccionario que devuelve `run_prompt`.
+- Expone `run_prompt_batch`, que ejecuta muchas consultas a la vez (p. ej. para
+  precalcular itinerarios): un único `embed_documents` para todas, búsquedas en
+  paralelo, secciones repetidas entre consultas codificadas una sola vez y ejecuciones
+  del LLM con concurrencia acotada.
+
+Todas las variantes añaden al resultado `"metrics"`: el tiempo de cada nodo del grafo,
+las llamadas externas, los tokens del LLM y el resultado de la caché de respuestas (ver
+`modules.instrumentation`), y lo exportan a los destinos de `METRICS_SINKS`. Las
+ejecuciones que fallan también se exportan, con el tipo de error.
 
 La gestión de errores se realiza mediante trazas impresas, facilitando la depuración
 en entornos de desarrollo local.
 """
 
-
+import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional, TypedDict
 
+from config.config import (
+    BATCH_LLM_WORKERS,
+    BATCH_SEARCH_WORKERS,
+    RESPONSE_CACHE_ENABLED,
+)
 from modules.graph.agent_state import AgentState
-from modules.graph.graph import build_langgraph_controller_flow
+from modules.instrumentation import export_run, summarize_run
+from modules.lazy import Lazy
+
+
+def _build_dialogue_manager():
+    """
+    Construcción del grafo de agentes (controlador + retriever + LLM).
+
+    Importa LangGraph, los agentes y sus clientes, por lo que se difiere a la primera
+    ejecución.
+    """
+    from modules.graph.graph import build_langgraph_controller_flow
+
+    return build_langgraph_controller_flow()
+
+
+# Grafo compilado una sola vez en la primera interacción (ver `modules.lazy`)
+dialogue_manager = Lazy(_build_dialogue_manager)
+
+
+class PromptResult(TypedDict):
+    """
+    Resultado de una interacción con el grafo (`run_prompt`, `arun_prompt` y
+    `PromptStream.result`).
 
-# Construcción del grafo de agentes (controlador + retriever + LLM)
-dialogue_manager = build_langgraph_controller_flow()
+    Atributos:
+        generated_response (str): Respuesta generada por el modelo.
+        retrieved_docs (List[dict]): Documentos recuperados (`"id"` con el formato
+            "título#sección", categorías y similitud).
+        query_embedding (List[float] | None): Embedding de la consulta.
+        context_tokens (int | None): Tokens del contexto incluido en el prompt.
+        metrics (dict): Métricas de la ejecución (ver `summarize_run`).
+    """
+
+    generated_response: str
+    retrieved_docs: List[dict]
+    query_embedding: Optional[List[float]]
+    context_tokens: Optional[int]
+    metrics: dict
 
 
-def run_prompt(user_query: str) -> str:
+def run_prompt(
+    user_query: str, query_embedding: list[float] | None = None, refresh: bool = False
+) -> PromptResult:
     """
     Ejecuta una única interacción con el grafo de agentes a partir de una consulta del usuario.
 
@@ -34,29 +96,307 @@ def run_prompt(user_query: str) -> str:
 
     Args:
         user_query (str): Texto introducido por el usuario (consulta o petición de itinerario).
+        query_embedding (list[float] | None): Embedding ya calculado de `user_query`
+            (opcional). Si no se proporciona, el retriever lo calcula una única vez
+            durante la ejecución.
+        refresh (bool): Si se ignora la respuesta cacheada y se vuelve a generar (la
+            nueva sustituye a la guardada en la caché de respuestas).
 
     Returns:
-        dict: Diccionario con los siguientes campos:
+        PromptResult: Diccionario con los siguientes campos:
             - "generated_response": Respuesta generada por el modelo.
             - "retrieved_docs": Lista de identificadores de documentos recuperados (formato "título#sección").
+            - "query_embedding": Embedding de la consulta calculado durante la
+              ejecución.
+            - "context_tokens": Tokens del contexto recuperado incluido en el prompt.
+            - "metrics": Métricas de la ejecución (`summarize_run`): milisegundos,
+              ejecuciones y llamadas externas por nodo, tokens del LLM y acierto o fallo
+              de caché.
+
+    Raises:
+        RuntimeError: Si ocurre algún error durante la ejecución del grafo.
+    """
+    return _run_state(_initial_state(user_query, query_embedding, refresh))
+
+
+async def arun_prompt(
+    user_query: str, query_embedding: list[float] | None = None, refresh: bool = False
+) -> PromptResult:
+    """
+    Variante asíncrona de `run_prompt`: ejecuta el grafo con `ainvoke`, usando los
+    clientes asíncronos de búsqueda, embeddings y Azure OpenAI.
+
+    Args:
+        user_query (str): Texto introducido por el usuario (consulta o petición de
+            itinerario).
+        query_embedding (list[float] | None): Embedding ya calculado de `user_query`
+            (opcional).
+        refresh (bool): Si se ignora la respuesta cacheada y se vuelve a generar.
+
+    Returns:
+        PromptResult: Mismo formato que `run_prompt`.
 
     Raises:
         RuntimeError: Si ocurre algún error durante la ejecución del grafo.
     """
+    start = time.perf_counter()
     try:
-        # Crear el estado inicial con la entrada del usuario
-        state = AgentState(input=user_query, response="")
+        result = await dialogue_manager.ainvoke(
+            _initial_state(user_query, query_embedding, refresh)
+        )
 
-        # Ejecutar el grafo
-        result = dialogue_manager.invoke(state)
+    except Exception as e:
+        _report_failure(start, e)
+        raise RuntimeError("Fallo en el grafo") from e
+
+    return _format_result(result, start)
+
+
+class PromptStream:
+    """
+    Ejecución en streaming de una interacción con el grafo de agentes.
+
+    Al iterar se obtienen los fragmentos de texto de la respuesta según los emite el
+    `LLMAgent` (modo `"custom"` de LangGraph). Una vez agotado el iterable, `result`
+    contiene el diccionario final con el mismo formato que `run_prompt` (respuesta
+    completa y documentos recuperados).
+
+    Si el grafo termina sin emitir fragmentos, se devuelve la respuesta completa de una
+    sola vez.
+
+    Atributos:
+        result (PromptResult | None): Resultado final de la ejecución (disponible tras
+            la iteración).
+    """
+
+    def __init__(
+        self,
+        user_query: str,
+        query_embedding: list[float] | None = None,
+        refresh: bool = False,
+    ):
+        self.user_query = user_query
+        self.query_embedding = query_embedding
+        self.refresh = refresh
+        self.result = None
+
+    def __iter__(self) -> Iterator[str]:
+        state = _initial_state(self.user_query, self.query_embedding, self.refresh)
+        state["stream"] = True
+        final_state, streamed = state, False
+
+        start = time.perf_counter()
+        try:
+            for mode, chunk in dialogue_manager.stream(
+                state, stream_mode=["custom", "values"]
+            ):
+                if mode == "custom":
+                    streamed = True
+                    yield chunk
+                else:
+                    final_state = chunk
+
+        except Exception as e:
+            _report_failure(start, e)
+            raise RuntimeError("Fallo en el grafo") from e
+
+        self.result = _format_result(final_state, start)
+        if not streamed and self.result["generated_response"]:
+            yield self.result["generated_response"]
+
+
+def stream_prompt(
+    user_query: str, query_embedding: list[float] | None = None, refresh: bool = False
+) -> PromptStream:
+    """
+    Ejecuta una interacción con el grafo devolviendo la respuesta en streaming.
+
+    Args:
+        user_query (str): Texto introducido por el usuario (consulta o petición de
+            itinerario).
+        query_embedding (list[float] | None): Embedding ya calculado de `user_query`
+            (opcional).
+        refresh (bool): Si se ignora la respuesta cacheada y se vuelve a generar.
+
+    Returns:
+        PromptStream: Iterable de fragmentos de texto; su atributo `result` contiene el
+        resultado final (mismo formato que `run_prompt`) una vez consumido.
+
+    Raises:
+        RuntimeError: Si ocurre algún error durante la ejecución del grafo (al iterar).
+    """
+    return PromptStream(user_query, query_embedding, refresh)
+
+
+def run_prompt_batch(
+    queries: List[str],
+    search_workers: int = BATCH_SEARCH_WORKERS,
+    llm_workers: int = BATCH_LLM_WORKERS,
+) -> List[dict]:
+    """
+    Ejecuta una lista de consultas compartiendo el trabajo común entre ellas.
+
+    La ejecución se divide en dos fases:
+    1. Recuperación: los embeddings de todas las consultas distintas se calculan con una
+       sola llamada a `embed_documents` y las búsquedas se lanzan en paralelo
+       (`search_workers`), omitiendo las consultas ya resueltas por la caché de
+       respuestas. Las secciones que aparecen en varias consultas se codifican una sola
+       vez para el empaquetado del contexto.
+    2. Generación: el grafo se ejecuta para cada consulta con el contexto ya recuperado
+       (sin volver a buscar), con como mucho `llm_workers` ejecuciones simultáneas.
+
+    Las consultas repetidas se ejecutan una vez y comparten el resultado. Si el
+    embedding por lotes o la búsqueda de una consulta fallan, el grafo la resuelve por
+    su cuenta.
+
+    Args:
+        queries (List[str]): Consultas del usuario (prompts completos).
+        search_workers (int): Búsquedas simultáneas en el vector store.
+        llm_workers (int): Ejecuciones simultáneas del grafo (llamadas al LLM).
+
+    Returns:
+        List[dict]: Un resultado por consulta, en el mismo orden. Cada uno tiene el
+        formato de `run_prompt` más `"error"` (`None`); si la consulta falla, solo
+        contiene `"error"` con el mensaje, sin interrumpir el resto del lote.
+    """
+    unique_queries = list(dict.fromkeys(queries))
+    if not unique_queries:
+        return []
+
+    states = _batch_retrieve(unique_queries, search_workers)
+
+    def run(state: AgentState) -> dict:
+        try:
+            return {**_run_state(state), "error": None}
+        except Exception as e:
+            return {"error": str(e.__cause__ or e)}
 
-        # Retornar la respuesta generada
-        return {
-            "generated_response": result.get("response", ""),
-            "retrieved_docs": result.get("retrieved_docs", []),
-        }
+    with ThreadPoolExecutor(max_workers=llm_workers) as executor:
+        outputs = dict(zip(unique_queries, executor.map(run, states)))
 
+    return [dict(outputs[query]) for query in queries]
+
+
+def _batch_retrieve(queries: List[str], workers: int) -> List[AgentState]:
+    """
+    Fase de recuperación de `run_prompt_batch`: devuelve el estado inicial de cada
+    consulta con su embedding y, si no hay acierto de caché, el contexto recuperado
+    (nodo `consulta` ya ejecutado y medido en `node_metrics`).
+    """
+    from modules.agents.cache_agent import CacheAgent
+    from modules.agents.retriever_agent import RetrieverAgent
+    from modules.instrumentation import instrument_node
+    from modules.response_cache import response_cache
+    from modules.vector import embeddings, vector_store
+
+    try:
+        query_embeddings = embeddings.embed_documents(queries)
     except Exception as e:
-        print("💥 ERROR ejecutando el grafo:")
-        traceback.print_exc()
+        print(f"⚠️ No se pudieron calcular los embeddings por lotes: {e}")
+        query_embeddings = [None] * len(queries)
+
+    cache_agent = CacheAgent(response_cache, vector_store)
+    retriever = RetrieverAgent(vector_store)
+    consulta = instrument_node("consulta", retriever.get_context)
+
+    def retrieve(query: str, query_embedding: Optional[List[float]]) -> AgentState:
+        state = _initial_state(query, query_embedding)
+        try:
+            # Una respuesta cacheada no necesita contexto: el grafo termina en `cache`
+            if RESPONSE_CACHE_ENABLED and cache_agent.lookup(state).get("cache_hit"):
+                return state
+            return {**state, **consulta.invoke(state)}
+        except Exception as e:
+            print(f"⚠️ Fallo en la búsqueda por lotes, se reintentará en el grafo: {e}")
+            return state
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        states = list(executor.map(retrieve, queries, query_embeddings))
+
+    _share_section_tokens(states)
+    return states
+
+
+def _share_section_tokens(states: List[AgentState]) -> None:
+    """
+    Codifica una sola vez cada sección recuperada por varias consultas del lote y
+    comparte sus tokens (`"block_tokens"`, ver `pack_context`) entre todas ellas.
+    """
+    from modules.context_packer import format_section
+    from modules.prompt_utils import encoding
+
+    block_tokens = {}
+    for state in states:
+        for section in state.get("context_sections") or []:
+            key = (section["title"], section["section"], section["content"])
+            if key not in block_tokens:
+                block_tokens[key] = encoding.encode(format_section(section))
+            section["block_tokens"] = block_tokens[key]
+
+
+def _initial_state(
+    user_query: str, query_embedding: list[float] | None = None, refresh: bool = False
+) -> AgentState:
+    """
+    Crea el estado inicial del grafo con la entrada del usuario.
+    """
+    state = AgentState(input=user_query, response="")
+    if query_embedding is not None:
+        state["query_embedding"] = query_embedding
+    if refresh:
+        state["cache_refresh"] = True
+    return state
+
+
+def _run_state(state: AgentState) -> PromptResult:
+    """
+    Ejecuta el grafo desde un estado inicial y da formato al resultado (ver
+    `run_prompt`).
+    """
+    start = time.perf_counter()
+    try:
+        # Ejecutar el grafo con el estado inicial
+        result = dialogue_manager.invoke(state)
+
+    except Exception as e:
+        _report_failure(start, e)
         raise RuntimeError("Fallo en el grafo") from e
+
+    # Retornar la respuesta generada
+    return _format_result(result, start)
+
+
+def _format_result(result: AgentState, start: float) -> PromptResult:
+    """
+    Extrae del estado final del grafo los campos devueltos por el runner y exporta sus
+    métricas.
+
+    Args:
+        result (AgentState): Estado final del grafo.
+        start (float): Instante de inicio de la ejecución (`time.perf_counter`).
+    """
+    metrics = summarize_run(
+        result.get("node_metrics") or [], (time.perf_counter() - start) * 1000
+    )
+    export_run(metrics)
+    return PromptResult(
+        generated_response=result.get("response", ""),
+        retrieved_docs=result.get("retrieved_docs", []),
+        query_embedding=result.get("query_embedding"),
+        context_tokens=result.get("context_tokens"),
+        metrics=metrics,
+    )
+
+
+def _report_failure(start: float, error: Exception) -> None:
+    """
+    Imprime la traza de una ejecución fallida y exporta sus métricas con el tipo de
+    error.
+    """
+    print("💥 ERROR ejecutando el grafo:")
+    traceback.print_exc()
+    export_run(
+        summarize_run(
+            [], (time.perf_counter() - start) * 1000, error=type(error).__name__
+        )
+    )
@@ -0,0 +1,154 @@
+"""
+Cachés de Streamlit compartidas por `app.py` y `app_test.py`.
+
+Streamlit vuelve a ejecutar el script completo con cada cambio de un widget. Este módulo
+evita repetir en cada ejecución el trabajo que no depende de la interacción:
+
+- Recursos del proceso (`st.cache_resource`, compartidos entre sesiones): grafo
+  compilado, codificador de tokens, registro de prompts y evaluador.
+- Datos (`st.cache_data`): opciones de la interfaz, índice de escenarios y recuento de
+  tokens. Los archivos YAML se indexan por su fecha de modificación, de modo que
+  editarlos invalida la caché sin reiniciar la aplicación.
+- Resultados por sesión (`st.session_state`): la última respuesta de cada prompt se
+  reutiliza al volver a pintar la página, sin ejecutar de nuevo el grafo (ver
+  `get_session_result`).
+"""
+
+import os
+from typing import Dict, Optional
+
+import streamlit as st
+import yaml
+
+from config.config import SCENARIOS_PATH, UI_OPTIONS_PATH
+from modules.prompt_utils import PromptRegistry
+
+# Resultados guardados por sesión (los más antiguos se descartan)
+SESSION_RESULTS_MAX_ENTRIES = 8
+_SESSION_RESULTS_KEY = "koalaroute_results"
+
+
+def _mtime(path: str) -> int:
+    """
+    Fecha de modificación de un archivo, usada como parte de la clave de las cachés de
+    datos.
+    """
+    return os.stat(path).st_mtime_ns
+
+
+# ---------- RECURSOS ----------
+@st.cache_resource(show_spinner="🐨 Preparando los agentes...")
+def get_dialogue_manager():
+    """
+    Devuelve el grafo de agentes compilado (se construye una vez por proceso).
+    """
+    from webapp.runner import dialogue_manager
+
+    return dialogue_manager.resolve()
+
+
+@st.cache_resource
+def get_encoding():
+    """
+    Devuelve el codificador de tokens de `tiktoken` (se carga una vez por proceso).
+    """
+    from modules.prompt_utils import encoding
+
+    return encoding.resolve()
+
+
+@st.cache_resource
+def get_prompt_registry() -> PromptRegistry:
+    """
+    Devuelve el registro de prompts, que se vuelve a leer solo si cambia `prompts.yaml`.
+    """
+    from modules.prompt_utils import prompt_registry
+
+    return prompt_registry
+
+
+@st.cache_resource
+def get_evaluator():
+    """
+    Devuelve el evaluador de escenarios (comparte el modelo de embeddings del sistema).
+    """
+    from webapp.evaluation.evaluator import Evaluator
+
+    return Evaluator()
+
+
+# ---------- DATOS ----------
+@st.cache_data
+def _load_ui_options(path: str, mtime: int) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+def load_ui_options(path: str = UI_OPTIONS_PATH) -> dict:
+    """
+    Devuelve las opciones de la interfaz (presupuestos, tipos de viaje, intereses).
+    """
+    return _load_ui_options(path, _mtime(path))
+
+
+@st.cache_data
+def _load_scenario_index(path: str, mtime: int) -> Dict[str, dict]:
+    from webapp.evaluation.scenario_utils import load_scenarios
+
+    return {s["name"]: s for s in load_scenarios(path)}
+
+
+def load_scenario_index(path: str = SCENARIOS_PATH) -> Dict[str, dict]:
+    """
+    Devuelve los escenarios de prueba indexados por nombre (el archivo se analiza una
+    vez).
+
+    Returns:
+        Dict[str, dict]: Escenarios por nombre, en el orden del archivo. Cada llamada
+        recibe una copia, por lo que se pueden modificar sin alterar la caché.
+    """
+    return _load_scenario_index(path, _mtime(path))
+
+
+@st.cache_data(max_entries=256)
+def count_tokens(text: str) -> int:
+    """
+    Número de tokens de un texto (se recalcula solo cuando el texto cambia).
+    """
+    return len(get_encoding().encode(text))
+
+
+# ---------- RESULTADOS POR SESIÓN ----------
+def get_session_result(key: str) -> Optional[dict]:
+    """
+    Devuelve el resultado guardado en esta sesión para un prompt, si existe.
+
+    Args:
+        key (str): Clave del resultado (normalmente, el prompt completo).
+
+    Returns:
+        dict | None: Resultado guardado con `save_session_result`.
+    """
+    return st.session_state.get(_SESSION_RESULTS_KEY, {}).get(key)
+
+
+def save_session_result(key: str, result: dict) -> None:
+    """
+    Guarda el resultado de un prompt en esta sesión, descartando los más antiguos.
+
+    Args:
+        key (str): Clave del resultado (normalmente, el prompt completo).
+        result (dict): Resultado a reutilizar en las siguientes ejecuciones del script.
+    """
+    results: Dict[str, dict] = st.session_state.setdefault(_SESSION_RESULTS_KEY, {})
+    results.pop(key, None)
+    results[key] = result
+    for old_key in list(results)[:-SESSION_RESULTS_MAX_ENTRIES]:
+        del results[old_key]
+
+
+def clear_session_result(key: str) -> None:
+    """
+    Olvida el resultado guardado de un prompt (p. ej. para volver a generarlo).
+    """
+    st.session_state.get(_SESSION_RESULTS_KEY, {}).pop(key, None)